@@ -0,0 +1,43 @@
+-- Migration number: 0002 	 2026-10-17
+
+-- Daily P&L per bot, kept up to date as trades are written (see src/lib/pnl_rollups.py)
+-- peak/trough are the highest and lowest running P&L within the day and max_drawdown the
+-- largest fall from a peak to a later trough, so consecutive days can be combined into
+-- the drawdown of any period without reading trading_history
+CREATE TABLE IF NOT EXISTS bot_daily_pnl (
+  bot_config_id INTEGER NOT NULL,
+  trade_date TEXT NOT NULL,
+  trades INTEGER NOT NULL DEFAULT 0,
+  profitable_trades INTEGER NOT NULL DEFAULT 0,
+  losing_trades INTEGER NOT NULL DEFAULT 0,
+  profit_loss REAL NOT NULL DEFAULT 0,
+  gross_profit REAL NOT NULL DEFAULT 0,
+  gross_loss REAL NOT NULL DEFAULT 0,
+  peak_profit_loss REAL NOT NULL DEFAULT 0,
+  trough_profit_loss REAL NOT NULL DEFAULT 0,
+  max_drawdown REAL NOT NULL DEFAULT 0,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (bot_config_id, trade_date),
+  FOREIGN KEY (bot_config_id) REFERENCES bot_configurations(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- Daily P&L per account (all bots of the account together)
+CREATE TABLE IF NOT EXISTS account_daily_pnl (
+  account_id INTEGER NOT NULL,
+  trade_date TEXT NOT NULL,
+  trades INTEGER NOT NULL DEFAULT 0,
+  profitable_trades INTEGER NOT NULL DEFAULT 0,
+  losing_trades INTEGER NOT NULL DEFAULT 0,
+  profit_loss REAL NOT NULL DEFAULT 0,
+  gross_profit REAL NOT NULL DEFAULT 0,
+  gross_loss REAL NOT NULL DEFAULT 0,
+  peak_profit_loss REAL NOT NULL DEFAULT 0,
+  trough_profit_loss REAL NOT NULL DEFAULT 0,
+  max_drawdown REAL NOT NULL DEFAULT 0,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (account_id, trade_date),
+  FOREIGN KEY (account_id) REFERENCES accounts(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- Latest trades of a bot for the reports page
+CREATE INDEX IF NOT EXISTS idx_trading_history_bot_exit_time ON trading_history(bot_config_id, exit_time);
@@ -2,9 +2,7 @@ import { NextRequest, NextResponse } from 'next/server';
 import { D1Database } from '@cloudflare/workers-types';
 import { verify } from 'jsonwebtoken';
 import { cookies } from 'next/headers';
-import { spawn } from 'child_process';
-import { promisify } from 'util';
-import path from 'path';
+import { callPythonWorker } from '@/lib/pythonWorker';
 
 interface Env {
   DB: D1Database;
@@ -40,14 +38,16 @@ export async function GET(
       );
     }
     
-    // Execute Python script to get market analysis
-    const scriptPath = path.join(process.cwd(), 'src', 'lib', 'market_analysis.py');
-    
-    const exec = promisify(require('child_process').exec);
-    const { stdout, stderr } = await exec(`python3 ${scriptPath} analyze ${symbol}`);
-    
-    if (stderr) {
-      console.error('Error executing market analysis script:', stderr);
+    // Get market analysis from the warm Python worker pool
+    let analysisResults;
+    try {
+      analysisResults = await callPythonWorker(
+        'analyze',
+        { symbol },
+        { fallback: ['market_analysis.py', 'analyze', symbol] }
+      );
+    } catch (error) {
+      console.error('Error executing market analysis script:', error);
       return NextResponse.json(
         { message: 'حدث خطأ أثناء تحليل السوق' },
         { status: 500 }
@@ -55,20 +55,21 @@ export async function GET(
     }
     
     try {
-      const analysisResults = JSON.parse(stdout);
-      
-      // Store analysis results in database
-      await (request as any).env.DB.prepare(
-        `INSERT INTO market_analyses 
-         (symbol, analysis_type, analysis_data, created_at) 
-         VALUES (?, ?, ?, CURRENT_TIMESTAMP)`
-      )
-        .bind(
-          symbol,
-          'comprehensive',
-          JSON.stringify(analysisResults)
+      // Store analysis results in database, unless the worker served them from its
+      // analysis cache for inputs that were already analyzed (and stored) before
+      if (analysisResults.cache?.inputs_changed !== false) {
+        await (request as any).env.DB.prepare(
+          `INSERT INTO market_analyses 
+           (symbol, analysis_type, analysis_data, created_at) 
+           VALUES (?, ?, ?, CURRENT_TIMESTAMP)`
         )
-        .run();
+          .bind(
+            symbol,
+            'comprehensive',
+            JSON.stringify(analysisResults)
+          )
+          .run();
+      }
       
       return NextResponse.json(analysisResults, { status: 200 });
       
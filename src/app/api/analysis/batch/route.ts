@@ -0,0 +1,113 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { D1Database } from '@cloudflare/workers-types';
+import { verify } from 'jsonwebtoken';
+import { cookies } from 'next/headers';
+import { callPythonWorker } from '@/lib/pythonWorker';
+
+interface Env {
+  DB: D1Database;
+}
+
+// In a production environment, this would be stored securely
+const JWT_SECRET = 'trading-bot-secret-key';
+
+// Must not exceed TRADING_ANALYSIS_MAX_SYMBOLS of the Python side
+const MAX_SYMBOLS = 50;
+
+export async function GET(request: NextRequest) {
+  try {
+    // Get the token from cookies
+    const cookieStore = cookies();
+    const token = cookieStore.get('auth-token')?.value;
+    
+    if (!token) {
+      return NextResponse.json(
+        { message: 'غير مصرح به' },
+        { status: 401 }
+      );
+    }
+    
+    // Verify the token
+    verify(token, JWT_SECRET);
+    
+    // ?symbols=BTC-USD,ETH-USD
+    const symbols = Array.from(new Set(
+      (request.nextUrl.searchParams.get('symbols') || '')
+        .split(',')
+        .map((symbol) => symbol.trim())
+        .filter(Boolean)
+    ));
+    
+    if (symbols.length === 0) {
+      return NextResponse.json(
+        { message: 'يرجى تحديد رموز العملات' },
+        { status: 400 }
+      );
+    }
+    
+    if (symbols.length > MAX_SYMBOLS) {
+      return NextResponse.json(
+        { message: `الحد الأقصى لعدد الرموز هو ${MAX_SYMBOLS}` },
+        { status: 400 }
+      );
+    }
+    
+    // Analyze the whole watchlist in one worker request
+    let batchResults;
+    try {
+      batchResults = await callPythonWorker(
+        'analyze_batch',
+        { symbols },
+        { fallback: ['batch_analysis.py', symbols.join(',')] }
+      );
+    } catch (error) {
+      console.error('Error executing batch analysis script:', error);
+      return NextResponse.json(
+        { message: 'حدث خطأ أثناء تحليل السوق' },
+        { status: 500 }
+      );
+    }
+    
+    if (batchResults.error) {
+      return NextResponse.json(
+        { message: batchResults.error },
+        { status: 400 }
+      );
+    }
+    
+    try {
+      // Store every successful analysis of new inputs in a single database round trip
+      // (results the worker served from its analysis cache were stored when first computed)
+      const db = (request as any).env.DB;
+      const statements = Object.entries(batchResults.results)
+        .filter(([, result]: [string, any]) => !result.error && result.cache?.inputs_changed !== false)
+        .map(([symbol, result]) =>
+          db.prepare(
+            `INSERT INTO market_analyses 
+             (symbol, analysis_type, analysis_data, created_at) 
+             VALUES (?, ?, ?, CURRENT_TIMESTAMP)`
+          ).bind(symbol, 'comprehensive', JSON.stringify(result))
+        );
+      
+      if (statements.length > 0) {
+        await db.batch(statements);
+      }
+      
+      return NextResponse.json(batchResults, { status: 200 });
+      
+    } catch (error) {
+      console.error('Error storing batch analysis results:', error);
+      return NextResponse.json(
+        { message: 'حدث خطأ أثناء معالجة نتائج التحليل' },
+        { status: 500 }
+      );
+    }
+    
+  } catch (error) {
+    console.error('Error getting batch market analysis:', error);
+    return NextResponse.json(
+      { message: 'حدث خطأ أثناء تحليل السوق' },
+      { status: 500 }
+    );
+  }
+}
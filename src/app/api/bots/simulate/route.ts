@@ -2,9 +2,7 @@ import { NextRequest, NextResponse } from 'next/server';
 import { D1Database } from '@cloudflare/workers-types';
 import { verify } from 'jsonwebtoken';
 import { cookies } from 'next/headers';
-import { spawn } from 'child_process';
-import { promisify } from 'util';
-import path from 'path';
+import { callPythonWorker, streamPythonWorker } from '@/lib/pythonWorker';
 
 interface Env {
   DB: D1Database;
@@ -13,6 +11,84 @@ interface Env {
 // In a production environment, this would be stored securely
 const JWT_SECRET = 'trading-bot-secret-key';
 
+function storeSimulation(db: any, userId: number, accountId: number, botId: number,
+                         tradingPair: string, strategyType: string, days: number, results: any) {
+  return db.prepare(
+    `INSERT INTO simulations 
+     (user_id, account_id, bot_id, trading_pair, strategy_type, initial_capital, final_capital, 
+      total_trades, profitable_trades, losing_trades, total_profit_loss, simulation_days, created_at) 
+     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)`
+  )
+    .bind(
+      userId,
+      accountId,
+      botId,
+      tradingPair,
+      strategyType,
+      results.initial_capital,
+      results.final_capital,
+      results.total_trades,
+      results.profitable_trades,
+      results.losing_trades,
+      results.total_profit_loss,
+      days
+    )
+    .run();
+}
+
+// Simulation records as NDJSON: one {"type":"day"} line per simulated day, then the
+// {"type":"summary"} line (stored like a regular simulation) or a {"type":"error"} line
+function streamSimulation(db: any, userId: number, accountId: number, botId: number,
+                          tradingPair: string, strategyType: string, days: number, balance: number) {
+  const encoder = new TextEncoder();
+  const records = streamPythonWorker(
+    'simulate',
+    {
+      strategy_type: strategyType,
+      trading_pair: tradingPair,
+      initial_capital: balance,
+      account_id: accountId,
+      days
+    },
+    {
+      fallback: [
+        'trading_strategies.py', 'simulate', strategyType, tradingPair, String(balance), String(days)
+      ]
+    }
+  );
+
+  const stream = new ReadableStream({
+    async pull(controller) {
+      try {
+        const { value, done } = await records.next();
+        if (done) {
+          controller.close();
+          return;
+        }
+        if (value.type === 'summary') {
+          await storeSimulation(db, userId, accountId, botId, tradingPair, strategyType, days, value);
+        }
+        controller.enqueue(encoder.encode(JSON.stringify(value) + '\n'));
+      } catch (error) {
+        console.error('Error streaming simulation:', error);
+        controller.enqueue(encoder.encode(
+          JSON.stringify({ type: 'error', message: 'حدث خطأ أثناء تشغيل المحاكاة' }) + '\n'
+        ));
+        controller.close();
+      }
+    },
+    async cancel() {
+      // Client went away: closing the generator drops the worker connection
+      await records.return(undefined);
+    }
+  });
+
+  return new Response(stream, {
+    status: 200,
+    headers: { 'Content-Type': 'application/x-ndjson; charset=utf-8', 'Cache-Control': 'no-cache' }
+  });
+}
+
 export async function POST(request: NextRequest) {
   try {
     // Get the token from cookies
@@ -34,7 +110,8 @@ export async function POST(request: NextRequest) {
       accountId, 
       tradingPair, 
       strategyType, // 'thousand_trades' or 'ten_trades'
-      days = 7 // Simulation days
+      days = 7, // Simulation days
+      stream = false // Send day records as they are simulated (NDJSON)
     } = await request.json();
     
     if (!accountId || !tradingPair || !strategyType) {
@@ -72,16 +149,34 @@ export async function POST(request: NextRequest) {
       );
     }
     
-    // Execute Python script to run simulation
-    const scriptPath = path.join(process.cwd(), 'src', 'lib', 'trading_strategies.py');
-    
-    const exec = promisify(require('child_process').exec);
-    const { stdout, stderr } = await exec(
-      `python3 ${scriptPath} simulate ${strategyType} ${tradingPair} ${account.current_balance} ${days}`
-    );
-    
-    if (stderr) {
-      console.error('Error executing simulation:', stderr);
+    if (stream) {
+      return streamSimulation(
+        (request as any).env.DB, decoded.userId, accountId, botConfig.id,
+        tradingPair, strategyType, days, account.current_balance
+      );
+    }
+
+    // Run the simulation on the warm Python worker pool
+    let simulationResults;
+    try {
+      simulationResults = await callPythonWorker(
+        'simulate',
+        {
+          strategy_type: strategyType,
+          trading_pair: tradingPair,
+          initial_capital: account.current_balance,
+          account_id: accountId,
+          days
+        },
+        {
+          fallback: [
+            'trading_strategies.py', 'simulate', strategyType, tradingPair,
+            String(account.current_balance), String(days)
+          ]
+        }
+      );
+    } catch (error) {
+      console.error('Error executing simulation:', error);
       return NextResponse.json(
         { message: 'حدث خطأ أثناء تشغيل المحاكاة' },
         { status: 500 }
@@ -89,30 +184,11 @@ export async function POST(request: NextRequest) {
     }
     
     try {
-      const simulationResults = JSON.parse(stdout);
-      
       // Store simulation results
-      await (request as any).env.DB.prepare(
-        `INSERT INTO simulations 
-         (user_id, account_id, bot_id, trading_pair, strategy_type, initial_capital, final_capital, 
-          total_trades, profitable_trades, losing_trades, total_profit_loss, simulation_days, created_at) 
-         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)`
-      )
-        .bind(
-          decoded.userId,
-          accountId,
-          botConfig.id,
-          tradingPair,
-          strategyType,
-          simulationResults.initial_capital,
-          simulationResults.final_capital,
-          simulationResults.total_trades,
-          simulationResults.profitable_trades,
-          simulationResults.losing_trades,
-          simulationResults.total_profit_loss,
-          days
-        )
-        .run();
+      await storeSimulation(
+        (request as any).env.DB, decoded.userId, accountId, botConfig.id,
+        tradingPair, strategyType, days, simulationResults
+      );
       
       return NextResponse.json({
         message: 'تم تشغيل المحاكاة بنجاح',
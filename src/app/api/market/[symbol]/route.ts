@@ -2,9 +2,7 @@ import { NextRequest, NextResponse } from 'next/server';
 import { D1Database } from '@cloudflare/workers-types';
 import { verify } from 'jsonwebtoken';
 import { cookies } from 'next/headers';
-import { spawn } from 'child_process';
-import { promisify } from 'util';
-import path from 'path';
+import { callPythonWorker } from '@/lib/pythonWorker';
 
 interface Env {
   DB: D1Database;
@@ -45,27 +43,18 @@ export async function GET(
     const interval = searchParams.get('interval') || '1d';
     const range = searchParams.get('range') || '1mo';
     
-    // Execute Python script to get market data
-    const scriptPath = path.join(process.cwd(), 'src', 'lib', 'market_data.py');
-    
-    const exec = promisify(require('child_process').exec);
-    const { stdout, stderr } = await exec(`python3 ${scriptPath} ${symbol} ${interval} ${range}`);
-    
-    if (stderr) {
-      console.error('Error executing market data script:', stderr);
-      return NextResponse.json(
-        { message: 'حدث خطأ أثناء جلب بيانات السوق' },
-        { status: 500 }
-      );
-    }
-    
+    // Get market data from the warm Python worker pool
     try {
-      const marketData = JSON.parse(stdout);
+      const marketData = await callPythonWorker(
+        'market',
+        { symbol, interval, range },
+        { fallback: ['market_data.py', symbol, interval, range] }
+      );
       return NextResponse.json(marketData, { status: 200 });
     } catch (error) {
-      console.error('Error parsing market data:', error);
+      console.error('Error executing market data script:', error);
       return NextResponse.json(
-        { message: 'حدث خطأ أثناء معالجة بيانات السوق' },
+        { message: 'حدث خطأ أثناء جلب بيانات السوق' },
         { status: 500 }
       );
     }
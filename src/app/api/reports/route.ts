@@ -0,0 +1,248 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { D1Database } from '@cloudflare/workers-types';
+import { verify } from 'jsonwebtoken';
+import { cookies } from 'next/headers';
+
+interface Env {
+  DB: D1Database;
+}
+
+// In a production environment, this would be stored securely
+const JWT_SECRET = 'trading-bot-secret-key';
+
+// Days covered by each report period (0 = today only)
+const PERIOD_DAYS: Record<string, number | null> = {
+  day: 0,
+  week: 6,
+  month: 29,
+  year: 364,
+  all: null
+};
+
+const RECENT_TRADES_LIMIT = 50;
+
+interface DailyRollup {
+  trade_date: string;
+  trades: number;
+  profitable_trades: number;
+  losing_trades: number;
+  profit_loss: number;
+  peak_profit_loss: number;
+  trough_profit_loss: number;
+  max_drawdown: number;
+}
+
+// Daily rollup columns summed over several accounts of the same day; the running P&L of
+// different accounts is not interleaved trade by trade, so their peak, trough and
+// drawdown are combined as the largest of any single account
+const DAILY_SUM_COLUMNS = `trade_date, SUM(trades) AS trades, SUM(profitable_trades) AS profitable_trades,
+  SUM(losing_trades) AS losing_trades, SUM(profit_loss) AS profit_loss,
+  MAX(peak_profit_loss) AS peak_profit_loss, MIN(trough_profit_loss) AS trough_profit_loss,
+  MAX(max_drawdown) AS max_drawdown`;
+
+function sinceDate(period: string): string {
+  const days = PERIOD_DAYS[period];
+  if (days === null || days === undefined) {
+    return '0000-00-00';
+  }
+  const since = new Date(Date.now() - days * 86400000);
+  return since.toISOString().slice(0, 10);
+}
+
+// Largest fall of the running P&L over consecutive days (same rule as pnl_rollups.combine)
+function periodDrawdown(days: DailyRollup[]): number {
+  let cumulative = 0;
+  let peak = 0;
+  let drawdown = 0;
+  for (const day of days) {
+    drawdown = Math.max(drawdown, day.max_drawdown, peak - (cumulative + day.trough_profit_loss));
+    peak = Math.max(peak, cumulative + day.peak_profit_loss);
+    cumulative += day.profit_loss;
+  }
+  return drawdown;
+}
+
+// Latest trades of one bot, served by idx_trading_history_bot_exit_time
+function recentTrades(db: any, botId: number | string) {
+  return db.prepare(
+    `SELECT t.id, t.bot_config_id, b.trading_pair, t.entry_price, t.exit_price, t.quantity,
+            t.profit_loss, t.profit_loss_percentage, t.exit_time
+     FROM trading_history t JOIN bot_configurations b ON b.id = t.bot_config_id
+     WHERE t.bot_config_id = ?
+     ORDER BY t.exit_time DESC LIMIT ?`
+  ).bind(botId, RECENT_TRADES_LIMIT);
+}
+
+function successRate(profitable: number, total: number): number {
+  return total ? Math.round((profitable / total) * 10000) / 100 : 0;
+}
+
+export async function GET(request: NextRequest) {
+  try {
+    // Get the token from cookies
+    const cookieStore = cookies();
+    const token = cookieStore.get('auth-token')?.value;
+
+    if (!token) {
+      return NextResponse.json(
+        { message: 'غير مصرح به' },
+        { status: 401 }
+      );
+    }
+
+    // Verify the token
+    const decoded = verify(token, JWT_SECRET) as { userId: number, username: string };
+
+    const { searchParams } = new URL(request.url);
+    const period = searchParams.get('period') || 'week';
+    const botId = searchParams.get('botId') || 'all';
+
+    if (!(period in PERIOD_DAYS)) {
+      return NextResponse.json(
+        { message: 'الفترة غير صالحة' },
+        { status: 400 }
+      );
+    }
+
+    const since = sinceDate(period);
+    const db = (request as any).env.DB;
+
+    const accounts = await db.prepare(
+      'SELECT id, initial_capital, current_balance FROM accounts WHERE user_id = ?'
+    )
+      .bind(decoded.userId)
+      .all();
+
+    // Per-bot totals straight from the daily rollups (one row per bot and day)
+    const bots = await db.prepare(
+      `SELECT b.id, b.trading_pair, b.bot_type, a.initial_capital,
+              COALESCE(SUM(r.trades), 0) AS trades,
+              COALESCE(SUM(r.profitable_trades), 0) AS profitable_trades,
+              COALESCE(SUM(r.losing_trades), 0) AS losing_trades,
+              COALESCE(SUM(r.profit_loss), 0) AS profit_loss
+       FROM bot_configurations b
+       JOIN accounts a ON a.id = b.account_id
+       LEFT JOIN bot_daily_pnl r ON r.bot_config_id = b.id AND r.trade_date >= ?
+       WHERE a.user_id = ?
+       GROUP BY b.id
+       ORDER BY b.id`
+    )
+      .bind(since, decoded.userId)
+      .all();
+
+    let daily;
+    let trades: any[];
+    if (botId === 'all') {
+      daily = await db.prepare(
+        `SELECT ${DAILY_SUM_COLUMNS} FROM account_daily_pnl
+         WHERE account_id IN (SELECT id FROM accounts WHERE user_id = ?) AND trade_date >= ?
+         GROUP BY trade_date ORDER BY trade_date`
+      )
+        .bind(decoded.userId, since)
+        .all();
+
+      // One indexed lookup per bot instead of sorting every trade of the user
+      const perBot = bots.results.length
+        ? await db.batch(bots.results.map((bot: any) => recentTrades(db, bot.id)))
+        : [];
+      trades = perBot
+        .flatMap((result: any) => result.results)
+        .sort((a: any, b: any) => (a.exit_time < b.exit_time ? 1 : a.exit_time > b.exit_time ? -1 : 0))
+        .slice(0, RECENT_TRADES_LIMIT);
+    } else {
+      if (!bots.results.some((bot: any) => String(bot.id) === botId)) {
+        return NextResponse.json(
+          { message: 'البوت غير موجود أو غير مصرح به' },
+          { status: 403 }
+        );
+      }
+
+      daily = await db.prepare(
+        `SELECT ${DAILY_SUM_COLUMNS} FROM bot_daily_pnl
+         WHERE bot_config_id = ? AND trade_date >= ?
+         GROUP BY trade_date ORDER BY trade_date`
+      )
+        .bind(botId, since)
+        .all();
+
+      trades = (await recentTrades(db, botId).all()).results;
+    }
+
+    const days: DailyRollup[] = daily.results;
+    const totalTrades = days.reduce((sum, day) => sum + day.trades, 0);
+    const successfulTrades = days.reduce((sum, day) => sum + day.profitable_trades, 0);
+    const totalProfit = days.reduce((sum, day) => sum + day.profit_loss, 0);
+    const initialCapital = accounts.results.reduce((sum: number, account: any) => sum + account.initial_capital, 0);
+    const currentBalance = accounts.results.reduce((sum: number, account: any) => sum + account.current_balance, 0);
+
+    // Weeks start on Monday (UTC)
+    const weekly = new Map<string, { week: string, profit: number, trades: number, successfulTrades: number }>();
+    for (const day of days) {
+      const date = new Date(`${day.trade_date}T00:00:00Z`);
+      date.setUTCDate(date.getUTCDate() - ((date.getUTCDay() + 6) % 7));
+      const week = date.toISOString().slice(0, 10);
+      const entry = weekly.get(week) || { week, profit: 0, trades: 0, successfulTrades: 0 };
+      entry.profit += day.profit_loss;
+      entry.trades += day.trades;
+      entry.successfulTrades += day.profitable_trades;
+      weekly.set(week, entry);
+    }
+
+    return NextResponse.json({
+      summary: {
+        totalTrades,
+        successfulTrades,
+        failedTrades: totalTrades - successfulTrades,
+        successRate: successRate(successfulTrades, totalTrades),
+        initialCapital,
+        currentBalance,
+        totalProfit,
+        profitPercentage: initialCapital ? (totalProfit / initialCapital) * 100 : 0,
+        maxDrawdown: periodDrawdown(days)
+      },
+      bots: bots.results.map((bot: any) => ({
+        id: bot.id,
+        tradingPair: bot.trading_pair,
+        strategyType: bot.bot_type,
+        totalTrades: bot.trades,
+        successfulTrades: bot.profitable_trades,
+        failedTrades: bot.losing_trades,
+        successRate: successRate(bot.profitable_trades, bot.trades),
+        profit: bot.profit_loss,
+        profitPercentage: bot.initial_capital ? (bot.profit_loss / bot.initial_capital) * 100 : 0
+      })),
+      tradeHistory: trades.map((trade: any) => ({
+        id: trade.id,
+        botId: trade.bot_config_id,
+        tradingPair: trade.trading_pair,
+        entryPrice: trade.entry_price,
+        exitPrice: trade.exit_price,
+        amount: trade.quantity,
+        profit: trade.profit_loss,
+        profitPercentage: trade.profit_loss_percentage,
+        timestamp: trade.exit_time,
+        status: trade.profit_loss > 0 ? 'success' : 'failed'
+      })),
+      dailyPerformance: days.map((day) => ({
+        date: day.trade_date,
+        profit: day.profit_loss,
+        trades: day.trades,
+        successRate: successRate(day.profitable_trades, day.trades),
+        maxDrawdown: day.max_drawdown
+      })),
+      weeklyPerformance: Array.from(weekly.values()).map((week) => ({
+        week: week.week,
+        profit: week.profit,
+        trades: week.trades,
+        successRate: successRate(week.successfulTrades, week.trades)
+      }))
+    }, { status: 200 });
+
+  } catch (error) {
+    console.error('Error getting reports:', error);
+    return NextResponse.json(
+      { message: 'حدث خطأ أثناء جلب بيانات التقارير' },
+      { status: 500 }
+    );
+  }
+}
@@ -8,7 +8,7 @@ import { useAuth } from '@/hooks/useAuth';
 export default function AnalysisDashboard() {
   const [tradingPairs, setTradingPairs] = useState(['BTC-USD', 'ETH-USD', 'BNB-USD', 'SOL-USD']);
   const [selectedPair, setSelectedPair] = useState('BTC-USD');
-  const [analysis, setAnalysis] = useState(null);
+  const [analyses, setAnalyses] = useState<Record<string, any>>({});
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const { user, loading: authLoading } = useAuth();
@@ -20,19 +20,20 @@ export default function AnalysisDashboard() {
     }
   }, [user, authLoading, router]);
 
+  // Analyze the whole watchlist in one request; switching pairs then needs no round trip
   const fetchAnalysis = async () => {
     try {
       setLoading(true);
       setError('');
       
-      const response = await fetch(`/api/analysis/${selectedPair}`);
+      const response = await fetch(`/api/analysis/batch?symbols=${encodeURIComponent(tradingPairs.join(','))}`);
       
       if (!response.ok) {
         throw new Error('فشل في جلب بيانات التحليل');
       }
       
       const data = await response.json();
-      setAnalysis(data);
+      setAnalyses(data.results || {});
     } catch (err) {
       console.error('Error fetching analysis:', err);
       setError(err.message || 'حدث خطأ أثناء جلب بيانات التحليل');
@@ -42,10 +43,11 @@ export default function AnalysisDashboard() {
   };
 
   useEffect(() => {
-    if (selectedPair) {
-      fetchAnalysis();
-    }
-  }, [selectedPair]);
+    fetchAnalysis();
+  }, [tradingPairs]);
+
+  const analysis = analyses[selectedPair]?.error ? null : analyses[selectedPair];
+  const pairError = analyses[selectedPair]?.error;
 
   return (
     <div className="min-h-screen bg-gray-50">
@@ -87,12 +89,12 @@ export default function AnalysisDashboard() {
           </button>
         </div>
         
-        {error && (
+        {(error || pairError) && (
           <div className="rounded-md bg-red-50 p-4 mb-6">
             <div className="flex">
               <div className="mr-3">
                 <div className="text-sm text-red-700">
-                  {error}
+                  {error || pairError}
                 </div>
               </div>
             </div>
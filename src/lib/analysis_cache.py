@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from candle_series import CANDLE_FIELDS
+
+# Analysis results shared by every worker process (and kept across restarts)
+DEFAULT_CACHE_DIR = os.environ.get('TRADING_ANALYSIS_CACHE_DIR', '/tmp/trading-bot-analyses')
+
+# Set TRADING_ANALYSIS_CACHE=0 to always recompute
+CACHE_ENABLED = os.environ.get('TRADING_ANALYSIS_CACHE', '1') != '0'
+
+# Seconds a result is served for the same inputs. Identical inputs give identical results,
+# but predictions are dated from today and sentiment reads text that changes upstream.
+ANALYSIS_TTLS = {
+    'lstm': 6 * 3600,
+    'linear_regression': 3600,
+    'sentiment': 900,
+    'technical': 300,
+    'comprehensive': 300
+}
+
+DEFAULT_TTL = 300
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_DISK_BYTES = 64 * 1024 * 1024
+
+# Disk eviction removes the oldest files until the tier is back under this fraction of its limit
+DISK_EVICTION_TARGET = 0.8
+
+
+def series_digest(series):
+    """
+    Hash of the exact candles an analysis reads
+
+    Args:
+        series: CandleSeries
+
+    Returns:
+        Hex digest (16 characters)
+    """
+    digest = hashlib.sha1()
+    for field in CANDLE_FIELDS:
+        digest.update(np.ascontiguousarray(getattr(series, field)).tobytes())
+    digest.update(np.ascontiguousarray(series.valid).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def payload_digest(payload):
+    """Hash of a JSON-serializable payload (insights responses), independent of key order"""
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def analysis_key(symbol, analysis_type, inputs_digest, params=None):
+    """Cache key of one analysis of one symbol on one set of inputs"""
+    raw = json.dumps([symbol, analysis_type, inputs_digest, params or {}], sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Content-addressed analysis results: memory LRU in front of a shared disk directory
+
+    - Keys hash the symbol, analysis type, parameters and a digest of the input candles
+      or insights, so a result is only reused for exactly the inputs it was computed from
+    - Entries expire after ANALYSIS_TTLS[type] seconds (wall clock, so every process agrees)
+    - The memory tier keeps at most max_entries results; the disk tier is trimmed to
+      max_disk_bytes, oldest files first
+    - Expired entries are kept on disk until evicted, so callers can tell inputs seen
+      before (expired) from new inputs (miss)
+    - Error results are never cached
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES, ttls=None, clock=time.time):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttls = dict(ANALYSIS_TTLS, **(ttls or {}))
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self.stats = {
+            'hits': 0,
+            'disk_hits': 0,
+            'expired': 0,
+            'misses': 0,
+            'evictions': 0,
+            'disk_evictions': 0
+        }
+
+    def ttl_for(self, analysis_type):
+        return self.ttls.get(analysis_type, DEFAULT_TTL)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def lookup(self, key):
+        """
+        Find an entry in memory, then on disk
+
+        Returns:
+            (status, value): status is 'hit', 'expired' or 'miss'; value is None unless hit
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if now < entry[0]:
+                    self.stats['hits'] += 1
+                    return 'hit', entry[1]
+
+        try:
+            with open(self._path(key)) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = None
+
+        with self._lock:
+            if stored is None:
+                if entry is not None:
+                    self.stats['expired'] += 1
+                    return 'expired', None
+                self.stats['misses'] += 1
+                return 'miss', None
+            if now >= stored['expires_at']:
+                self.stats['expired'] += 1
+                return 'expired', None
+
+            self.stats['disk_hits'] += 1
+            self._remember(key, stored['expires_at'], stored['value'])
+            return 'hit', stored['value']
+
+    def store(self, key, analysis_type, value):
+        """Store a result in both tiers unless it is an error result"""
+        if isinstance(value, dict) and 'error' in value:
+            return
+
+        expires_at = self.clock() + self.ttl_for(analysis_type)
+        with self._lock:
+            self._remember(key, expires_at, value)
+
+        path = self._path(key)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'w') as f:
+                json.dump({'type': analysis_type, 'expires_at': expires_at, 'value': value}, f)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            # The result is still cached in memory; only persistence failed
+            print(f"Could not save analysis result: {str(e)}", file=sys.stderr)
+            return
+        self._account_disk(size)
+
+    def get_or_compute(self, symbol, analysis_type, inputs_digest, compute, params=None):
+        """
+        Return the cached result for these inputs or compute and store it
+
+        Args:
+            symbol: Trading pair symbol
+            analysis_type: Key of ANALYSIS_TTLS
+            inputs_digest: series_digest / payload_digest of everything the analysis reads
+            compute: Callable with no arguments returning the result
+            params: Optional parameters that change the result
+
+        Returns:
+            (value, status): status is 'hit', 'expired' (recomputed for inputs seen before) or 'miss'
+        """
+        key = analysis_key(symbol, analysis_type, inputs_digest, params)
+        status, value = self.lookup(key)
+        if status == 'hit':
+            return value, status
+
+        value = compute()
+        self.store(key, analysis_type, value)
+        return value, status
+
+    def _remember(self, key, expires_at, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _disk_files(self):
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _account_disk(self, size):
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += size
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+
+            # Other processes write here too: recount from the directory before trimming
+            files = sorted(self._disk_files())
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= self.max_disk_bytes * DISK_EVICTION_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.stats['disk_evictions'] += 1
+            self._disk_bytes = total
+
+    def get_stats(self):
+        """Hit/miss counters of both tiers and the size of the memory tier"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            stats['disk_bytes'] = self._disk_bytes
+        lookups = stats['hits'] + stats['disk_hits'] + stats['expired'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        stats['cache_dir'] = self.cache_dir
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_analysis_cache():
+    """Process-wide analysis cache, or None when TRADING_ANALYSIS_CACHE=0"""
+    global _shared_cache
+    if not CACHE_ENABLED:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = AnalysisCache()
+        return _shared_cache
@@ -0,0 +1,264 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from market_data_cache import RANGE_SECONDS
+from analysis_cache import series_digest, payload_digest, analysis_key
+
+# Sub-analyses of comprehensive_analysis, in the order of its result
+ANALYSIS_STAGES = ('lstm', 'linear_regression', 'sentiment', 'technical')
+
+# Candles each chart-based stage reads: (interval, range)
+STAGE_CHARTS = {
+    'lstm': ('1d', '3mo'),
+    'linear_regression': ('1d', '1mo'),
+    'technical': ('1d', '1mo')
+}
+
+# Stages that read the insights response instead of candles
+INSIGHTS_STAGES = ('sentiment',)
+
+# Parameters that change a stage's result (part of its analysis cache key)
+STAGE_PARAMS = {
+    'lstm': {'days_to_predict': 7, 'forecast_mode': 'recursive'},
+    'linear_regression': {'days_to_predict': 7}
+}
+
+# Threads running fetches and stages; LSTM inference and numpy release the GIL
+DEFAULT_STAGE_WORKERS = int(os.environ.get('TRADING_ANALYSIS_STAGE_WORKERS', 4))
+
+
+def plan_fetches(stages=ANALYSIS_STAGES):
+    """
+    Charts to fetch for a set of stages: the widest range of every interval
+
+    Args:
+        stages: Names from ANALYSIS_STAGES
+
+    Returns:
+        Dictionary of interval to range
+    """
+    charts = {}
+    for stage in stages:
+        if stage not in STAGE_CHARTS:
+            continue
+        interval, data_range = STAGE_CHARTS[stage]
+        if interval not in charts or RANGE_SECONDS[data_range] > RANGE_SECONDS[charts[interval]]:
+            charts[interval] = data_range
+    return charts
+
+
+def slice_market_data(market_data, data_range, now=None):
+    """
+    Narrow fetched market data to a shorter range without copying the candles
+
+    Bars are kept from `data_range` before `now`, the same cut candle_store applies
+    when it serves a range from stored candles.
+
+    Args:
+        market_data: Result of process_market_series (errors are returned as is)
+        data_range: Range to keep (one of RANGE_SECONDS)
+        now: Epoch seconds the range ends at (default: now)
+
+    Returns:
+        Shallow copy of market_data whose series is a view of the last `data_range`
+    """
+    if 'error' in market_data:
+        return market_data
+
+    now = time.time() if now is None else now
+    return dict(market_data, series=market_data['series'].since(now - RANGE_SECONDS[data_range]))
+
+
+class AnalysisPlanner:
+    """
+    Runs the sub-analyses of a comprehensive analysis from one fetch per dataset
+
+    - Every interval is fetched once, at the widest range any stage needs; each stage
+      gets a zero-copy slice of its own range (see plan_fetches / slice_market_data)
+    - Charts and insights are fetched in parallel, then independent stages run in
+      parallel on the same thread pool
+    - iter_comprehensive() yields each stage's result as soon as it finishes, then the
+      combined result
+    - With the analyzer's analysis cache, stages and the combined result are reused
+      for inputs analyzed before (see analysis_cache)
+    """
+
+    def __init__(self, analyzer, workers=DEFAULT_STAGE_WORKERS, clock=time.time):
+        self.analyzer = analyzer
+        self.clock = clock
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis-stage')
+
+    def fetch_inputs(self, symbol, stages=ANALYSIS_STAGES, insights=None):
+        """
+        Fetch every dataset the stages read, once each
+
+        Args:
+            symbol: Trading pair symbol
+            stages: Names from ANALYSIS_STAGES
+            insights: Optional insights response already fetched for the symbol
+
+        Returns:
+            Dictionary of stage name to its input (sliced market data, or the insights response)
+        """
+        market_service = self.analyzer.market_service
+        charts = {
+            interval: self.pool.submit(market_service.process_market_series, symbol, interval=interval, range=data_range)
+            for interval, data_range in plan_fetches(stages).items()
+        }
+        if insights is None and any(stage in INSIGHTS_STAGES for stage in stages):
+            insights = self.pool.submit(market_service.get_stock_insights, symbol).result()
+        charts = {interval: future.result() for interval, future in charts.items()}
+
+        now = self.clock()
+        inputs = {}
+        for stage in stages:
+            if stage in STAGE_CHARTS:
+                interval, data_range = STAGE_CHARTS[stage]
+                inputs[stage] = slice_market_data(charts[interval], data_range, now)
+            else:
+                inputs[stage] = insights
+        return inputs
+
+    def _digests(self, inputs):
+        """Cache digests of the stage inputs; stages whose input is an error get none"""
+        digests = {}
+        for stage, data in inputs.items():
+            if not data or 'error' in data:
+                continue
+            digests[stage] = series_digest(data['series']) if 'series' in data else payload_digest(data)
+        return digests
+
+    def _run_stage(self, symbol, stage, data, digest):
+        analyzer = self.analyzer
+        if stage == 'lstm':
+            compute = lambda: analyzer.predict_with_lstm(symbol, market_data=data, **STAGE_PARAMS['lstm'])
+        elif stage == 'linear_regression':
+            compute = lambda: analyzer.predict_with_linear_regression(
+                symbol, market_data=data, **STAGE_PARAMS['linear_regression']
+            )
+        elif stage == 'sentiment':
+            compute = lambda: analyzer.analyze_market_sentiment(symbol, insights=data)
+        elif stage == 'technical':
+            compute = lambda: analyzer.analyze_technical_indicators(symbol, market_data=data)
+        else:
+            raise ValueError(f'Unknown analysis stage: {stage}')
+
+        if analyzer.analysis_cache is None or digest is None:
+            return compute(), 'miss'
+        return analyzer.analysis_cache.get_or_compute(symbol, stage, digest, compute, STAGE_PARAMS.get(stage))
+
+    def iter_stages(self, symbol, stages=ANALYSIS_STAGES, insights=None, inputs=None):
+        """
+        Run stages in parallel and yield each result as it finishes
+
+        Yields:
+            {'stage': name, 'result': stage result, 'cache': cache status}
+        """
+        inputs = self.fetch_inputs(symbol, stages, insights) if inputs is None else inputs
+        digests = self._digests(inputs)
+        futures = {
+            self.pool.submit(self._run_stage, symbol, stage, inputs[stage], digests.get(stage)): stage
+            for stage in stages
+        }
+        for future in as_completed(futures):
+            stage = futures[future]
+            try:
+                result, status = future.result()
+            except Exception as e:
+                result, status = {'error': f'Error in {stage} analysis: {str(e)}'}, 'miss'
+            yield {'stage': stage, 'result': result, 'cache': status}
+
+    def iter_comprehensive(self, symbol, insights=None):
+        """
+        Comprehensive analysis as a stream of stage results
+
+        Yields:
+            One {'stage', 'result', 'cache'} event per stage in ANALYSIS_STAGES, then
+            {'stage': 'comprehensive', 'result': ...} with the combined result
+        """
+        analyzer = self.analyzer
+        cache = analyzer.analysis_cache
+        inputs = self.fetch_inputs(symbol, ANALYSIS_STAGES, insights)
+        digests = self._digests(inputs)
+        complete = len(digests) == len(ANALYSIS_STAGES)
+
+        key = None
+        if cache is not None and complete:
+            combined_digest = payload_digest(digests)
+            key = analysis_key(symbol, 'comprehensive', combined_digest)
+            status, cached = cache.lookup(key)
+            if status == 'hit':
+                for stage, result in stage_results(cached).items():
+                    yield {'stage': stage, 'result': result, 'cache': 'hit'}
+                yield {'stage': 'comprehensive',
+                       'result': dict(cached, cache=_cache_info(status, combined_digest))}
+                return
+        else:
+            status = 'miss'
+
+        results = {}
+        for event in self.iter_stages(symbol, ANALYSIS_STAGES, inputs=inputs):
+            results[event['stage']] = event['result']
+            yield event
+
+        combined = analyzer.combine_analyses(symbol, results)
+        if key is not None and any('error' in result for result in results.values()):
+            # A failed stage is not cached, so the combined result must not be either
+            combined = dict(combined, cache={'status': status, 'inputs_digest': combined_digest,
+                                             'inputs_changed': True})
+        elif key is not None:
+            cache.store(key, 'comprehensive', combined)
+            combined = dict(combined, cache=_cache_info(status, combined_digest))
+        elif cache is not None:
+            # Inputs could not be fetched: nothing was cached, report them as new
+            combined = dict(combined, cache={'status': 'miss', 'inputs_changed': True})
+        yield {'stage': 'comprehensive', 'result': combined}
+
+    def run(self, symbol, insights=None):
+        """Comprehensive analysis of a symbol (the last event of iter_comprehensive)"""
+        result = None
+        for event in self.iter_comprehensive(symbol, insights):
+            result = event['result']
+        return result
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
+
+
+def _cache_info(status, combined_digest):
+    return {'status': status, 'inputs_digest': combined_digest, 'inputs_changed': status == 'miss'}
+
+
+def stage_results(comprehensive):
+    """Stage results contained in a comprehensive_analysis result, keyed like ANALYSIS_STAGES"""
+    sentiment = comprehensive['sentiment_analysis']
+    return {
+        'lstm': comprehensive['price_predictions']['lstm'],
+        'linear_regression': comprehensive['price_predictions']['linear_regression'],
+        'sentiment': sentiment if 'error' in sentiment else {'symbol': comprehensive['symbol'], 'sentiment': sentiment},
+        'technical': comprehensive['technical_analysis']
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Comprehensive analysis from one fetch per dataset')
+    parser.add_argument('symbol')
+    parser.add_argument('--stream', action='store_true', help='Print every stage as it finishes (NDJSON)')
+    args = parser.parse_args()
+
+    from market_analysis import MarketAnalysisAI
+
+    planner = AnalysisPlanner(MarketAnalysisAI())
+    try:
+        if args.stream:
+            for event in planner.iter_comprehensive(args.symbol):
+                sys.stdout.write(json.dumps(event) + '\n')
+                sys.stdout.flush()
+        else:
+            print(json.dumps(planner.run(args.symbol)))
+    finally:
+        planner.shutdown()
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from market_data_cache import get_shared_cache
+from data_providers import DEFAULT_PROVIDER_MODE, create_provider, get_default_provider
+from market_data import (
+    chart_request, validate_chart_response, validate_insights_response,
+    parse_market_series, to_legacy_format
+)
+
+# Upstream calls running at the same time (one pooled client per slot)
+DEFAULT_POOL_SIZE = int(os.environ.get('TRADING_UPSTREAM_POOL_SIZE', 8))
+
+# Seconds allowed for one upstream call before it is abandoned and retried
+DEFAULT_CALL_TIMEOUT = float(os.environ.get('TRADING_UPSTREAM_TIMEOUT', 15))
+
+DEFAULT_RETRIES = 2
+
+# Base delay of the exponential backoff between retries, in seconds
+DEFAULT_BACKOFF = 0.25
+
+
+def _default_client_factory():
+    # Live clients are not shared between threads; recordings and fake data are
+    if DEFAULT_PROVIDER_MODE in ('live', 'record'):
+        return create_provider()
+    return get_default_provider()
+
+
+class ClientPool:
+    """
+    Fixed set of blocking upstream clients driven from asyncio
+
+    Each call borrows an idle client and runs it on a dedicated thread, so at most
+    `size` calls are in flight and the event loop never blocks. A client whose call
+    timed out may still be running, so it is replaced instead of being reused.
+    """
+
+    def __init__(self, client_factory, size=DEFAULT_POOL_SIZE):
+        self.client_factory = client_factory
+        self.size = size
+        self._idle = [client_factory() for _ in range(size)]
+        self._slots = None
+        # Twice the pool size: an abandoned (timed out) call keeps its thread until upstream answers
+        self._executor = ThreadPoolExecutor(max_workers=size * 2, thread_name_prefix='upstream')
+
+    async def call(self, endpoint, query, timeout):
+        if self._slots is None:
+            # Created lazily so the semaphore belongs to the running loop
+            self._slots = asyncio.Semaphore(self.size)
+
+        async with self._slots:
+            client = self._idle.pop()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, client.call_api, endpoint, query)
+            try:
+                result = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self._idle.append(self.client_factory())
+                raise
+            except BaseException:
+                self._idle.append(client)
+                raise
+            self._idle.append(client)
+            return result
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class AsyncMarketDataService:
+    """
+    asyncio version of MarketDataService
+
+    - Upstream calls go through a bounded ClientPool
+    - Concurrent requests for the same chart or insights share one upstream call
+    - Every call has a timeout and is retried with jittered exponential backoff
+    - Processed charts use the same TTL cache as MarketDataService (shared by default)
+    """
+
+    def __init__(self, client_factory=None, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_CALL_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, cache=None, use_cache=True):
+        self.pool = ClientPool(client_factory or _default_client_factory, pool_size)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        if use_cache:
+            self.cache = cache if cache is not None else get_shared_cache()
+        else:
+            self.cache = None
+
+        self._in_flight = {}
+        self.stats = {
+            'requests': 0,
+            'upstream_calls': 0,
+            'coalesced': 0,
+            'retries': 0,
+            'timeouts': 0,
+            'errors': 0
+        }
+
+    async def _call_with_retry(self, endpoint, query):
+        for attempt in range(self.retries + 1):
+            self.stats['upstream_calls'] += 1
+            try:
+                return await self.pool.call(endpoint, query, self.timeout)
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                error = f'Upstream call timed out after {self.timeout} seconds'
+            except Exception as e:
+                error = str(e)
+
+            if attempt < self.retries:
+                self.stats['retries'] += 1
+                # Jitter keeps many bots from retrying in lockstep
+                await asyncio.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+        self.stats['errors'] += 1
+        return {'error': error}
+
+    async def _coalesced(self, key, load):
+        """Run load() once for concurrent callers with the same key"""
+        self.stats['requests'] += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(load())
+        self._in_flight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._in_flight.pop(key, None)
+            else:
+                # The caller was cancelled; keep the load for the other waiters
+                future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+    async def get_stock_data(self, symbol, interval='1d', range='1mo'):
+        """
+        Fetch stock market data using Yahoo Finance API
+
+        Args:
+            symbol: The trading pair symbol (e.g., 'BTC-USD')
+            interval: Data interval
+            range: Data range
+
+        Returns:
+            Dictionary containing the market data
+        """
+        async def load():
+            data = await self._call_with_retry('YahooFinance/get_stock_chart', chart_request(symbol, interval, range))
+            return data if 'error' in data else validate_chart_response(data)
+
+        return await self._coalesced(('chart', symbol, interval, range), load)
+
+    async def get_stock_insights(self, symbol):
+        """
+        Fetch stock insights and analysis using Yahoo Finance API
+
+        Args:
+            symbol: The trading pair symbol (e.g., 'BTC-USD')
+
+        Returns:
+            Dictionary containing the insights data
+        """
+        async def load():
+            data = await self._call_with_retry('YahooFinance/get_stock_insights', {'symbol': symbol})
+            return data if 'error' in data else validate_insights_response(data)
+
+        return await self._coalesced(('insights', symbol), load)
+
+    async def process_market_series(self, symbol, interval='1d', range='1mo'):
+        """
+        Processed market data with a 'series' CandleSeries (see MarketDataService.process_market_series)
+        """
+        if self.cache is not None:
+            cached = self.cache.lookup(symbol, interval, range)
+            if cached is not None:
+                return cached
+
+        async def load():
+            market_data = parse_market_series(await self.get_stock_data(symbol, interval, range))
+            if self.cache is not None:
+                self.cache.store(symbol, interval, range, market_data)
+            return market_data
+
+        return await self._coalesced(('series', symbol, interval, range), load)
+
+    async def process_market_data(self, symbol, interval='1d', range='1mo'):
+        """Processed market data in the JSON-facing format with one dictionary per candle"""
+        return to_legacy_format(await self.process_market_series(symbol, interval, range))
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['pool_size'] = self.pool.size
+        stats['in_flight'] = len(self._in_flight)
+        return stats
+
+    async def close(self):
+        self.pool.close()
+
+
+def _benchmark_cache(use_cache):
+    # Each run gets its own cache, so neither mode starts with entries from the other
+    from market_data_cache import MarketDataCache
+    return MarketDataCache() if use_cache else None
+
+
+async def _benchmark_async(symbols, requests, latency, pool_size, use_cache):
+    from fake_upstream import FakeUpstreamClient
+
+    upstream = FakeUpstreamClient(latency=latency)
+    service = AsyncMarketDataService(lambda: upstream, pool_size=pool_size,
+                                     cache=_benchmark_cache(use_cache), use_cache=use_cache)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        service.process_market_series(symbols[i % len(symbols)], '1d', '3mo') for i in range(requests)
+    ))
+    elapsed = time.perf_counter() - start
+    await service.close()
+
+    return {
+        'mode': f'async (pool of {pool_size})',
+        'cache': use_cache,
+        'requests': requests,
+        'upstream_calls': upstream.calls,
+        'coalesced': service.stats['coalesced'],
+        'seconds': elapsed,
+        'requests_per_second': requests / elapsed
+    }
+
+
+def _benchmark_sync(symbols, requests, latency, use_cache):
+    from fake_upstream import FakeUpstreamClient
+    from market_data import MarketDataService
+
+    upstream = FakeUpstreamClient(latency=latency)
+    service = MarketDataService(client=upstream, cache=_benchmark_cache(use_cache), use_cache=use_cache)
+
+    start = time.perf_counter()
+    for i in range(requests):
+        service.process_market_series(symbols[i % len(symbols)], '1d', '3mo')
+    elapsed = time.perf_counter() - start
+
+    return {
+        'mode': 'sync',
+        'cache': use_cache,
+        'requests': requests,
+        'upstream_calls': upstream.calls,
+        'coalesced': 0,
+        'seconds': elapsed,
+        'requests_per_second': requests / elapsed
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark MarketDataService against the async service on a fake upstream')
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated upstream latency in seconds')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE)
+    parser.add_argument('--cache', choices=('off', 'on', 'both'), default='both',
+                        help='Run both services without, with, or both without and with a market data cache')
+    args = parser.parse_args()
+
+    # Both services always run with the same cache setting, so the comparison measures
+    # concurrency and coalescing rather than the cache
+    symbols = [f'SYM{i}-USD' for i in range(args.symbols)]
+    results = []
+    for use_cache in {'off': (False,), 'on': (True,), 'both': (False, True)}[args.cache]:
+        results.append(_benchmark_sync(symbols, args.requests, args.latency, use_cache))
+        results.append(asyncio.run(_benchmark_async(symbols, args.requests, args.latency, args.pool_size, use_cache)))
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,297 @@
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+
+from monte_carlo import WEEKLY_WINDOW_DAYS, strategy_parameters, trade_factor_table, apply_trading_day
+
+# Bars scanned per entry in the first pass; entries still open afterwards are rescanned with twice the window
+INITIAL_LOOKAHEAD = 32
+
+# Upper bound on the (entries, lookahead) arrays of one scan, in elements
+MAX_SCAN_ELEMENTS = 8_000_000
+
+
+def schedule_entries(timestamps, trades_per_day):
+    """
+    Spread trades_per_day entries evenly over the bars of each UTC day
+
+    Days with fewer bars than trades get several entries on the same bar. The first
+    two bars are skipped because the direction rule looks at the two previous closes.
+
+    Args:
+        timestamps: Bar start times (epoch seconds), ascending
+        trades_per_day: Entries per day
+
+    Returns:
+        (entry_index, entry_day): bar index of every entry and the day number (epoch days) it belongs to
+    """
+    if len(timestamps) < 3:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    days = np.asarray(timestamps[2:], dtype=np.int64) // 86400
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(days)) + 1))
+    counts = np.diff(np.concatenate((starts, [len(days)])))
+
+    offsets = np.arange(trades_per_day)[None, :] * counts[:, None] // trades_per_day
+    entry_index = (starts[:, None] + offsets).reshape(-1) + 2
+    entry_day = np.repeat(days[starts], trades_per_day)
+    return entry_index, entry_day
+
+
+def first_hits(high, low, entry_index, upper, lower, lookahead=INITIAL_LOOKAHEAD):
+    """
+    First bar at or after each entry whose high reaches `upper` or whose low reaches `lower`
+
+    All entries are scanned together over a window of bars; entries that touch neither
+    level are rescanned from the end of that window with a window twice as long, so the
+    total work stays close to the number of bars each trade is actually open.
+
+    Args:
+        high: Bar highs
+        low: Bar lows
+        entry_index: Bar index of each entry (the entry bar itself is included)
+        upper: Price level above the entry, per entry
+        lower: Price level below the entry, per entry
+
+    Returns:
+        (upper_hit, lower_hit): bar index of the first touch of each level, len(high) when never touched
+    """
+    bars = len(high)
+    entries = len(entry_index)
+    upper_hit = np.full(entries, bars, dtype=np.int64)
+    lower_hit = np.full(entries, bars, dtype=np.int64)
+
+    pending = np.arange(entries)
+    scan_from = np.asarray(entry_index, dtype=np.int64).copy()
+
+    while len(pending):
+        # Pad so every window has `lookahead` bars; padding never touches a level
+        padded_high = np.concatenate((high, np.full(lookahead, -np.inf)))
+        padded_low = np.concatenate((low, np.full(lookahead, np.inf)))
+        chunk = max(1, MAX_SCAN_ELEMENTS // lookahead)
+        offsets = np.arange(lookahead)
+        still_open = []
+
+        for start in range(0, len(pending), chunk):
+            rows = pending[start:start + chunk]
+            window = scan_from[rows, None] + offsets
+
+            touches_upper = padded_high[window] >= upper[rows, None]
+            touches_lower = padded_low[window] <= lower[rows, None]
+            any_upper = touches_upper.any(axis=1)
+            any_lower = touches_lower.any(axis=1)
+
+            upper_hit[rows[any_upper]] = scan_from[rows[any_upper]] + touches_upper[any_upper].argmax(axis=1)
+            lower_hit[rows[any_lower]] = scan_from[rows[any_lower]] + touches_lower[any_lower].argmax(axis=1)
+
+            # A level first touched in a later window cannot come before one touched in this window
+            open_rows = rows[~(any_upper | any_lower)]
+            still_open.append(open_rows[scan_from[open_rows] + lookahead < bars])
+
+        pending = np.concatenate(still_open) if still_open else np.empty(0, dtype=np.int64)
+        scan_from[pending] += lookahead
+        lookahead *= 2
+
+    return upper_hit, lower_hit
+
+
+def resolve_trades(series, params, trades_per_day):
+    """
+    Entry, direction and outcome of every scheduled trade
+
+    Direction follows execute_trade (buy when the last close rose, sell otherwise).
+    Take profit and stop loss are resting orders filled at their level; when one bar
+    touches both levels the stop loss is assumed to come first.
+
+    Args:
+        series: CandleSeries with valid bars only
+        params: Dictionary from monte_carlo.strategy_parameters
+        trades_per_day: Entries per day
+
+    Returns:
+        Dictionary of per-trade arrays (resolved trades only) and the count of trades still open at the end
+    """
+    entry_index, entry_day = schedule_entries(series.timestamp, trades_per_day)
+    entry_price = series.open[entry_index]
+    is_buy = series.close[entry_index - 1] > series.close[entry_index - 2]
+
+    take_profit = params['take_profit_percentage'] / 100
+    stop_loss = params['stop_loss_percentage'] / 100
+    upper = entry_price * np.where(is_buy, 1 + take_profit, 1 + stop_loss)
+    lower = entry_price * np.where(is_buy, 1 - stop_loss, 1 - take_profit)
+
+    upper_hit, lower_hit = first_hits(series.high, series.low, entry_index, upper, lower)
+    exit_index = np.minimum(upper_hit, lower_hit)
+    resolved = exit_index < len(series)
+
+    win = np.where(is_buy, upper_hit < lower_hit, lower_hit < upper_hit)
+    same_bar = resolved & (upper_hit == lower_hit)
+
+    return {
+        'entry_index': entry_index[resolved],
+        'exit_index': exit_index[resolved],
+        'entry_day': entry_day[resolved],
+        'is_buy': is_buy[resolved],
+        'win': win[resolved],
+        'same_bar_exits': int(same_bar.sum()),
+        'unresolved_trades': int((~resolved).sum())
+    }
+
+
+def backtest(series, params, trades_per_day=1000, trades=None):
+    """
+    Replay a strategy's rules over historical candles
+
+    Trades are applied in entry order with the loss multiplier and weekly loss limit
+    of run_simulation (monte_carlo.apply_trading_day on a single path); only their
+    outcomes come from the candles instead of a weighted coin.
+
+    Args:
+        series: CandleSeries of the trading pair (any interval), valid bars only
+        params: Dictionary from monte_carlo.strategy_parameters
+        trades_per_day: Entries per day
+        trades: Optional resolve_trades result to reuse (it only depends on the take profit and stop loss)
+
+    Returns:
+        Dictionary in the run_simulation format plus backtest statistics
+    """
+    initial_capital = params['initial_capital']
+    if trades is None:
+        trades = resolve_trades(series, params, trades_per_day)
+    factor_table = trade_factor_table(params)
+
+    capital = np.array([initial_capital])
+    loss_run = np.zeros(1, dtype=np.int64)
+    peak = capital.copy()
+    active = np.ones(1, dtype=bool)
+    max_drawdown = 0.0
+    day_start_capital = []
+    daily_results = []
+    stop_day = None
+
+    days, day_starts = np.unique(trades['entry_day'], return_index=True)
+    day_ends = np.append(day_starts[1:], len(trades['entry_day']))
+
+    for number, (day, start, end) in enumerate(zip(days, day_starts, day_ends)):
+        # Weekly window in calendar days, so days without candles (weekends, gaps) still count
+        day_start_capital.append(capital.copy())
+        week_start_capital = day_start_capital[int(np.searchsorted(days, day - WEEKLY_WINDOW_DAYS + 1))]
+
+        wins = trades['win'][start:end][None, :]
+        result = apply_trading_day(wins, capital, loss_run, peak, week_start_capital, active, params, factor_table)
+
+        daily_profit_loss = float(result['capital'][0] - capital[0])
+        executed = int(result['trades'][0])
+        profitable = int(result['profitable_trades'][0])
+        daily_results.append({
+            'day': number + 1,
+            'date': datetime.fromtimestamp(int(day) * 86400, tz=timezone.utc).strftime('%Y-%m-%d'),
+            'starting_capital': float(capital[0]),
+            'ending_capital': float(result['capital'][0]),
+            'daily_profit_loss': daily_profit_loss,
+            'daily_profit_loss_percentage': daily_profit_loss / float(capital[0]) * 100 if capital[0] > 0 else 0,
+            'trades': executed,
+            'profitable_trades': profitable,
+            'losing_trades': executed - profitable
+        })
+
+        capital = result['capital']
+        loss_run = result['loss_run']
+        peak = result['peak']
+        max_drawdown = max(max_drawdown, float(result['max_drawdown'][0]))
+        if result['stopped'][0]:
+            stop_day = number + 1
+            break
+
+    total_trades = sum(day['trades'] for day in daily_results)
+    profitable_trades = sum(day['profitable_trades'] for day in daily_results)
+    final_capital = float(capital[0])
+    held = trades['exit_index'] - trades['entry_index'] + 1
+
+    return {
+        'initial_capital': initial_capital,
+        'final_capital': final_capital,
+        'total_trades': total_trades,
+        'profitable_trades': profitable_trades,
+        'losing_trades': total_trades - profitable_trades,
+        'total_profit_loss': final_capital - initial_capital,
+        'total_profit_loss_percentage': (final_capital - initial_capital) / initial_capital * 100,
+        'max_drawdown_percentage': max_drawdown * 100,
+        'stopped_on_day': stop_day,
+        'daily_results': daily_results,
+        'bars': len(series),
+        'win_rate': profitable_trades / total_trades if total_trades else 0.0,
+        'average_bars_held': float(held.mean()) if len(held) else 0.0,
+        'same_bar_exits': trades['same_bar_exits'],
+        'unresolved_trades': trades['unresolved_trades']
+    }
+
+
+def run_backtest(strategy, interval='1m', range='5d', trades_per_day=1000, series=None):
+    """
+    Backtest a strategy instance on its trading pair
+
+    Args:
+        strategy: ThousandTradesStrategy or TenTradesStrategy instance
+        interval: Candle interval to fetch
+        range: Data range to fetch (Yahoo serves 1m candles for the last few days only;
+               pass a longer series from candle_store or a recording for more)
+        trades_per_day: Entries per day
+        series: Optional CandleSeries to use instead of fetching
+
+    Returns:
+        Dictionary with the backtest results or an error
+    """
+    if series is None:
+        market_data = strategy.market_service.process_market_series(strategy.trading_pair, interval=interval, range=range)
+        if 'error' in market_data:
+            return {'status': 'error', 'message': f"خطأ في الحصول على بيانات السوق: {market_data['error']}"}
+        series = market_data['series']
+
+    series = series.compact()
+    if len(series) < 3:
+        return {'status': 'error', 'message': 'لا توجد بيانات كافية للاختبار التاريخي'}
+
+    result = backtest(series, strategy_parameters(strategy), trades_per_day)
+    result['trading_pair'] = strategy.trading_pair
+    result['interval'] = interval
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backtest a strategy on historical or synthetic candles')
+    parser.add_argument('strategy_type', choices=('thousand_trades', 'ten_trades'))
+    parser.add_argument('trading_pair')
+    parser.add_argument('initial_capital', type=float)
+    parser.add_argument('--interval', help='Candle interval (defaults to the one execute_trade reads)')
+    parser.add_argument('--range', help='Data range (defaults to the longest Yahoo serves for the interval)')
+    parser.add_argument('--trades-per-day', type=int)
+    parser.add_argument('--synthetic-days', type=int, help='Use this many days of synthetic candles instead of fetching')
+    parser.add_argument('--summary', action='store_true', help='Leave out the daily results')
+    args = parser.parse_args()
+
+    from trading_strategies import ThousandTradesStrategy, TenTradesStrategy
+
+    strategy_class = ThousandTradesStrategy if args.strategy_type == 'thousand_trades' else TenTradesStrategy
+    strategy = strategy_class(None, args.trading_pair, args.initial_capital)
+    options = {key: value for key, value in (('interval', args.interval), ('range', args.range),
+                                             ('trades_per_day', args.trades_per_day)) if value is not None}
+
+    if args.synthetic_days:
+        from fake_upstream import synthetic_candles
+        from market_data_cache import INTERVAL_SECONDS
+        from candle_series import CandleSeries
+
+        interval_seconds = INTERVAL_SECONDS[options.setdefault('interval', '1m')]
+        candles = synthetic_candles(args.trading_pair, args.synthetic_days * 86400 // interval_seconds,
+                                    interval_seconds, volatility=0.001)
+        options['series'] = CandleSeries(**candles)
+
+    result = strategy.run_backtest(**options)
+    if args.summary:
+        result.pop('daily_results', None)
+    print(json.dumps(result))
+    if result.get('status') == 'error':
+        sys.exit(1)
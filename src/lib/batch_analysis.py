@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis_planner import ANALYSIS_STAGES, plan_fetches
+
+# Concurrent upstream requests (charts and insights) across the whole batch
+DEFAULT_IO_WORKERS = int(os.environ.get('TRADING_ANALYSIS_IO_WORKERS', 8))
+
+# Symbols analyzed at the same time once their data has arrived
+DEFAULT_COMPUTE_WORKERS = int(os.environ.get('TRADING_ANALYSIS_COMPUTE_WORKERS', 2))
+
+DEFAULT_MAX_SYMBOLS = int(os.environ.get('TRADING_ANALYSIS_MAX_SYMBOLS', 50))
+
+# Seconds allowed for a whole batch; symbols still running after that report a timeout
+DEFAULT_BATCH_TIMEOUT = 240
+
+# Charts read by comprehensive_analysis: (interval, range), one per interval
+ANALYSIS_CHARTS = tuple(plan_fetches(ANALYSIS_STAGES).items())
+
+
+class _SymbolJob:
+    """Upstream fetches of one symbol; the analysis starts when the last one finishes"""
+
+    def __init__(self, symbol, pending):
+        self.symbol = symbol
+        self.pending = pending
+        self.insights = None
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.result = None
+        # Set when the batch gave up on the symbol; queued work for it is dropped
+        self.cancelled = False
+        self.futures = []
+
+
+class BatchAnalyzer:
+    """
+    Comprehensive analysis of many symbols in one call
+
+    - Chart and insights requests for every symbol go through a bounded I/O thread pool
+    - Charts land in the shared market data cache, so the analysis reads them without refetching
+    - Each symbol's analysis is queued on a separate compute pool as soon as its data has
+      arrived, so network waits of some symbols overlap with the computation of others
+    - Every symbol gets its own result or {'error': ...}; one failure does not fail the batch
+    """
+
+    def __init__(self, analyzer=None, io_workers=DEFAULT_IO_WORKERS,
+                 compute_workers=DEFAULT_COMPUTE_WORKERS, max_symbols=DEFAULT_MAX_SYMBOLS):
+        if analyzer is None:
+            from market_analysis import MarketAnalysisAI
+            analyzer = MarketAnalysisAI()
+
+        self.analyzer = analyzer
+        self.max_symbols = max_symbols
+        self.io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='analysis-io')
+        self.compute_pool = ThreadPoolExecutor(max_workers=compute_workers, thread_name_prefix='analysis-compute')
+
+    def analyze(self, symbols, timeout=DEFAULT_BATCH_TIMEOUT):
+        """
+        Run comprehensive_analysis for every symbol
+
+        Args:
+            symbols: List of trading pair symbols (duplicates are analyzed once)
+            timeout: Seconds to wait for the whole batch
+
+        Returns:
+            Dictionary with 'results' mapping each symbol to its analysis or error
+        """
+        symbols = list(dict.fromkeys(symbol.strip() for symbol in symbols if symbol and symbol.strip()))
+        if not symbols:
+            return {'error': 'No symbols given'}
+        if len(symbols) > self.max_symbols:
+            return {'error': f'Too many symbols: {len(symbols)} (limit {self.max_symbols})'}
+
+        start = time.perf_counter()
+        jobs = [_SymbolJob(symbol, len(ANALYSIS_CHARTS) + 1) for symbol in symbols]
+
+        for job in jobs:
+            for interval, data_range in ANALYSIS_CHARTS:
+                self._submit_fetch(job, self._fetch_chart, interval, data_range)
+            self._submit_fetch(job, self._fetch_insights)
+
+        deadline = start + timeout
+        results = {}
+        for job in jobs:
+            if job.done.wait(max(0.0, deadline - time.perf_counter())):
+                results[job.symbol] = job.result
+            else:
+                self._cancel(job)
+                results[job.symbol] = {'error': f'Analysis timed out after {timeout} seconds'}
+
+        return {
+            'symbols': symbols,
+            'results': results,
+            'failed': sum(1 for result in results.values() if 'error' in result),
+            'elapsed_seconds': time.perf_counter() - start
+        }
+
+    def _submit_fetch(self, job, fetch, *args):
+        future = self.io_pool.submit(fetch, job, *args)
+        with job.lock:
+            job.futures.append(future)
+        future.add_done_callback(lambda _: self._fetch_finished(job))
+
+    def _cancel(self, job):
+        """Drop the symbol's work that has not started, so later batches do not wait behind it"""
+        with job.lock:
+            job.cancelled = True
+            futures = list(job.futures)
+        for future in futures:
+            future.cancel()
+
+    def _fetch_chart(self, job, interval, data_range):
+        # Errors are not cached, so the analysis step will report them for this symbol
+        self.analyzer.market_service.process_market_series(job.symbol, interval=interval, range=data_range)
+
+    def _fetch_insights(self, job):
+        job.insights = self.analyzer.market_service.get_stock_insights(job.symbol)
+
+    def _fetch_finished(self, job):
+        with job.lock:
+            job.pending -= 1
+            ready = job.pending == 0 and not job.cancelled
+            if ready:
+                job.futures.append(self.compute_pool.submit(self._analyze_symbol, job))
+
+    def _analyze_symbol(self, job):
+        if job.cancelled:
+            return
+        try:
+            job.result = self.analyzer.comprehensive_analysis(job.symbol, insights=job.insights)
+        except Exception as e:
+            job.result = {'error': f'Error analyzing {job.symbol}: {str(e)}'}
+        finally:
+            job.done.set()
+
+    def shutdown(self):
+        self.io_pool.shutdown(wait=False)
+        self.compute_pool.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Comprehensive analysis of several symbols')
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--io-workers', type=int, default=DEFAULT_IO_WORKERS)
+    parser.add_argument('--compute-workers', type=int, default=DEFAULT_COMPUTE_WORKERS)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_BATCH_TIMEOUT)
+    args = parser.parse_args()
+
+    # Accept both "BTC-USD ETH-USD" and "BTC-USD,ETH-USD"
+    symbols = [symbol for arg in args.symbols for symbol in arg.split(',')]
+
+    batch = BatchAnalyzer(io_workers=args.io_workers, compute_workers=args.compute_workers)
+    print(json.dumps(batch.analyze(symbols, timeout=args.timeout)))
+    batch.shutdown()
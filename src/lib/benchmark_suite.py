@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+
+from fake_upstream import synthetic_candles, chart_payload, insights_payload
+from market_data_cache import MarketDataCache
+from market_data import MarketDataService
+
+BENCHMARK_STAGES = ('parse', 'indicators', 'prepare_lstm', 'execute_trade', 'run_simulation')
+
+# Synthetic datasets of one-minute candles, by covered period
+DATASET_BARS = {
+    '1d': 1440,
+    '1w': 7 * 1440,
+    '1mo': 30 * 1440,
+    '1y': 365 * 1440,
+    '3y': 3 * 365 * 1440
+}
+
+DEFAULT_DATASETS = ('1d', '1w', '1mo', '1y')
+
+DEFAULT_BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baselines.json')
+
+# A stage regresses when its best latency or peak memory grows by more than this fraction
+# (the best of several runs is far less sensitive to a busy machine than the median)
+DEFAULT_THRESHOLD = float(os.environ.get('TRADING_BENCHMARK_THRESHOLD', 0.25))
+
+# Differences below these are timer and allocator noise, whatever the fraction
+MIN_LATENCY_DELTA_MS = 0.5
+MIN_MEMORY_DELTA_KB = 64
+
+# Each stage repeats until it has run at least this many times and this long
+MIN_ITERATIONS = 5
+MIN_SECONDS = 0.5
+MAX_ITERATIONS = 2000
+
+LOOK_BACK = 60
+
+BENCHMARK_SYMBOL = 'BENCH-USD'
+
+
+class StaticProvider:
+    """Data provider answering every chart request with the same payload"""
+
+    def __init__(self, chart):
+        self.chart = chart
+
+    def call_api(self, endpoint, query=None):
+        if endpoint == 'YahooFinance/get_stock_chart':
+            return self.chart
+        return insights_payload((query or {}).get('symbol', ''))
+
+
+def synthetic_dataset(name):
+    """Chart payload of one-minute GBM candles covering one of DATASET_BARS"""
+    candles = synthetic_candles(BENCHMARK_SYMBOL, DATASET_BARS[name], interval_seconds=60, seed=1)
+    return chart_payload(BENCHMARK_SYMBOL, candles)
+
+
+def recorded_datasets(directory):
+    """Chart payloads saved by data_providers.RecordingProvider, keyed by symbol/interval/range"""
+    from data_providers import ReplayProvider, list_recordings
+
+    replay = ReplayProvider(directory)
+    datasets = {}
+    for recording in list_recordings(directory):
+        if recording['endpoint'] != 'YahooFinance/get_stock_chart':
+            continue
+        query = recording['query']
+        name = f"{query['symbol']}/{query['interval']}/{query['range']}"
+        datasets[name] = replay.call_api(recording['endpoint'], query)
+    return datasets
+
+
+def _cached_service(payload):
+    return MarketDataService(client=StaticProvider(payload), cache=MarketDataCache())
+
+
+def _stage(name, payload):
+    """
+    Set up one stage on a dataset
+
+    Returns:
+        (run, work): run() executes one operation; work is the number of bars (or trades) it covers
+    """
+    bars = len(payload['chart']['result'][0]['timestamp'])
+
+    if name == 'parse':
+        service = MarketDataService(client=StaticProvider(payload), use_cache=False)
+        return (lambda: service.process_market_data(BENCHMARK_SYMBOL, '1m', '1d')), bars
+
+    if name in ('indicators', 'prepare_lstm'):
+        from market_analysis import MarketAnalysisAI
+
+        analyzer = MarketAnalysisAI(market_service=_cached_service(payload))
+        if name == 'indicators':
+            def run():
+                # Start from empty engines, so every run computes the whole series
+                analyzer.indicator_engines.clear()
+                return analyzer.analyze_technical_indicators(BENCHMARK_SYMBOL)
+            return run, bars
+
+        closes = analyzer.market_service.process_market_series(BENCHMARK_SYMBOL)['series'].compact().close
+        scaled = ((closes - closes.min()) / (closes.max() - closes.min())).reshape(-1, 1)
+        return (lambda: analyzer.prepare_data_for_lstm(scaled, LOOK_BACK)), bars
+
+    from trading_strategies import ThousandTradesStrategy
+
+    strategy = ThousandTradesStrategy(None, BENCHMARK_SYMBOL, 10000, market_service=_cached_service(payload))
+    strategy.start()
+    if name == 'execute_trade':
+        def run():
+            result = strategy.execute_trade()
+            if result['status'] == 'stopped':
+                # Weekly loss limit reached: start over so later runs still trade
+                strategy.ledger.clear()
+                strategy.current_capital = strategy.initial_capital
+            return result
+        return run, 1
+
+    return (lambda: strategy.run_simulation(days=1)), 1000
+
+
+def _percentile(latencies, q):
+    return float(np.percentile(latencies, q))
+
+
+def measure(run, work, min_iterations=MIN_ITERATIONS, min_seconds=MIN_SECONDS):
+    """
+    Latency, throughput and peak memory of an operation
+
+    Args:
+        run: Callable executing one operation
+        work: Units (bars or trades) processed by one operation
+        min_iterations: Minimum number of timed runs
+        min_seconds: Minimum total time of the timed runs
+
+    Returns:
+        Dictionary of measurements
+    """
+    # Warm-up: imports, caches and lazily created state
+    run()
+
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < MAX_ITERATIONS and (len(latencies) < min_iterations or
+                                              time.perf_counter() - started < min_seconds):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    total_seconds = sum(latencies) / 1000
+
+    # Separate pass: tracing allocations slows the operation down
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iterations': len(latencies),
+        'work_per_run': work,
+        'min_ms': min(latencies),
+        'p50_ms': _percentile(latencies, 50),
+        'p90_ms': _percentile(latencies, 90),
+        'p99_ms': _percentile(latencies, 99),
+        'mean_ms': total_seconds * 1000 / len(latencies),
+        'runs_per_second': len(latencies) / total_seconds if total_seconds else None,
+        'work_per_second': work * len(latencies) / total_seconds if total_seconds else None,
+        'peak_memory_kb': peak / 1024
+    }
+
+
+def run_suite(datasets, stages=BENCHMARK_STAGES):
+    """
+    Measure every stage on every dataset
+
+    Args:
+        datasets: Dictionary of dataset name to chart payload
+        stages: Stage names from BENCHMARK_STAGES
+
+    Returns:
+        Dictionary keyed by '<stage>/<dataset>'
+    """
+    results = {}
+    for dataset, payload in datasets.items():
+        for stage in stages:
+            # Fixed seed so strategies take the same decisions on every run
+            random.seed(0)
+            run, work = _stage(stage, payload)
+            results[f'{stage}/{dataset}'] = measure(run, work)
+    return results
+
+
+def compare_to_baselines(results, baselines, threshold=DEFAULT_THRESHOLD):
+    """
+    Regressions of best latency and peak memory against stored baselines
+
+    Args:
+        results: Output of run_suite
+        baselines: Stored results (same keys); missing keys are not compared
+        threshold: Allowed relative growth
+
+    Returns:
+        List of regression descriptions (empty when every stage is within the threshold)
+    """
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        for metric, min_delta in (('min_ms', MIN_LATENCY_DELTA_MS), ('peak_memory_kb', MIN_MEMORY_DELTA_KB)):
+            limit = baseline[metric] * (1 + threshold)
+            if result[metric] > limit and result[metric] - baseline[metric] > min_delta:
+                regressions.append({
+                    'stage': key,
+                    'metric': metric,
+                    'baseline': baseline[metric],
+                    'current': result[metric],
+                    'change': result[metric] / baseline[metric] - 1 if baseline[metric] else None
+                })
+    return regressions
+
+
+def load_baselines(path=DEFAULT_BASELINES_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'results': {}}
+
+
+def save_baselines(results, path=DEFAULT_BASELINES_PATH):
+    baselines = load_baselines(path)
+    baselines['results'].update({
+        key: {'min_ms': result['min_ms'], 'p50_ms': result['p50_ms'], 'peak_memory_kb': result['peak_memory_kb']}
+        for key, result in results.items()
+    })
+    baselines['machine'] = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+    baselines['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the market data, analysis and strategy hot paths')
+    parser.add_argument('--datasets', default=','.join(DEFAULT_DATASETS),
+                        help=f'Comma-separated synthetic datasets ({", ".join(DATASET_BARS)})')
+    parser.add_argument('--recordings', help='Also benchmark charts recorded with data_providers.py record')
+    parser.add_argument('--stages', default=','.join(BENCHMARK_STAGES))
+    parser.add_argument('--baselines', default=DEFAULT_BASELINES_PATH)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--update-baselines', action='store_true', help='Store these results as the new baselines')
+    args = parser.parse_args()
+
+    datasets = {f'synthetic/{name}': synthetic_dataset(name) for name in args.datasets.split(',') if name}
+    if args.recordings:
+        datasets.update(recorded_datasets(args.recordings))
+
+    results = run_suite(datasets, args.stages.split(','))
+
+    if args.update_baselines:
+        save_baselines(results, args.baselines)
+        regressions = []
+    else:
+        regressions = compare_to_baselines(results, load_baselines(args.baselines)['results'], args.threshold)
+
+    print(json.dumps({'results': results, 'regressions': regressions, 'threshold': args.threshold}, indent=2))
+    if regressions:
+        sys.exit(1)
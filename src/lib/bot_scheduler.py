@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from trading_strategies import STRATEGY_SETTINGS, ThousandTradesStrategy, TenTradesStrategy
+from market_data_cache import INTERVAL_SECONDS
+
+STRATEGY_CLASSES = {
+    'thousand_trades': ThousandTradesStrategy,
+    'ten_trades': TenTradesStrategy
+}
+
+# Trades per day of each bot type, as in run_simulation
+TRADES_PER_DAY = {
+    'thousand_trades': 1000,
+    'ten_trades': 10
+}
+
+# Threads executing trades; every bot runs at most one trade at a time
+DEFAULT_TRADE_WORKERS = int(os.environ.get('TRADING_SCHEDULER_TRADE_WORKERS', 16))
+
+# Longest a group waits between snapshots, so stopped or added bots are noticed
+MAX_TICK_SECONDS = 60
+
+# Trades slower than this are counted as slow in the stats
+SLOW_TRADE_SECONDS = 5
+
+
+class ScheduledBot:
+    """One active bot: its strategy, pacing and the latest snapshot waiting for it"""
+
+    def __init__(self, config, strategy, pace_seconds):
+        self.config = config
+        self.strategy = strategy
+        self.pace_seconds = pace_seconds
+        self.next_due = 0.0
+        # Latest-wins mailbox: a bot that is still busy only ever sees the newest snapshot
+        self.mailbox = asyncio.Queue(maxsize=1)
+        self.stats = {'trades': 0, 'errors': 0, 'dropped_snapshots': 0, 'slow_trades': 0}
+
+    @property
+    def bot_id(self):
+        return self.config.get('id')
+
+    def deliver(self, snapshot):
+        """Hand a snapshot to the bot, replacing one it has not picked up yet"""
+        if self.mailbox.full():
+            self.mailbox.get_nowait()
+            self.stats['dropped_snapshots'] += 1
+        self.mailbox.put_nowait(snapshot)
+
+
+def build_bot(config, market_service=None, speed=1.0):
+    """
+    Create a ScheduledBot from a bot_configurations row
+
+    Args:
+        config: Dictionary with id, account_id, bot_type, trading_pair, initial_capital
+                and optionally the STRATEGY_SETTINGS columns
+        market_service: Optional MarketDataService for the strategy (trades get snapshots from the scheduler)
+        speed: Pacing multiplier (2.0 trades twice as often; for tests and load runs)
+
+    Returns:
+        ScheduledBot
+    """
+    bot_type = config['bot_type']
+    if bot_type not in STRATEGY_CLASSES:
+        raise ValueError(f'Unknown bot type: {bot_type}')
+
+    settings = {key: config[key] for key in STRATEGY_SETTINGS if config.get(key) is not None}
+    strategy = STRATEGY_CLASSES[bot_type](
+        config.get('account_id'),
+        config['trading_pair'],
+        float(config['initial_capital']),
+        market_service=market_service,
+        settings=settings
+    )
+    strategy.start()
+    return ScheduledBot(config, strategy, 86400 / TRADES_PER_DAY[bot_type] / speed)
+
+
+class BotScheduler:
+    """
+    Runs many bots in one event loop
+
+    - Bots are grouped by (trading pair, interval, range) of the candles they read
+    - Each group ticks at most once per candle (or per pacing period of its fastest bot):
+      one snapshot is fetched and delivered to every bot due before the next tick, so
+      500 bots on BTC-USD cost one fetch per tick. Bots may trade up to one tick early,
+      but each keeps its average rate
+    - Every bot has its own consumer task and a one-slot mailbox; trades run on a
+      bounded thread pool, so a slow bot only delays itself and at worst skips snapshots
+    - on_trade(bot, result) is called on the event loop after every trade; when it
+      returns a coroutine, the bot waits for it before taking its next snapshot
+    """
+
+    def __init__(self, market_service=None, trade_workers=DEFAULT_TRADE_WORKERS, on_trade=None,
+                 clock=time.monotonic):
+        if market_service is None:
+            from async_market_data import AsyncMarketDataService
+            market_service = AsyncMarketDataService()
+
+        self.market_service = market_service
+        self.on_trade = on_trade
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=trade_workers, thread_name_prefix='bot-trade')
+        self._groups = {}
+        self._tasks = []
+        self._stopping = None
+        self.stats = {'ticks': 0, 'fetch_errors': 0, 'trades': 0, 'errors': 0, 'stopped_bots': 0}
+
+    def add_bot(self, bot):
+        """Register a bot; bots added while running are picked up at the group's next tick"""
+        strategy = bot.strategy
+        key = (strategy.trading_pair, strategy.market_interval, strategy.market_range)
+        # Spread the first trades over one pacing period so bots do not trade in lockstep
+        bot.next_due = self.clock() + random.uniform(0, bot.pace_seconds)
+
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = []
+            if self._stopping is not None:
+                self._tasks.append(asyncio.ensure_future(self._run_group(key, group)))
+        group.append(bot)
+        if self._stopping is not None:
+            self._tasks.append(asyncio.ensure_future(self._run_bot(bot)))
+
+    async def _run_group(self, key, group):
+        symbol, interval, data_range = key
+        while not self._stopping.is_set():
+            if not group:
+                await self._sleep(MAX_TICK_SECONDS)
+                continue
+
+            wait = min(bot.next_due for bot in group) - self.clock()
+            if wait > 0:
+                await self._sleep(min(wait, MAX_TICK_SECONDS))
+                continue
+
+            tick_seconds = min(INTERVAL_SECONDS.get(interval, 60), min(bot.pace_seconds for bot in group))
+            snapshot = await self.market_service.process_market_series(symbol, interval, data_range)
+            self.stats['ticks'] += 1
+            if 'error' in snapshot:
+                self.stats['fetch_errors'] += 1
+                # Retry after a short pause instead of hammering upstream with every due bot
+                await self._sleep(min(5, MAX_TICK_SECONDS))
+                continue
+
+            now = self.clock()
+            for bot in group:
+                if bot.next_due < now + tick_seconds:
+                    bot.next_due = max(bot.next_due + bot.pace_seconds, now)
+                    bot.deliver(snapshot)
+
+    async def _run_bot(self, bot):
+        loop = asyncio.get_running_loop()
+        while True:
+            snapshot = await bot.mailbox.get()
+            if snapshot is None:
+                return
+
+            start = time.perf_counter()
+            try:
+                result = await loop.run_in_executor(self._executor, bot.strategy.execute_trade, snapshot)
+            except Exception as e:
+                result = {'status': 'error', 'message': str(e)}
+            if time.perf_counter() - start > SLOW_TRADE_SECONDS:
+                bot.stats['slow_trades'] += 1
+
+            if result['status'] == 'success':
+                bot.stats['trades'] += 1
+                self.stats['trades'] += 1
+            elif result['status'] == 'stopped':
+                self.stats['stopped_bots'] += 1
+                self._remove(bot)
+            else:
+                bot.stats['errors'] += 1
+                self.stats['errors'] += 1
+
+            if self.on_trade is not None:
+                try:
+                    pending = self.on_trade(bot, result)
+                    if asyncio.iscoroutine(pending):
+                        # Lets a write-behind sink push back on the bot when the database falls behind
+                        await pending
+                except Exception as e:
+                    print(f"on_trade failed for bot {bot.bot_id}: {str(e)}", file=sys.stderr)
+
+            if result['status'] == 'stopped':
+                return
+
+    def _remove(self, bot):
+        for group in self._groups.values():
+            if bot in group:
+                group.remove(bot)
+
+    async def _sleep(self, seconds):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self, duration=None):
+        """
+        Run every registered bot until stop() is called or `duration` seconds have passed
+
+        Returns:
+            Scheduler stats
+        """
+        self._stopping = asyncio.Event()
+        bots = [bot for group in self._groups.values() for bot in group]
+        self._tasks = [asyncio.ensure_future(self._run_group(key, group)) for key, group in self._groups.items()]
+        self._tasks += [asyncio.ensure_future(self._run_bot(bot)) for bot in bots]
+
+        if duration is not None:
+            await self._sleep(duration)
+        else:
+            await self._stopping.wait()
+        self._stopping.set()
+
+        # Let bots finish the trade in progress, then end their consumers
+        for bot in [bot for group in self._groups.values() for bot in group]:
+            bot.deliver(None)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        return self.get_stats()
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+    def get_stats(self):
+        bots = [bot for group in self._groups.values() for bot in group]
+        stats = dict(self.stats)
+        stats['groups'] = len(self._groups)
+        stats['active_bots'] = len(bots)
+        stats['dropped_snapshots'] = sum(bot.stats['dropped_snapshots'] for bot in bots)
+        stats['slow_trades'] = sum(bot.stats['slow_trades'] for bot in bots)
+        return stats
+
+
+def load_active_bots(db_path):
+    """
+    Active bot_configurations rows with their account balance from a SQLite copy of the schema
+
+    Returns:
+        List of configuration dictionaries for build_bot
+    """
+    import sqlite3
+
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    try:
+        rows = connection.execute(
+            f"""SELECT b.id, b.account_id, b.bot_type, b.trading_pair, {', '.join('b.' + key for key in STRATEGY_SETTINGS)},
+                       a.current_balance AS initial_capital
+                FROM bot_configurations b JOIN accounts a ON a.id = b.account_id
+                WHERE b.is_active = 1"""
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(row) for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run all active bots in one event loop')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--db', help='SQLite database with the bot_configurations and accounts tables')
+    source.add_argument('--bots', help='JSON file with a list of bot configurations')
+    source.add_argument('--synthetic', type=int, help='Run this many generated bots on the fake upstream')
+    parser.add_argument('--duration', type=float, help='Seconds to run (default: until interrupted)')
+    parser.add_argument('--speed', type=float, default=1.0, help='Pacing multiplier for test runs')
+    parser.add_argument('--trade-workers', type=int, default=DEFAULT_TRADE_WORKERS)
+    parser.add_argument('--history-db', help='SQLite database receiving the trades (defaults to --db)')
+    args = parser.parse_args()
+
+    market_service = None
+    if args.synthetic:
+        from async_market_data import AsyncMarketDataService
+        from fake_upstream import FakeUpstreamClient
+
+        upstream = FakeUpstreamClient(latency=0.05)
+        market_service = AsyncMarketDataService(lambda: upstream)
+        pairs = ['BTC-USD', 'ETH-USD', 'SOL-USD', 'XRP-USD']
+        configs = [
+            {
+                'id': i + 1,
+                'account_id': i + 1,
+                'bot_type': 'thousand_trades' if i % 4 else 'ten_trades',
+                'trading_pair': pairs[i % len(pairs)],
+                'initial_capital': 10000
+            }
+            for i in range(args.synthetic)
+        ]
+    elif args.db:
+        configs = load_active_bots(args.db)
+    else:
+        with open(args.bots) as f:
+            configs = json.load(f)
+
+    sink = None
+    on_trade = None
+    history_db = args.history_db or args.db
+    if history_db:
+        from trade_sink import WriteBehindTradeSink, SqliteTradeWriter, open_sqlite
+
+        sink = WriteBehindTradeSink(SqliteTradeWriter(open_sqlite(history_db)))
+
+        def on_trade(bot, result):
+            if result['status'] == 'success':
+                return sink.submit_async(result['trade'], bot.bot_id)
+
+    scheduler = BotScheduler(market_service, trade_workers=args.trade_workers, on_trade=on_trade)
+    for config in configs:
+        scheduler.add_bot(build_bot(config, speed=args.speed))
+
+    try:
+        stats = asyncio.run(scheduler.run(args.duration))
+    except KeyboardInterrupt:
+        stats = scheduler.get_stats()
+    if sink is not None:
+        sink.close()
+        stats['trade_sink'] = sink.get_stats()
+    print(json.dumps(stats))
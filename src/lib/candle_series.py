@@ -0,0 +1,121 @@
+import numpy as np
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+CANDLE_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+def _column(values, length, dtype=np.float64):
+    """Convert a Yahoo quote list (with None for missing values) to a float array of the given length"""
+    column = np.full(length, np.nan, dtype=dtype)
+    if values:
+        count = min(len(values), length)
+        # None becomes NaN when converting to a float array
+        column[:count] = np.array(values[:count], dtype=dtype)
+    return column
+
+
+class CandleSeries:
+    """
+    Column-oriented OHLCV candles:
+    - timestamp (int64 epoch seconds) and open/high/low/close/volume (float64) arrays
+    - valid: boolean mask, False for bars without a close price
+    - slicing returns views that share memory with the original arrays
+    """
+
+    __slots__ = CANDLE_FIELDS + ('valid',)
+
+    def __init__(self, timestamp, open, high, low, close, volume, valid=None):
+        self.timestamp = timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.valid = valid if valid is not None else ~np.isnan(close)
+
+    @classmethod
+    def from_chart_result(cls, result):
+        """
+        Build a series from one entry of a Yahoo Finance chart response
+
+        Args:
+            result: data['chart']['result'][0]
+
+        Returns:
+            CandleSeries with one bar per timestamp
+        """
+        timestamps = np.asarray(result.get('timestamp') or [], dtype=np.int64)
+        quote = result['indicators']['quote'][0]
+        length = len(timestamps)
+
+        columns = {field: _column(quote.get(field), length) for field in PRICE_FIELDS + ('volume',)}
+        valid = ~np.isnan(columns['close'])
+
+        # Same defaults as the legacy format: missing open/high/low/volume are reported as 0
+        for field in ('open', 'high', 'low', 'volume'):
+            np.nan_to_num(columns[field], copy=False, nan=0.0)
+
+        return cls(timestamps, valid=valid, **columns)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a series from the legacy list of candle dictionaries"""
+        return cls(
+            np.array([candle['timestamp'] for candle in records], dtype=np.int64),
+            *(np.array([candle[field] for candle in records], dtype=np.float64) for field in PRICE_FIELDS),
+            np.array([candle['volume'] for candle in records], dtype=np.float64)
+        )
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, index):
+        """Slicing returns a zero-copy view; boolean or integer array indexing returns a copy"""
+        if isinstance(index, int):
+            raise TypeError('CandleSeries does not support scalar indexing; use a slice or the columns')
+        return CandleSeries(*(getattr(self, field)[index] for field in CANDLE_FIELDS), valid=self.valid[index])
+
+    def compact(self):
+        """Series without the null bars (the series itself when every bar is valid)"""
+        if self.valid.all():
+            return self
+        return self[self.valid]
+
+    def tail(self, count):
+        """View of the last `count` bars"""
+        return self[max(0, len(self) - count):]
+
+    def since(self, timestamp):
+        """View of the bars at or after the given epoch timestamp"""
+        return self[int(np.searchsorted(self.timestamp, timestamp, side='left')):]
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, field).nbytes for field in CANDLE_FIELDS + ('valid',))
+
+    def to_dataframe(self):
+        """pandas DataFrame backed by the series columns (no row-by-row conversion)"""
+        import pandas as pd
+        return pd.DataFrame({field: getattr(self, field) for field in CANDLE_FIELDS}, copy=False)
+
+    def to_records(self):
+        """
+        Convert the valid bars to the legacy list of candle dictionaries (for JSON responses)
+
+        Returns:
+            List of {'timestamp', 'open', 'high', 'low', 'close', 'volume'} dictionaries
+        """
+        series = self.compact()
+        columns = [getattr(series, field).tolist() for field in CANDLE_FIELDS]
+        volumes = series.volume.astype(np.int64).tolist()
+        return [
+            {
+                'timestamp': timestamp,
+                'open': open,
+                'high': high,
+                'low': low,
+                'close': close,
+                'volume': volume
+            }
+            for timestamp, open, high, low, close, volume in zip(*columns[:5], volumes)
+        ]
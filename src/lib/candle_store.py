@@ -0,0 +1,365 @@
+import os
+import re
+import json
+import time
+import fcntl
+import shutil
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+from candle_series import CandleSeries, CANDLE_FIELDS
+from market_data_cache import INTERVAL_SECONDS, RANGE_SECONDS
+
+DEFAULT_STORE_DIR = os.environ.get('TRADING_CANDLE_STORE_DIR', '/tmp/trading-bot-candles')
+
+# MarketDataService reads charts through the shared store when set to 1
+STORE_ENABLED = os.environ.get('TRADING_CANDLE_STORE', '0') == '1'
+
+# Closed bars kept per (symbol, interval); compaction runs when a series grows past twice this
+DEFAULT_RETENTION_BARS = 100000
+
+COLUMN_DTYPES = {field: (np.int64 if field == 'timestamp' else np.float64) for field in CANDLE_FIELDS}
+
+# Ranges tried, smallest first, when a provider cannot serve period bounds or to backfill a gap
+RANGE_LADDER = ('1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y')
+
+# Longest range Yahoo Finance serves for intraday intervals
+MAX_RANGE = {
+    '1m': '5d',
+    '2m': '1mo',
+    '5m': '1mo',
+    '15m': '1mo',
+    '30m': '1mo',
+    '60m': '2y',
+    '90m': '1mo',
+    '1h': '2y'
+}
+
+MARKET_FIELDS = ('symbol', 'currency', 'exchange', 'current_price', 'previous_close')
+
+
+def _ladder(interval):
+    limit = RANGE_LADDER.index(MAX_RANGE.get(interval, RANGE_LADDER[-1]))
+    return RANGE_LADDER[:limit + 1]
+
+
+def _smallest_range(interval, seconds):
+    """Smallest range covering `seconds`, or None when it exceeds what upstream serves"""
+    for data_range in _ladder(interval):
+        if RANGE_SECONDS[data_range] >= seconds:
+            return data_range
+    return None
+
+
+class CandleStore:
+    """
+    Append-only columnar candle files per (symbol, interval), read through np.memmap
+
+    Layout of <root>/<symbol>/<interval>/:
+    - g<generation>/<column>.bin: closed bars, one raw int64/float64 file per column
+    - meta.json: bar count, generation, covered_from, the still-forming bars (tail)
+      and the latest market metadata
+
+    Only closed bars are appended to the column files; bars that may still change
+    live in meta.json until they close. A crash between appending and updating
+    meta.json leaves bytes past the recorded count, which the next append truncates.
+    Writers of the same series are serialized with a lock file, so several worker
+    processes can share one store.
+
+    New bars are requested with period1/period2 bounds starting at the last stored
+    bar, so a one-minute bot tick downloads a couple of bars instead of a whole day.
+    If a bounded request fails or does not overlap the store, the refresh falls back
+    to the smallest range of RANGE_LADDER that covers the gap.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, retention_bars=DEFAULT_RETENTION_BARS, clock=time.time):
+        self.root = root
+        self.retention_bars = retention_bars
+        self.clock = clock
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'delta_fetches': 0,
+            'full_fetches': 0,
+            'backfills': 0,
+            'compactions': 0,
+            'bars_fetched': 0,
+            'bars_appended': 0
+        }
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def _dir(self, symbol, interval):
+        safe_symbol = re.sub(r'[^A-Za-z0-9_.-]', '_', symbol)
+        return os.path.join(self.root, safe_symbol, interval)
+
+    @contextmanager
+    def _locked(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self, directory):
+        try:
+            with open(os.path.join(directory, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'generation': 0, 'count': 0, 'covered_from': None, 'tail': None, 'market': None}
+
+    def _write_meta(self, directory, meta):
+        temp_path = os.path.join(directory, f'meta.{os.getpid()}.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, os.path.join(directory, 'meta.json'))
+
+    def _column_path(self, directory, generation, field):
+        return os.path.join(directory, f'g{generation}', f'{field}.bin')
+
+    def _closed_bars(self, directory, meta):
+        """Stored closed bars as a CandleSeries of read-only memory maps"""
+        count = meta['count']
+        if count == 0:
+            return CandleSeries(*(np.empty(0, dtype=COLUMN_DTYPES[field]) for field in CANDLE_FIELDS))
+
+        columns = [
+            np.memmap(self._column_path(directory, meta['generation'], field), dtype=COLUMN_DTYPES[field],
+                      mode='r', shape=(count,))
+            for field in CANDLE_FIELDS
+        ]
+        return CandleSeries(*columns)
+
+    def _series_from_tail(self, tail):
+        if not tail:
+            return None
+        return CandleSeries(*(np.asarray(tail[field], dtype=COLUMN_DTYPES[field]) for field in CANDLE_FIELDS))
+
+    def _append(self, directory, meta, bars):
+        generation = meta['generation']
+        os.makedirs(os.path.join(directory, f'g{generation}'), exist_ok=True)
+        for field in CANDLE_FIELDS:
+            path = self._column_path(directory, generation, field)
+            with open(path, 'ab') as f:
+                # Drop bytes of an append that never made it into meta.json
+                f.truncate(meta['count'] * np.dtype(COLUMN_DTYPES[field]).itemsize)
+                f.write(np.ascontiguousarray(getattr(bars, field), dtype=COLUMN_DTYPES[field]).tobytes())
+        meta['count'] += len(bars)
+
+    def _rewrite(self, directory, meta, bars):
+        """Write `bars` as a new generation and drop the old one"""
+        old_generation = meta['generation']
+        meta['generation'] = old_generation + 1
+        meta['count'] = 0
+        shutil.rmtree(os.path.join(directory, f'g{meta["generation"]}'), ignore_errors=True)
+        self._append(directory, meta, bars)
+        return old_generation
+
+    def load(self, symbol, interval):
+        """
+        Every stored bar of a series, closed bars first and then the forming ones
+
+        Returns:
+            CandleSeries (memory-mapped when no bar is still forming)
+        """
+        directory = self._dir(symbol, interval)
+        meta = self._read_meta(directory)
+        closed = self._closed_bars(directory, meta)
+        tail = self._series_from_tail(meta.get('tail'))
+        if tail is None:
+            return closed
+        return CandleSeries(*(np.concatenate((getattr(closed, field), getattr(tail, field))) for field in CANDLE_FIELDS))
+
+    def get_market_series(self, symbol, interval, range, fetch):
+        """
+        Market data for a range, fetching only what the store does not have yet
+
+        Args:
+            symbol: Trading pair symbol
+            interval: Data interval
+            range: Data range (one of RANGE_SECONDS)
+            fetch: Callable(symbol, interval, range, period1=None, period2=None) returning a chart
+                response or an error dictionary (MarketDataService.get_stock_data)
+
+        Returns:
+            Dictionary in the process_market_series format
+        """
+        self._count('requests')
+        interval_seconds = INTERVAL_SECONDS.get(interval, 86400)
+        range_start = self.clock() - RANGE_SECONDS[range]
+        directory = self._dir(symbol, interval)
+
+        with self._locked(directory):
+            meta = self._read_meta(directory)
+            error = self._refresh(symbol, interval, range, range_start, interval_seconds, directory, meta, fetch)
+            if error is not None:
+                return error
+            # Mapped under the lock, so a concurrent compaction cannot remove the files first
+            series = self.load(symbol, interval).since(range_start)
+
+        market_data = dict(meta['market'])
+        market_data['series'] = series
+        return market_data
+
+    def _refresh(self, symbol, interval, range, range_start, interval_seconds, directory, meta, fetch):
+        now = self.clock()
+        closed = self._closed_bars(directory, meta)
+        last_closed = int(closed.timestamp[-1]) if len(closed) else None
+
+        covered_from = meta.get('covered_from')
+        if last_closed is None or covered_from is None or range_start < covered_from - interval_seconds:
+            # Nothing stored yet, or the request reaches further back than the store
+            return self._full_fetch(symbol, interval, range, range_start, interval_seconds, directory, meta, fetch, closed)
+
+        # Ask for the bars from the last stored one on. Providers that cannot serve bounds
+        # (a replayed recording) get the smallest range that still overlaps the last stored
+        # bar; a response that does not reach back that far widens the range.
+        needed = now - last_closed + interval_seconds
+        data_range = _smallest_range(interval, needed)
+        bounds = {'period1': last_closed, 'period2': int(now) + interval_seconds}
+        while data_range is not None:
+            data = fetch(symbol, interval, data_range, **bounds)
+            if 'error' in data and bounds:
+                bounds = {}
+                continue
+            if 'error' in data:
+                return data
+            fetched = self._parse(data, meta)
+            self._count('bars_fetched', len(fetched))
+            if len(fetched) and int(fetched.timestamp[0]) <= last_closed:
+                self._count('delta_fetches')
+                self._merge_new_bars(directory, meta, fetched, last_closed, now, interval_seconds, range_start)
+                return None
+
+            # Gap: the response starts after the last stored bar
+            self._count('backfills')
+            if bounds:
+                bounds = {}
+                continue
+            ladder = _ladder(interval)
+            position = ladder.index(data_range) + 1
+            data_range = ladder[position] if position < len(ladder) else None
+
+        # The gap is older than anything upstream serves for this interval: start over
+        meta['covered_from'] = None
+        return self._full_fetch(symbol, interval, range, range_start, interval_seconds, directory, meta, fetch, closed)
+
+    def _parse(self, data, meta):
+        result = data['chart']['result'][0]
+        info = result['meta']
+        meta['market'] = {
+            'symbol': info['symbol'],
+            'currency': info['currency'],
+            'exchange': info['exchangeName'],
+            'current_price': info.get('regularMarketPrice', 0),
+            'previous_close': info.get('chartPreviousClose', 0)
+        }
+        return CandleSeries.from_chart_result(result).compact()
+
+    def _split_closed(self, bars, now, interval_seconds):
+        closed_count = int(np.searchsorted(bars.timestamp + interval_seconds, now, side='right'))
+        return bars[:closed_count], bars[closed_count:]
+
+    def _tail_dict(self, bars):
+        if not len(bars):
+            return None
+        return {field: getattr(bars, field).tolist() for field in CANDLE_FIELDS}
+
+    def _merge_new_bars(self, directory, meta, fetched, last_closed, now, interval_seconds, range_start):
+        new_bars = fetched.since(last_closed + 1)
+        closed, forming = self._split_closed(new_bars, now, interval_seconds)
+        if len(closed):
+            self._append(directory, meta, closed)
+            self._count('bars_appended', len(closed))
+        meta['tail'] = self._tail_dict(forming)
+        meta['last_fetch'] = now
+
+        old_generation = None
+        if meta['count'] > 2 * self.retention_bars:
+            # Never drop bars of the range being served
+            keep = max(self.retention_bars, len(self._closed_bars(directory, meta).since(range_start)))
+            if meta['count'] > 2 * keep:
+                old_generation = self._compact(directory, meta, keep)
+        self._write_meta(directory, meta)
+        if old_generation is not None:
+            shutil.rmtree(os.path.join(directory, f'g{old_generation}'), ignore_errors=True)
+
+    def _full_fetch(self, symbol, interval, range, range_start, interval_seconds, directory, meta, fetch, stored):
+        data = fetch(symbol, interval, range)
+        if 'error' in data:
+            return data
+        self._count('full_fetches')
+
+        now = self.clock()
+        fetched = self._parse(data, meta)
+        self._count('bars_fetched', len(fetched))
+        closed, forming = self._split_closed(fetched, now, interval_seconds)
+
+        # Keep stored bars newer than the fetched ones (none in practice) and replace the rest
+        if meta.get('covered_from') is not None and len(stored) and len(closed):
+            newer = stored.since(int(closed.timestamp[-1]) + 1)
+            closed = CandleSeries(*(np.concatenate((getattr(closed, field), getattr(newer, field)))
+                                    for field in CANDLE_FIELDS))
+
+        old_generation = self._rewrite(directory, meta, closed)
+        self._count('bars_appended', len(closed))
+        meta['covered_from'] = range_start
+        meta['tail'] = self._tail_dict(forming)
+        meta['last_fetch'] = now
+        self._write_meta(directory, meta)
+        shutil.rmtree(os.path.join(directory, f'g{old_generation}'), ignore_errors=True)
+        return None
+
+    def _compact(self, directory, meta, retention_bars=None):
+        """Keep the newest closed bars in a new generation and return the old generation"""
+        closed = self._closed_bars(directory, meta).tail(retention_bars or self.retention_bars)
+        # Copy out of the memory maps before the files are replaced
+        kept = CandleSeries(*(np.array(getattr(closed, field)) for field in CANDLE_FIELDS))
+        old_generation = self._rewrite(directory, meta, kept)
+        meta['covered_from'] = int(kept.timestamp[0]) if len(kept) else None
+        self._count('compactions')
+        return old_generation
+
+    def compact(self, symbol, interval, retention_bars=None):
+        """
+        Drop all but the newest closed bars of a series
+
+        Args:
+            symbol: Trading pair symbol
+            interval: Data interval
+            retention_bars: Bars to keep (defaults to the store's retention_bars)
+        """
+        directory = self._dir(symbol, interval)
+        with self._locked(directory):
+            meta = self._read_meta(directory)
+            if meta['count'] == 0:
+                return
+            old_generation = self._compact(directory, meta, retention_bars)
+            self._write_meta(directory, meta)
+            shutil.rmtree(os.path.join(directory, f'g{old_generation}'), ignore_errors=True)
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['root'] = self.root
+        return stats
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_store():
+    """Process-wide store used by MarketDataService, or None unless TRADING_CANDLE_STORE=1"""
+    global _shared_store
+    if not STORE_ENABLED:
+        return None
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = CandleStore()
+        return _shared_store
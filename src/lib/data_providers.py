@@ -0,0 +1,250 @@
+import os
+import sys
+import json
+import gzip
+import time
+import hashlib
+import argparse
+import threading
+
+# live: upstream ApiClient, record: live and save every response, replay: serve saved responses,
+# fake: synthetic data from fake_upstream
+PROVIDER_MODES = ('live', 'record', 'replay', 'fake')
+
+DEFAULT_PROVIDER_MODE = os.environ.get('TRADING_DATA_PROVIDER', 'live')
+
+DEFAULT_RECORDING_DIR = os.environ.get('TRADING_RECORDING_DIR', '/tmp/trading-bot-recordings')
+
+# Replay delay as a fraction of the recorded upstream latency; 0 replays at full speed
+DEFAULT_REPLAY_TIME_SCALE = float(os.environ.get('TRADING_REPLAY_TIME_SCALE', 0))
+
+# Query keys that select a response; other keys (e.g. includePrePost) do not change the recording
+RECORDING_KEY_FIELDS = ('symbol', 'interval', 'range')
+
+# Chart bounds (market_data.chart_request) are part of the key only when a query sets them
+RECORDING_BOUND_FIELDS = ('period1', 'period2')
+
+
+class LiveProvider:
+    """The upstream ApiClient, imported on first use so other modes never need the sandbox runtime"""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def call_api(self, endpoint, query=None):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    sys.path.append('/opt/.manus/.sandbox-runtime')
+                    from data_api import ApiClient
+                    self._client = ApiClient()
+        return self._client.call_api(endpoint, query=query)
+
+
+def recording_path(directory, endpoint, query):
+    """
+    File holding the recorded response of one call
+
+    Args:
+        directory: Recording directory
+        endpoint: API endpoint (e.g. 'YahooFinance/get_stock_chart')
+        query: Query dictionary of the call
+
+    Returns:
+        Path of a gzip-compressed JSON file
+    """
+    query = query or {}
+    key = {field: query.get(field) for field in RECORDING_KEY_FIELDS}
+    key.update({field: query[field] for field in RECORDING_BOUND_FIELDS if field in query})
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(directory, endpoint.replace('/', '_'), f'{digest}.json.gz')
+
+
+class RecordingProvider:
+    """
+    Forwards calls to another provider and saves every successful response
+
+    Each recording holds the query, the response and the upstream latency, so a
+    ReplayProvider can serve it back later. A newer response for the same query
+    replaces the older one.
+    """
+
+    def __init__(self, inner=None, directory=DEFAULT_RECORDING_DIR, compress_level=6):
+        self.inner = inner if inner is not None else LiveProvider()
+        self.directory = directory
+        self.compress_level = compress_level
+        self.recorded = 0
+
+    def call_api(self, endpoint, query=None):
+        start = time.perf_counter()
+        data = self.inner.call_api(endpoint, query=query)
+        elapsed = time.perf_counter() - start
+
+        if data and 'error' not in data:
+            self._save(endpoint, query, data, elapsed)
+        return data
+
+    def _save(self, endpoint, query, data, elapsed):
+        path = recording_path(self.directory, endpoint, query)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        recording = {
+            'endpoint': endpoint,
+            'query': query,
+            'recorded_at': time.time(),
+            'elapsed': elapsed,
+            'response': data
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with gzip.open(temp_path, 'wt', compresslevel=self.compress_level) as f:
+                json.dump(recording, f)
+            os.replace(temp_path, path)
+            self.recorded += 1
+        except OSError as e:
+            # Recording is best effort; the caller still gets the live response
+            print(f"Could not record {endpoint}: {str(e)}", file=sys.stderr)
+
+
+class ReplayProvider:
+    """
+    Serves responses saved by RecordingProvider without any network access
+
+    With time_scale 0 responses come back immediately; with 1 every call waits as
+    long as the recorded upstream call took (0.5 is twice as fast, and so on).
+    Recordings are read once and kept in memory as JSON text; every call returns a
+    freshly decoded copy, so callers cannot change what later calls see.
+    """
+
+    def __init__(self, directory=DEFAULT_RECORDING_DIR, time_scale=DEFAULT_REPLAY_TIME_SCALE):
+        self.directory = directory
+        self.time_scale = time_scale
+        self._recordings = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _load(self, path):
+        with self._lock:
+            recording = self._recordings.get(path)
+        if recording is not None:
+            return recording
+
+        with gzip.open(path, 'rt') as f:
+            saved = json.load(f)
+        recording = (saved['elapsed'], json.dumps(saved['response']))
+        with self._lock:
+            self._recordings[path] = recording
+        return recording
+
+    def call_api(self, endpoint, query=None):
+        path = recording_path(self.directory, endpoint, query)
+        try:
+            elapsed, response = self._load(path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.stats['misses'] += 1
+            symbol = (query or {}).get('symbol')
+            raise LookupError(f'No recording of {endpoint} for {symbol} in {self.directory}')
+
+        with self._lock:
+            self.stats['hits'] += 1
+        if self.time_scale:
+            time.sleep(elapsed * self.time_scale)
+        return json.loads(response)
+
+
+def create_provider(mode=None, directory=None, time_scale=None):
+    """
+    Create a data provider (any object with ApiClient's call_api(endpoint, query))
+
+    Args:
+        mode: One of PROVIDER_MODES (defaults to TRADING_DATA_PROVIDER)
+        directory: Recording directory for 'record' and 'replay'
+        time_scale: Replay delay factor for 'replay'
+
+    Returns:
+        Data provider
+    """
+    mode = mode or DEFAULT_PROVIDER_MODE
+    directory = directory or DEFAULT_RECORDING_DIR
+    if mode == 'live':
+        return LiveProvider()
+    if mode == 'record':
+        return RecordingProvider(LiveProvider(), directory)
+    if mode == 'replay':
+        return ReplayProvider(directory, DEFAULT_REPLAY_TIME_SCALE if time_scale is None else time_scale)
+    if mode == 'fake':
+        from fake_upstream import FakeUpstreamClient
+        return FakeUpstreamClient(latency=0.0)
+    raise ValueError(f'Unknown data provider: {mode} (expected one of {", ".join(PROVIDER_MODES)})')
+
+
+_default_provider = None
+_default_provider_lock = threading.Lock()
+
+
+def get_default_provider():
+    """Process-wide provider selected by TRADING_DATA_PROVIDER, shared by every service"""
+    global _default_provider
+    with _default_provider_lock:
+        if _default_provider is None:
+            _default_provider = create_provider()
+        return _default_provider
+
+
+def list_recordings(directory=DEFAULT_RECORDING_DIR):
+    """Endpoint, query and recording time of every saved response"""
+    recordings = []
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            if not name.endswith('.json.gz'):
+                continue
+            try:
+                with gzip.open(os.path.join(root, name), 'rt') as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                continue
+            recordings.append({
+                'endpoint': saved['endpoint'],
+                'query': saved['query'],
+                'recorded_at': saved['recorded_at'],
+                'elapsed': saved['elapsed']
+            })
+    return recordings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Record upstream market data for offline replay')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='Fetch and save charts and insights')
+    record_parser.add_argument('symbols', nargs='+')
+    record_parser.add_argument('--charts', default='1d:1mo,1d:3mo,1d:1y,1m:1d,15m:1d',
+                               help='Comma-separated interval:range pairs')
+    record_parser.add_argument('--directory', default=DEFAULT_RECORDING_DIR)
+
+    list_parser = subparsers.add_parser('list', help='List saved recordings')
+    list_parser.add_argument('--directory', default=DEFAULT_RECORDING_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        print(json.dumps(list_recordings(args.directory), indent=2))
+    else:
+        from market_data import MarketDataService
+
+        recorder = RecordingProvider(directory=args.directory)
+        service = MarketDataService(client=recorder, use_cache=False)
+        symbols = [symbol for arg in args.symbols for symbol in arg.split(',')]
+        charts = [chart.split(':') for chart in args.charts.split(',')]
+
+        errors = {}
+        for symbol in symbols:
+            for interval, data_range in charts:
+                data = service.get_stock_data(symbol, interval, data_range)
+                if 'error' in data:
+                    errors[f'{symbol} {interval} {data_range}'] = data['error']
+            insights = service.get_stock_insights(symbol)
+            if 'error' in insights:
+                errors[f'{symbol} insights'] = insights['error']
+
+        print(json.dumps({'recorded': recorder.recorded, 'directory': args.directory, 'errors': errors}))
@@ -0,0 +1,185 @@
+import time
+import zlib
+import threading
+import numpy as np
+
+from market_data_cache import INTERVAL_SECONDS, RANGE_SECONDS
+
+# Upper bound on the bars of one synthetic response
+MAX_BARS = 20000
+
+
+def synthetic_candles(symbol, bars, interval_seconds=86400, end=None, start_price=100.0, volatility=0.01, seed=None):
+    """
+    Geometric Brownian motion OHLCV candles, deterministic per symbol (and seed)
+
+    Args:
+        symbol: Symbol used to seed the generator
+        bars: Number of candles
+        interval_seconds: Candle length
+        end: Epoch time of the last candle (defaults to now, aligned to the interval)
+        start_price: Price before the first candle
+        volatility: Standard deviation of the per-candle log return
+        seed: Optional extra seed
+
+    Returns:
+        Dictionary of arrays: timestamp, open, high, low, close, volume
+    """
+    rng = np.random.default_rng([zlib.crc32(symbol.encode()), seed or 0])
+    if end is None:
+        end = int(time.time()) // interval_seconds * interval_seconds
+
+    returns = rng.normal(0, volatility, bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    open = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0, volatility / 2, bars))
+
+    return {
+        'timestamp': end - interval_seconds * np.arange(bars - 1, -1, -1, dtype=np.int64),
+        'open': open,
+        'high': np.maximum(open, close) * (1 + spread),
+        'low': np.minimum(open, close) * (1 - spread),
+        'close': close,
+        'volume': rng.integers(1, 10000, bars).astype(np.float64)
+    }
+
+
+def _hash_uniform(keys, seed):
+    """Deterministic uniform [0, 1) value per integer key (splitmix64)"""
+    x = keys.astype(np.uint64) ^ np.uint64(seed)
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def anchored_candles(symbol, timestamps, interval_seconds, start_price=100.0, volatility=0.01):
+    """
+    Candles whose prices depend only on (symbol, timestamp)
+
+    Unlike synthetic_candles, overlapping requests with different ranges return the
+    same values for the same bars, like a real upstream does.
+
+    Args:
+        symbol: Symbol used to seed the prices
+        timestamps: Array of candle start times (epoch seconds)
+        interval_seconds: Candle length
+
+    Returns:
+        Dictionary of arrays: timestamp, open, high, low, close, volume
+    """
+    seed = zlib.crc32(symbol.encode())
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+
+    def price(at):
+        t = at.astype(np.float64)
+        trend = (0.3 * np.sin(2 * np.pi * t / (90 * 86400) + seed % 11)
+                 + 0.03 * np.sin(2 * np.pi * t / (7 * 86400) + seed % 7)
+                 + 0.005 * np.sin(2 * np.pi * t / 86400))
+        noise = (_hash_uniform(at, seed) - 0.5) * 2 * volatility
+        return start_price * np.exp(trend + noise)
+
+    close = price(timestamps + interval_seconds)
+    open = price(timestamps)
+    spread = _hash_uniform(timestamps, seed + 1) * volatility / 2
+
+    return {
+        'timestamp': timestamps,
+        'open': open,
+        'high': np.maximum(open, close) * (1 + spread),
+        'low': np.minimum(open, close) * (1 - spread),
+        'close': close,
+        'volume': np.floor(_hash_uniform(timestamps, seed + 2) * 10000) + 1
+    }
+
+
+def chart_payload(symbol, candles):
+    """Wrap synthetic candles in the YahooFinance/get_stock_chart response layout"""
+    close = candles['close']
+    return {
+        'chart': {
+            'result': [{
+                'meta': {
+                    'symbol': symbol,
+                    'currency': 'USD',
+                    'exchangeName': 'CCC',
+                    'regularMarketPrice': float(close[-1]) if len(close) else 0,
+                    'chartPreviousClose': float(close[0]) if len(close) else 0
+                },
+                'timestamp': candles['timestamp'].tolist(),
+                'indicators': {
+                    'quote': [{
+                        field: candles[field].tolist() for field in ('open', 'high', 'low', 'close', 'volume')
+                    }]
+                }
+            }],
+            'error': None
+        }
+    }
+
+
+def insights_payload(symbol):
+    """Minimal YahooFinance/get_stock_insights response"""
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    outlooks = {}
+    for name in ('shortTermOutlook', 'intermediateTermOutlook', 'longTermOutlook'):
+        score = float(rng.uniform(-1, 1))
+        outlooks[name] = {
+            'score': score,
+            'direction': 'Bullish' if score > 0 else 'Bearish',
+            'scoreDescription': 'Synthetic outlook'
+        }
+    return {'finance': {'result': {'symbol': symbol, 'instrumentInfo': {'technicalEvents': outlooks}}}}
+
+
+class FakeUpstreamClient:
+    """
+    Offline stand-in for ApiClient with configurable latency and failures
+
+    Serves deterministic synthetic charts (anchored_candles) and insights through the same call_api
+    interface, so MarketDataService, AsyncMarketDataService and the benchmarks can
+    run without network access.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def call_api(self, endpoint, query=None):
+        query = query or {}
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.failure_rate and self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise ConnectionError(f'Simulated upstream failure for {endpoint}')
+
+        symbol = query.get('symbol', '')
+        if endpoint == 'YahooFinance/get_stock_chart':
+            interval_seconds = INTERVAL_SECONDS.get(query.get('interval', '1d'), 86400)
+            range_seconds = RANGE_SECONDS.get(query.get('range', '1mo'), 30 * 86400)
+            bars = max(1, min(MAX_BARS, range_seconds // interval_seconds))
+            # The last bar is the one still forming
+            end = int(time.time()) // interval_seconds * interval_seconds
+            if 'period1' in query:
+                # Bars starting in [period1, period2], like upstream
+                end = min(end, int(query.get('period2', end)) // interval_seconds * interval_seconds)
+                first = -(-int(query['period1']) // interval_seconds) * interval_seconds
+                bars = max(0, min(MAX_BARS, (end - first) // interval_seconds + 1))
+            timestamps = end - interval_seconds * np.arange(bars - 1, -1, -1, dtype=np.int64)
+            return chart_payload(symbol, anchored_candles(symbol, timestamps, interval_seconds))
+        if endpoint == 'YahooFinance/get_stock_insights':
+            return insights_payload(symbol)
+
+        return {'error': f'Unknown endpoint: {endpoint}'}
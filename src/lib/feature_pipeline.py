@@ -0,0 +1,153 @@
+import re
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+DEFAULT_FEATURE_COLUMNS = ('close', 'volume', 'returns', 'sma_20', 'ema_12', 'rsi')
+
+RSI_WINDOW = 14
+
+_WINDOWED_COLUMN = re.compile(r'^(sma|ema|rsi)_(\d+)$')
+
+
+def sliding_windows(data, look_back, horizon=1):
+    """
+    Input/target windows over a time series as zero-copy strided views
+
+    Args:
+        data: Array of shape (n,) or (n, features)
+        look_back: Number of time steps in each input window
+        horizon: Number of time steps after each window used as the target
+
+    Returns:
+        X: View of shape (samples, look_back) or (samples, look_back, features)
+        y: View of shape (samples, horizon) or (samples, horizon, features)
+        where samples = n - look_back - horizon + 1
+    """
+    data = np.asarray(data)
+    windows = sliding_window_view(data, look_back + horizon, axis=0)
+    if data.ndim > 1:
+        # (samples, features, time) -> (samples, time, features), still a view
+        windows = np.moveaxis(windows, -1, 1)
+    return windows[:, :look_back], windows[:, look_back:]
+
+
+def _rolling_mean(values, window):
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def _ema(values, span):
+    # Same recurrence as pandas ewm(span=span, adjust=False).mean()
+    alpha = 2 / (span + 1)
+    result = np.empty(len(values))
+    value = values[0] if len(values) else 0.0
+    for i, x in enumerate(values.tolist()):
+        value = alpha * x + (1 - alpha) * value
+        result[i] = value
+    return result
+
+
+def _rsi(closes, window):
+    # The first bar counts as a zero change, as in analyze_technical_indicators
+    change = np.diff(closes, prepend=closes[:1])
+    gain = _rolling_mean(np.where(change > 0, change, 0.0), window)
+    loss = _rolling_mean(np.where(change < 0, -change, 0.0), window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + gain / loss)
+
+
+def feature_column(series, name):
+    """
+    Compute one feature column from a CandleSeries
+
+    Supported names: open, high, low, close, volume, returns, log_returns,
+    sma_<n>, ema_<n>, rsi (14 bars) and rsi_<n>
+
+    Returns:
+        float64 array with one value per bar (NaN until enough bars are available)
+    """
+    closes = series.close
+    if name in ('open', 'high', 'low', 'close', 'volume'):
+        return np.asarray(getattr(series, name), dtype=np.float64)
+    if name == 'returns':
+        return np.diff(closes, prepend=np.nan) / np.concatenate(([np.nan], closes[:-1]))
+    if name == 'log_returns':
+        return np.diff(np.log(closes), prepend=np.nan)
+    if name == 'rsi':
+        return _rsi(closes, RSI_WINDOW)
+
+    match = _WINDOWED_COLUMN.match(name)
+    if match is None:
+        raise ValueError(f'Unknown feature column: {name}')
+    kind, window = match.group(1), int(match.group(2))
+    if kind == 'sma':
+        return _rolling_mean(closes, window)
+    if kind == 'ema':
+        return _ema(closes, window)
+    return _rsi(closes, window)
+
+
+class FeatureSet:
+    """
+    Feature matrix of a symbol (one row per bar, one column per feature)
+
+    windows() returns views into the matrix.
+    """
+
+    def __init__(self, matrix, columns, timestamps):
+        self.matrix = matrix
+        self.columns = tuple(columns)
+        self.timestamps = timestamps
+
+        # Rows before this one have NaN in a warm-up column (moving averages, returns, RSI)
+        finite_rows = np.flatnonzero(np.isfinite(matrix).all(axis=1))
+        self.valid_from = int(finite_rows[0]) if len(finite_rows) else len(matrix)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def column(self, name):
+        return self.matrix[:, self.columns.index(name)]
+
+    def windows(self, look_back, horizon=1, target='close'):
+        """
+        Input windows over every feature and target windows over one column, skipping warm-up rows
+
+        Args:
+            look_back: Number of bars in each input window
+            horizon: Number of future bars in each target window
+            target: Column predicted by the model
+
+        Returns:
+            X: View of shape (samples, look_back, features)
+            y: View of shape (samples, horizon)
+        """
+        matrix = self.matrix[self.valid_from:]
+        X, _ = sliding_windows(matrix, look_back, horizon)
+        _, y = sliding_windows(matrix[:, self.columns.index(target)], look_back, horizon)
+        return X, y
+
+    def multi_windows(self, look_backs, horizon=1, target='close'):
+        """windows() for several look-backs, keyed by look-back"""
+        return {look_back: self.windows(look_back, horizon, target) for look_back in look_backs}
+
+
+def build_feature_set(series, columns=DEFAULT_FEATURE_COLUMNS):
+    """
+    Feature matrix for a CandleSeries
+
+    Args:
+        series: CandleSeries with valid bars only
+        columns: Feature column names (see feature_column)
+
+    Returns:
+        FeatureSet (use .windows(look_back) for model inputs)
+    """
+    columns = tuple(columns)
+    matrix = np.empty((len(series), len(columns)))
+    for index, name in enumerate(columns):
+        matrix[:, index] = feature_column(series, name)
+    return FeatureSet(matrix, columns, series.timestamp)
@@ -0,0 +1,77 @@
+import sys
+import os
+import json
+import argparse
+import statistics
+import subprocess
+
+# Cold-start budget for `import market_analysis`, in milliseconds
+DEFAULT_IMPORT_BUDGET_MS = float(os.environ.get('MARKET_ANALYSIS_IMPORT_BUDGET_MS', 200))
+
+# Modules that must not be loaded as a side effect of importing market_analysis
+DEFERRED_MODULES = ('pandas', 'sklearn', 'tensorflow')
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{
+    'elapsed_ms': elapsed_ms,
+    'loaded': [name for name in {deferred!r} if name in sys.modules]
+}}))
+"""
+
+
+def measure_import(module='market_analysis', runs=5):
+    """
+    Measure the cold import time of a module in fresh interpreters
+
+    Args:
+        module: Name of the module to import (resolved from src/lib)
+        runs: Number of fresh interpreters to start
+
+    Returns:
+        Dictionary with the median/min/max import time and the deferred modules that got loaded
+    """
+    lib_dir = os.path.dirname(os.path.abspath(__file__))
+    probe = _PROBE.format(module=module, deferred=DEFERRED_MODULES)
+    timings = []
+    loaded = set()
+
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', probe],
+            cwd=lib_dir,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        timings.append(sample['elapsed_ms'])
+        loaded.update(sample['loaded'])
+
+    return {
+        'module': module,
+        'runs': runs,
+        'median_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'max_ms': max(timings),
+        'eagerly_loaded': sorted(loaded)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fail if importing market_analysis exceeds its cold-start budget')
+    parser.add_argument('--module', default='market_analysis')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    result = measure_import(args.module, args.runs)
+    result['budget_ms'] = args.budget_ms
+    result['passed'] = result['median_ms'] <= args.budget_ms and not result['eagerly_loaded']
+    print(json.dumps(result, indent=2))
+
+    if not result['passed']:
+        sys.exit(1)
@@ -0,0 +1,345 @@
+import sys
+import math
+import argparse
+from collections import deque
+
+SMA_WINDOWS = (5, 10, 20)
+EMA_SPANS = (5, 10, 12, 20, 26)
+RSI_WINDOW = 14
+MACD_FAST_SPAN = 12
+MACD_SLOW_SPAN = 26
+MACD_SIGNAL_SPAN = 9
+
+# Weight left on an EMA's first value before a series start no longer matters
+EMA_START_WEIGHT = 1e-9
+
+# Bars a series must share with the engine before its start can move without a reseed:
+# the rolling windows no longer hold the dropped bars, the slowest EMA has forgotten its
+# first value and the MACD signal has caught up with the MACD
+WARMUP_BARS = max(
+    max(SMA_WINDOWS),
+    RSI_WINDOW + 1,
+    math.ceil(math.log(EMA_START_WEIGHT) / math.log(1 - 2 / (max(EMA_SPANS) + 1))) + MACD_SIGNAL_SPAN
+)
+
+# Running sums are recomputed from the window this often to stop floating-point drift
+RESUM_EVERY = 1024
+
+
+class RollingMean:
+    """Mean of the last `window` values in O(1) per update (pandas rolling(window).mean())"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+        self.updates += 1
+        if self.updates % RESUM_EVERY == 0:
+            self.total = math.fsum(self.values)
+
+        return self.value
+
+    def peek(self, value):
+        """Mean after adding `value`, without changing the window"""
+        if len(self.values) + 1 < self.window:
+            return math.nan
+        total = self.total + value
+        if len(self.values) == self.window:
+            total -= self.values[0]
+        return total / self.window
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return math.nan
+        return self.total / self.window
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values), 'updates': self.updates}
+
+    @classmethod
+    def from_dict(cls, state):
+        rolling = cls(state['window'])
+        rolling.values.extend(state['values'])
+        rolling.total = math.fsum(rolling.values)
+        rolling.updates = state['updates']
+        return rolling
+
+
+class ExponentialMean:
+    """Exponential moving average in O(1) per update (pandas ewm(span=span, adjust=False).mean())"""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2 / (span + 1)
+        self.value = math.nan
+
+    def update(self, value):
+        self.value = self.peek(value)
+        return self.value
+
+    def peek(self, value):
+        """Average after adding `value`, without changing the state"""
+        if math.isnan(self.value):
+            return value
+        return self.alpha * value + (1 - self.alpha) * self.value
+
+    def to_dict(self):
+        return {'span': self.span, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, state):
+        ema = cls(state['span'])
+        ema.value = state['value']
+        return ema
+
+
+def _indicator_values(sma, ema, gain, loss, macd_signal):
+    values = {f'SMA_{window}': value for window, value in sma.items()}
+    values.update({f'EMA_{span}': value for span, value in ema.items()})
+
+    if math.isnan(gain) or math.isnan(loss) or (gain == 0 and loss == 0):
+        values['RSI'] = math.nan
+    elif loss == 0:
+        values['RSI'] = 100.0
+    else:
+        values['RSI'] = 100 - (100 / (1 + gain / loss))
+
+    macd = ema[MACD_FAST_SPAN] - ema[MACD_SLOW_SPAN]
+    values['MACD'] = macd
+    values['MACD_Signal'] = macd_signal
+    values['MACD_Histogram'] = macd - macd_signal
+    return values
+
+
+class IndicatorEngine:
+    """
+    Stateful technical indicators updated one bar at a time:
+    - SMA 5/10/20, EMA 5/10/12/20/26
+    - RSI-14 (simple rolling mean of gains/losses)
+    - MACD (EMA 12 - EMA 26), signal (EMA 9 of MACD) and histogram
+
+    Values use the same definitions as the pandas code in analyze_technical_indicators,
+    and the state can be serialized with to_dict/from_dict.
+    """
+
+    def __init__(self):
+        self.sma = {window: RollingMean(window) for window in SMA_WINDOWS}
+        self.ema = {span: ExponentialMean(span) for span in EMA_SPANS}
+        self.rsi_gain = RollingMean(RSI_WINDOW)
+        self.rsi_loss = RollingMean(RSI_WINDOW)
+        self.macd_signal = ExponentialMean(MACD_SIGNAL_SPAN)
+        self.last_close = None
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.count = 0
+
+    def seed(self, closes, timestamps=None):
+        """
+        Feed historical closes in order
+
+        Args:
+            closes: Iterable of closing prices
+            timestamps: Optional matching iterable of epoch timestamps
+
+        Returns:
+            The engine itself
+        """
+        if timestamps is None:
+            for close in closes:
+                self.update(float(close))
+        else:
+            for close, timestamp in zip(closes, timestamps):
+                self.update(float(close), int(timestamp))
+        return self
+
+    def update(self, close, timestamp=None):
+        """
+        Add one closed bar
+
+        Args:
+            close: Closing price
+            timestamp: Optional epoch timestamp of the bar
+
+        Returns:
+            Dictionary of the latest indicator values
+        """
+        for sma in self.sma.values():
+            sma.update(close)
+        for ema in self.ema.values():
+            ema.update(close)
+
+        # The first bar has no change; pandas counts it as a zero gain and zero loss
+        change = 0.0 if self.last_close is None else close - self.last_close
+        self.rsi_gain.update(change if change > 0 else 0.0)
+        self.rsi_loss.update(-change if change < 0 else 0.0)
+
+        self.macd_signal.update(self.ema[MACD_FAST_SPAN].value - self.ema[MACD_SLOW_SPAN].value)
+
+        self.last_close = close
+        if timestamp is not None:
+            if self.first_timestamp is None:
+                self.first_timestamp = timestamp
+            self.last_timestamp = timestamp
+        self.count += 1
+
+        return self.latest()
+
+    def peek(self, close):
+        """Indicator values if a bar closed at `close`, without changing the engine"""
+        change = 0.0 if self.last_close is None else close - self.last_close
+        ema = {span: average.peek(close) for span, average in self.ema.items()}
+        macd = ema[MACD_FAST_SPAN] - ema[MACD_SLOW_SPAN]
+        return _indicator_values(
+            {window: sma.peek(close) for window, sma in self.sma.items()},
+            ema,
+            self.rsi_gain.peek(change if change > 0 else 0.0),
+            self.rsi_loss.peek(-change if change < 0 else 0.0),
+            self.macd_signal.peek(macd)
+        )
+
+    def sync(self, series):
+        """
+        Bring the engine up to date with a CandleSeries and return the values for its last bar
+
+        Bars already seen are skipped, so refreshing the same window costs O(new bars).
+        The last bar may still be forming, so it is previewed with peek() rather than committed.
+        A fixed-range window whose start moved forward keeps the state as long as it shares
+        at least WARMUP_BARS bars with the engine: the bars that left only ever reached the
+        rolling windows long ago and the EMAs have forgotten them. Otherwise (shorter
+        overlap, earlier start, gaps) the engine is reseeded, so the result is the same as
+        computing over the series from scratch.
+
+        Args:
+            series: CandleSeries with valid bars only, ordered by timestamp
+
+        Returns:
+            Dictionary of the indicator values at the last bar
+        """
+        timestamps = series.timestamp
+        closes = series.close
+        if len(series) == 0:
+            return self.latest()
+
+        committed_end = len(series) - 1
+        start = None
+        if self.count and self.first_timestamp is not None and self.last_timestamp is not None:
+            first = int(timestamps[0])
+            resume = int(timestamps.searchsorted(self.last_timestamp, side='right'))
+            seen = 0 < resume <= committed_end and int(timestamps[resume - 1]) == self.last_timestamp
+            if seen and first == self.first_timestamp:
+                start = resume
+            elif seen and first > self.first_timestamp and resume >= WARMUP_BARS:
+                self.first_timestamp = first
+                start = resume
+
+        if start is None:
+            self.__init__()
+            start = 0
+
+        self.seed(closes[start:committed_end].tolist(), timestamps[start:committed_end].tolist())
+        return self.peek(float(closes[-1]))
+
+    def latest(self):
+        """
+        Current indicator values, keyed like the DataFrame columns in analyze_technical_indicators
+
+        Returns:
+            Dictionary of indicator values (NaN until enough bars were seen)
+        """
+        return _indicator_values(
+            {window: sma.value for window, sma in self.sma.items()},
+            {span: ema.value for span, ema in self.ema.items()},
+            self.rsi_gain.value,
+            self.rsi_loss.value,
+            self.macd_signal.value
+        )
+
+    def to_dict(self):
+        """JSON-serializable engine state"""
+        return {
+            'sma': [sma.to_dict() for sma in self.sma.values()],
+            'ema': [ema.to_dict() for ema in self.ema.values()],
+            'rsi_gain': self.rsi_gain.to_dict(),
+            'rsi_loss': self.rsi_loss.to_dict(),
+            'macd_signal': self.macd_signal.to_dict(),
+            'last_close': self.last_close,
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+            'count': self.count
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Restore an engine saved with to_dict"""
+        engine = cls()
+        engine.sma = {item['window']: RollingMean.from_dict(item) for item in state['sma']}
+        engine.ema = {item['span']: ExponentialMean.from_dict(item) for item in state['ema']}
+        engine.rsi_gain = RollingMean.from_dict(state['rsi_gain'])
+        engine.rsi_loss = RollingMean.from_dict(state['rsi_loss'])
+        engine.macd_signal = ExponentialMean.from_dict(state['macd_signal'])
+        engine.last_close = state['last_close']
+        engine.first_timestamp = state['first_timestamp']
+        engine.last_timestamp = state['last_timestamp']
+        engine.count = state['count']
+        return engine
+
+
+def check_sliding(bars=1440, steps=200, seed=0):
+    """
+    Compare a sliding fixed-size window synced incrementally with a full recompute per step
+
+    Args:
+        bars: Window size
+        steps: Number of one-bar slides
+        seed: Seed of the random walk
+
+    Returns:
+        Largest relative difference over all steps and indicators
+    """
+    import numpy as np
+    from candle_series import CandleSeries
+
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars + steps)))
+    timestamps = np.arange(bars + steps, dtype=np.int64) * 60
+
+    def window(end):
+        begin = end - bars
+        return CandleSeries(
+            timestamps[begin:end], closes[begin:end], closes[begin:end], closes[begin:end],
+            closes[begin:end], np.zeros(bars)
+        )
+
+    engine = IndicatorEngine()
+    worst = 0.0
+    for end in range(bars, bars + steps + 1):
+        incremental = engine.sync(window(end))
+        full = IndicatorEngine().sync(window(end))
+        for name, expected in full.items():
+            if math.isnan(expected):
+                if not math.isnan(incremental[name]):
+                    return math.inf
+                continue
+            worst = max(worst, abs(incremental[name] - expected) / max(abs(expected), 1.0))
+    return worst
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check incremental indicators against a full recompute')
+    parser.add_argument('--bars', type=int, default=1440)
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--tolerance', type=float, default=1e-7)
+    args = parser.parse_args()
+
+    worst = check_sliding(args.bars, args.steps)
+    print(f'Largest relative difference: {worst:.3g}')
+    sys.exit(0 if worst <= args.tolerance else 1)
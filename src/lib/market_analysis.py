@@ -1,16 +1,67 @@
 import sys
-sys.path.append('/opt/.manus/.sandbox-runtime')
-from data_api import ApiClient
+from market_data import MarketDataService
+from indicator_engine import IndicatorEngine
+from model_registry import LSTMModelRegistry
+from feature_pipeline import sliding_windows
+from analysis_cache import get_shared_analysis_cache
 import numpy as np
-import pandas as pd
 import json
-import re
-import requests
 from datetime import datetime, timedelta
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.linear_model import LinearRegression
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
+
+# sklearn and TensorFlow are imported inside the methods that need them,
+# so the sentiment path and short-lived scripts start without paying for them.
+# Technical indicators come from indicator_engine and do not need pandas.
+HEAVY_DEPENDENCIES = ('sklearn.preprocessing', 'tensorflow.keras')
+
+# 'recursive' predicts one day at a time and feeds it back; 'direct' outputs the whole horizon at once
+LSTM_FORECAST_MODES = ('recursive', 'direct')
+
+# Horizon of the direct-mode model; shorter forecasts use the first days of its output
+DIRECT_FORECAST_HORIZON = 30
+
+
+def preload_dependencies():
+    """Import the heavy dependencies up front (used by long-lived workers)"""
+    import importlib
+    
+    for module_name in HEAVY_DEPENDENCIES:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+
+def fit_linear_trends(series_list):
+    """
+    Ordinary least-squares line (close against bar index 0..n-1) for many series at once
+    
+    Series of different lengths are right-padded into one matrix and masked out,
+    so all fits are a handful of array reductions.
+    
+    Args:
+        series_list: List of 1-D arrays of prices
+        
+    Returns:
+        (slopes, intercepts) arrays, one value per series
+    """
+    lengths = np.array([len(values) for values in series_list])
+    width = int(lengths.max())
+    
+    values = np.zeros((len(series_list), width))
+    for row, series in enumerate(series_list):
+        values[row, :len(series)] = series
+    mask = np.arange(width) < lengths[:, None]
+    
+    # Centered sums avoid the cancellation of the n*sum(xy) - sum(x)*sum(y) form
+    x = np.arange(width, dtype=np.float64)
+    x_mean = (lengths - 1) / 2
+    y_mean = values.sum(axis=1) / lengths
+    dx = np.where(mask, x - x_mean[:, None], 0.0)
+    dy = values - y_mean[:, None]
+    
+    slopes = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+    intercepts = y_mean - slopes * x_mean
+    return slopes, intercepts
+
 
 class MarketAnalysisAI:
     """
@@ -20,109 +71,175 @@ class MarketAnalysisAI:
     - Technical Indicators Analysis: Using TA-Lib and TensorFlow
     """
     
-    def __init__(self):
-        self.client = ApiClient()
-        self.market_service = MarketDataService()
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
+    def __init__(self, client=None, market_service=None, analysis_cache=None):
+        # client is a data provider (see data_providers); the default follows TRADING_DATA_PROVIDER
+        self.market_service = market_service if market_service is not None else MarketDataService(client=client)
+        self.client = self.market_service.client
+        # Results of comprehensive_analysis for unchanged inputs; None disables caching
+        self.analysis_cache = analysis_cache if analysis_cache is not None else get_shared_analysis_cache()
+        self._planner = None
+        self._scaler = None
+        self.indicator_engines = {}
+        self.model_registry = LSTMModelRegistry()
+    
+    @property
+    def scaler(self):
+        """MinMaxScaler shared by the LSTM path, created on first use"""
+        if self._scaler is None:
+            from sklearn.preprocessing import MinMaxScaler
+            self._scaler = MinMaxScaler(feature_range=(0, 1))
+        return self._scaler
         
+    def export_indicator_state(self):
+        """
+        Serialize the incremental indicator engines
+        
+        Returns:
+            JSON-serializable list of engine states
+        """
+        return [
+            {'symbol': symbol, 'interval': interval, 'engine': engine.to_dict()}
+            for (symbol, interval), engine in self.indicator_engines.items()
+        ]
+    
+    def load_indicator_state(self, state):
+        """
+        Restore indicator engines saved with export_indicator_state
+        
+        Args:
+            state: List of engine states
+        """
+        for item in state:
+            self.indicator_engines[(item['symbol'], item['interval'])] = IndicatorEngine.from_dict(item['engine'])
+    
     def prepare_data_for_lstm(self, data, look_back=60):
         """
         Prepare data for LSTM model
         
         Args:
-            data: List of price data
+            data: Array of price data, shape (n,) or (n, features)
             look_back: Number of previous time steps to use as input features
             
         Returns:
-            X: Input features
+            X: Input features (strided view of data, no copy)
             y: Target values
         """
-        X, y = [], []
-        for i in range(len(data) - look_back):
-            X.append(data[i:(i + look_back)])
-            y.append(data[i + look_back])
+        X, y = sliding_windows(data, look_back, horizon=1)
+        return X, y[:, 0]
+    
+    def prepare_data_for_direct_forecast(self, data, look_back=60, horizon=DIRECT_FORECAST_HORIZON):
+        """
+        Prepare data for a model that predicts the next `horizon` values at once
         
-        return np.array(X), np.array(y)
+        Args:
+            data: Array of (scaled) prices
+            look_back: Number of previous time steps to use as input features
+            horizon: Number of future time steps to predict
+            
+        Returns:
+            X: Input windows (samples, look_back)
+            y: Target windows (samples, horizon)
+        """
+        return sliding_windows(np.asarray(data).reshape(-1), look_back, horizon)
     
-    def build_lstm_model(self, look_back):
+    def build_lstm_model(self, look_back, horizon=1):
         """
         Build LSTM model for price prediction
         
         Args:
             look_back: Number of previous time steps to use as input features
+            horizon: Number of future time steps predicted by the output layer
             
         Returns:
             Compiled LSTM model
         """
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Dropout
+        
         model = Sequential()
         model.add(LSTM(units=50, return_sequences=True, input_shape=(look_back, 1)))
         model.add(Dropout(0.2))
         model.add(LSTM(units=50, return_sequences=False))
         model.add(Dropout(0.2))
-        model.add(Dense(units=1))
+        model.add(Dense(units=horizon))
         model.compile(optimizer='adam', loss='mean_squared_error')
         
         return model
     
-    def predict_with_lstm(self, symbol, days_to_predict=7):
+    def predict_with_lstm(self, symbol, days_to_predict=7, forecast_mode='recursive', market_data=None):
         """
         Predict future prices using LSTM
         
         Args:
             symbol: Trading pair symbol
             days_to_predict: Number of days to predict
+            forecast_mode: 'recursive' (one-step model fed its own predictions) or
+                'direct' (multi-output model, one forward pass for the whole horizon)
+            market_data: Optional daily series already fetched (see analysis_planner)
             
         Returns:
             Dictionary with prediction results
         """
+        if forecast_mode not in LSTM_FORECAST_MODES:
+            return {'error': f'Unknown forecast mode: {forecast_mode}'}
+        if forecast_mode == 'direct' and days_to_predict > DIRECT_FORECAST_HORIZON:
+            return {'error': f'Direct forecasts are limited to {DIRECT_FORECAST_HORIZON} days'}
+        
         try:
-            # Get historical data
-            market_data = self.market_service.process_market_data(symbol, interval='1d', range='3mo')
+            # Get historical data; every direct-mode sample needs look_back + horizon candles,
+            # so that model trains on a year of data
+            if market_data is None:
+                data_range = '1y' if forecast_mode == 'direct' else '3mo'
+                market_data = self.market_service.process_market_series(symbol, interval='1d', range=data_range)
             
             if 'error' in market_data:
                 return {'error': market_data['error']}
             
             # Extract closing prices
-            closing_prices = [candle['close'] for candle in market_data['data']]
+            series = market_data['series'].compact()
+            closing_prices = series.close
             
             if len(closing_prices) < 60:
                 return {'error': 'Not enough historical data for LSTM prediction'}
             
-            # Scale the data
-            closing_prices_array = np.array(closing_prices).reshape(-1, 1)
-            scaled_data = self.scaler.fit_transform(closing_prices_array)
-            
-            # Prepare data for LSTM
+            # Reuse the model trained on these candles, fine-tune it on new candles,
+            # or train a new one; each model comes with its own fitted scaler
             look_back = 60
-            X, y = self.prepare_data_for_lstm(scaled_data, look_back)
-            
-            # Reshape X to fit LSTM input format [samples, time steps, features]
-            X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+            if forecast_mode == 'direct':
+                horizon = DIRECT_FORECAST_HORIZON
+                if len(closing_prices) < look_back + horizon:
+                    return {'error': 'Not enough historical data for a direct LSTM forecast'}
+                build_model = lambda look_back: self.build_lstm_model(look_back, horizon)
+                prepare_data = lambda data, look_back: self.prepare_data_for_direct_forecast(data, look_back, horizon)
+            else:
+                horizon = 1
+                build_model = self.build_lstm_model
+                prepare_data = self.prepare_data_for_lstm
             
-            # Build and train LSTM model
-            model = self.build_lstm_model(look_back)
-            model.fit(X, y, epochs=50, batch_size=32, verbose=0)
+            model, scaler, model_info = self.model_registry.get_model(
+                symbol, look_back, series.timestamp, closing_prices,
+                build_model, prepare_data, horizon=horizon
+            )
             
             # Prepare input for prediction
-            last_60_days = scaled_data[-look_back:]
-            
-            # Make predictions for the specified number of days
-            predictions = []
-            current_batch = last_60_days.reshape((1, look_back, 1))
+            scaled_data = scaler.transform(closing_prices.reshape(-1, 1))
+            window = np.array(scaled_data[-look_back:], dtype=np.float32).reshape((1, look_back, 1))
             
-            for i in range(days_to_predict):
-                # Predict next day
-                next_day_prediction = model.predict(current_batch)[0]
-                predictions.append(next_day_prediction[0])
-                
-                # Update current batch for next prediction
-                current_batch = np.append(current_batch[:, 1:, :], 
-                                         [[next_day_prediction]], 
-                                         axis=1)
+            if forecast_mode == 'direct':
+                # One forward pass returns every day of the horizon
+                predictions = np.asarray(model(window, training=False))[0, :days_to_predict]
+            else:
+                # Call the model directly instead of model.predict (which sets up a data
+                # pipeline on every call) and shift the window in place
+                predictions = np.empty(days_to_predict)
+                for i in range(days_to_predict):
+                    predictions[i] = np.asarray(model(window, training=False))[0, 0]
+                    window[0, :-1, 0] = window[0, 1:, 0]
+                    window[0, -1, 0] = predictions[i]
             
             # Inverse transform to get actual price predictions
-            predictions_array = np.array(predictions).reshape(-1, 1)
-            predicted_prices = self.scaler.inverse_transform(predictions_array)
+            predictions_array = np.asarray(predictions, dtype=np.float64).reshape(-1, 1)
+            predicted_prices = scaler.inverse_transform(predictions_array)
             
             # Prepare result
             prediction_dates = [(datetime.now() + timedelta(days=i+1)).strftime('%Y-%m-%d') 
@@ -132,6 +249,8 @@ class MarketAnalysisAI:
                 'symbol': symbol,
                 'current_price': market_data['current_price'],
                 'prediction_method': 'LSTM',
+                'forecast_mode': forecast_mode,
+                'model': model_info,
                 'predictions': [
                     {
                         'date': prediction_dates[i],
@@ -146,81 +265,111 @@ class MarketAnalysisAI:
         except Exception as e:
             return {'error': f'Error in LSTM prediction: {str(e)}'}
     
-    def predict_with_linear_regression(self, symbol, days_to_predict=7):
+    def predict_with_linear_regression(self, symbol, days_to_predict=7, market_data=None):
         """
         Predict future prices using Linear Regression
         
         Args:
             symbol: Trading pair symbol
             days_to_predict: Number of days to predict
+            market_data: Optional daily series already fetched (see analysis_planner)
             
         Returns:
             Dictionary with prediction results
         """
-        try:
-            # Get historical data
-            market_data = self.market_service.process_market_data(symbol, interval='1d', range='1mo')
-            
-            if 'error' in market_data:
-                return {'error': market_data['error']}
-            
-            # Extract closing prices
-            closing_prices = [candle['close'] for candle in market_data['data']]
-            
-            if len(closing_prices) < 30:
-                return {'error': 'Not enough historical data for Linear Regression prediction'}
-            
-            # Prepare data for Linear Regression
-            X = np.array(range(len(closing_prices))).reshape(-1, 1)
-            y = np.array(closing_prices)
-            
-            # Build and train Linear Regression model
-            model = LinearRegression()
-            model.fit(X, y)
-            
-            # Prepare input for prediction
-            future_X = np.array(range(len(closing_prices), len(closing_prices) + days_to_predict)).reshape(-1, 1)
-            
-            # Make predictions
-            predicted_prices = model.predict(future_X)
-            
-            # Prepare result
-            prediction_dates = [(datetime.now() + timedelta(days=i+1)).strftime('%Y-%m-%d') 
-                               for i in range(days_to_predict)]
+        prefetched = {symbol: market_data} if market_data is not None else None
+        return self.predict_with_linear_regression_batch([symbol], days_to_predict, prefetched)[symbol]
+    
+    def predict_with_linear_regression_batch(self, symbols, days_to_predict=7, market_data=None):
+        """
+        Predict future prices using Linear Regression for many symbols at once
+        
+        The close series are padded into one matrix and every trend line
+        (close against bar index) is solved in a single vectorized least-squares pass.
+        
+        Args:
+            symbols: List of trading pair symbols
+            days_to_predict: Number of days to predict
+            market_data: Optional dictionary of symbol to daily series already fetched
             
-            prediction_results = {
-                'symbol': symbol,
-                'current_price': market_data['current_price'],
-                'prediction_method': 'Linear Regression',
-                'predictions': [
-                    {
-                        'date': prediction_dates[i],
-                        'predicted_price': float(predicted_prices[i])
+        Returns:
+            Dictionary mapping each symbol to the same result as predict_with_linear_regression
+        """
+        results = {}
+        fitted = []
+        
+        for symbol in dict.fromkeys(symbols):
+            try:
+                # Get historical data
+                symbol_data = (market_data or {}).get(symbol)
+                if symbol_data is None:
+                    symbol_data = self.market_service.process_market_series(symbol, interval='1d', range='1mo')
+                
+                if 'error' in symbol_data:
+                    results[symbol] = {'error': symbol_data['error']}
+                    continue
+                
+                # Extract closing prices
+                closing_prices = symbol_data['series'].compact().close
+                
+                if len(closing_prices) < 30:
+                    results[symbol] = {'error': 'Not enough historical data for Linear Regression prediction'}
+                    continue
+                
+                fitted.append((symbol, symbol_data['current_price'], closing_prices))
+            except Exception as e:
+                results[symbol] = {'error': f'Error in Linear Regression prediction: {str(e)}'}
+        
+        if fitted:
+            try:
+                slopes, intercepts = fit_linear_trends([closes for _, _, closes in fitted])
+                
+                # Each series is extrapolated from its own last index
+                lengths = np.array([len(closes) for _, _, closes in fitted])
+                future_X = lengths[:, None] + np.arange(days_to_predict)
+                predicted_prices = intercepts[:, None] + slopes[:, None] * future_X
+                
+                # Prepare result
+                prediction_dates = [(datetime.now() + timedelta(days=i+1)).strftime('%Y-%m-%d') 
+                                   for i in range(days_to_predict)]
+                
+                for row, (symbol, current_price, _) in enumerate(fitted):
+                    results[symbol] = {
+                        'symbol': symbol,
+                        'current_price': current_price,
+                        'prediction_method': 'Linear Regression',
+                        'predictions': [
+                            {
+                                'date': prediction_dates[i],
+                                'predicted_price': price
+                            }
+                            for i, price in enumerate(predicted_prices[row].tolist())
+                        ]
                     }
-                    for i in range(days_to_predict)
-                ]
-            }
-            
-            return prediction_results
-            
-        except Exception as e:
-            return {'error': f'Error in Linear Regression prediction: {str(e)}'}
+            except Exception as e:
+                for symbol, _, _ in fitted:
+                    results[symbol] = {'error': f'Error in Linear Regression prediction: {str(e)}'}
+        
+        return {symbol: results[symbol] for symbol in symbols}
     
-    def analyze_market_sentiment(self, symbol):
+    def analyze_market_sentiment(self, symbol, insights=None):
         """
         Analyze market sentiment based on news and social media
         
         Args:
             symbol: Trading pair symbol
+            insights: Optional insights response already fetched for the symbol
             
         Returns:
             Dictionary with sentiment analysis results
         """
         try:
             # Get market insights from Yahoo Finance
-            data = self.client.call_api('YahooFinance/get_stock_insights', query={
-                'symbol': symbol
-            })
+            data = insights
+            if data is None:
+                data = self.client.call_api('YahooFinance/get_stock_insights', query={
+                    'symbol': symbol
+                })
             
             if not data or 'finance' not in data or 'result' not in data['finance']:
                 return {'error': 'No insights available for the symbol'}
@@ -313,68 +462,35 @@ class MarketAnalysisAI:
         except Exception as e:
             return {'error': f'Error in sentiment analysis: {str(e)}'}
     
-    def analyze_technical_indicators(self, symbol):
+    def analyze_technical_indicators(self, symbol, market_data=None):
         """
         Analyze technical indicators for trading decisions
         
         Args:
             symbol: Trading pair symbol
+            market_data: Optional daily series already fetched (see analysis_planner)
             
         Returns:
             Dictionary with technical analysis results
         """
         try:
             # Get market data
-            market_data = self.market_service.process_market_data(symbol, interval='1d', range='1mo')
+            if market_data is None:
+                market_data = self.market_service.process_market_series(symbol, interval='1d', range='1mo')
             
             if 'error' in market_data:
                 return {'error': market_data['error']}
             
             # Extract OHLCV data
-            data = market_data['data']
+            series = market_data['series'].compact()
             
-            if len(data) < 14:
+            if len(series) < 14:
                 return {'error': 'Not enough historical data for technical analysis'}
             
-            # Convert to pandas DataFrame
-            df = pd.DataFrame([
-                {
-                    'timestamp': candle['timestamp'],
-                    'open': candle['open'],
-                    'high': candle['high'],
-                    'low': candle['low'],
-                    'close': candle['close'],
-                    'volume': candle['volume']
-                }
-                for candle in data
-            ])
-            
-            # Calculate Simple Moving Averages
-            df['SMA_5'] = df['close'].rolling(window=5).mean()
-            df['SMA_10'] = df['close'].rolling(window=10).mean()
-            df['SMA_20'] = df['close'].rolling(window=20).mean()
-            
-            # Calculate Exponential Moving Averages
-            df['EMA_5'] = df['close'].ewm(span=5, adjust=False).mean()
-            df['EMA_10'] = df['close'].ewm(span=10, adjust=False).mean()
-            df['EMA_20'] = df['close'].ewm(span=20, adjust=False).mean()
-            
-            # Calculate Relative Strength Index (RSI)
-            delta = df['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            df['RSI'] = 100 - (100 / (1 + rs))
-            
-            # Calculate MACD
-            df['EMA_12'] = df['close'].ewm(span=12, adjust=False).mean()
-            df['EMA_26'] = df['close'].ewm(span=26, adjust=False).mean()
-            df['MACD'] = df['EMA_12'] - df['EMA_26']
-            df['MACD_Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-            df['MACD_Histogram'] = df['MACD'] - df['MACD_Signal']
-            
-            # Get latest values
-            latest = df.iloc[-1]
+            # Update the incremental indicators (SMA, EMA, RSI, MACD) for this symbol;
+            # only bars not seen by the previous call are processed
+            engine = self.indicator_engines.setdefault((symbol, '1d'), IndicatorEngine())
+            latest = engine.sync(series)
             
             # Determine trend based on moving averages
             if latest['SMA_5'] > latest['SMA_20'] and latest['EMA_5'] > latest['EMA_20']:
@@ -390,4 +506,203 @@ class MarketAnalysisAI:
             elif latest['RSI'] < 30:
                 rsi_signal = 'oversold'
             else:
-                rsi_signal = 'ne<response clipped><NOTE>To save on context only part of this file has been shown to you. You should retry this tool after you have searched inside the file with `grep -n` in order to find the line numbers of what you are looking for.</NOTE>
\ No newline at end of file
+                rsi_signal = 'neutral'
+            
+            # Determine MACD signal
+            if latest['MACD'] > latest['MACD_Signal']:
+                macd_signal = 'bullish'
+            else:
+                macd_signal = 'bearish'
+            
+            # Combine signals into a single trading signal
+            signal_score = 0
+            signal_score += 1 if trend == 'uptrend' else -1 if trend == 'downtrend' else 0
+            signal_score += 1 if rsi_signal == 'oversold' else -1 if rsi_signal == 'overbought' else 0
+            signal_score += 1 if macd_signal == 'bullish' else -1
+            
+            if signal_score >= 3:
+                trading_signal = 'strong_buy'
+            elif signal_score >= 1:
+                trading_signal = 'buy'
+            elif signal_score <= -3:
+                trading_signal = 'strong_sell'
+            elif signal_score <= -1:
+                trading_signal = 'sell'
+            else:
+                trading_signal = 'neutral'
+            
+            # Generate analysis text
+            if trading_signal == 'strong_buy':
+                analysis = f"المؤشرات الفنية لـ {symbol} تشير إلى اتجاه صاعد قوي. يُنصح بالشراء."
+            elif trading_signal == 'buy':
+                analysis = f"المؤشرات الفنية لـ {symbol} تميل إلى الصعود. يُنصح بالشراء بحذر."
+            elif trading_signal == 'strong_sell':
+                analysis = f"المؤشرات الفنية لـ {symbol} تشير إلى اتجاه هابط قوي. يُنصح بالبيع."
+            elif trading_signal == 'sell':
+                analysis = f"المؤشرات الفنية لـ {symbol} تميل إلى الهبوط. يُنصح بالبيع بحذر."
+            else:
+                analysis = f"المؤشرات الفنية لـ {symbol} محايدة. يُنصح بالانتظار."
+            
+            return {
+                'symbol': symbol,
+                'current_price': market_data['current_price'],
+                'trend': trend,
+                'rsi_signal': rsi_signal,
+                'macd_signal': macd_signal,
+                'trading_signal': trading_signal,
+                'analysis': analysis,
+                'indicators': {
+                    'sma': {
+                        'sma_5': float(latest['SMA_5']),
+                        'sma_10': float(latest['SMA_10']),
+                        'sma_20': float(latest['SMA_20'])
+                    },
+                    'ema': {
+                        'ema_5': float(latest['EMA_5']),
+                        'ema_10': float(latest['EMA_10']),
+                        'ema_20': float(latest['EMA_20'])
+                    },
+                    'rsi': float(latest['RSI']),
+                    'macd': {
+                        'macd': float(latest['MACD']),
+                        'signal': float(latest['MACD_Signal']),
+                        'histogram': float(latest['MACD_Histogram'])
+                    }
+                }
+            }
+            
+        except Exception as e:
+            return {'error': f'Error in technical analysis: {str(e)}'}
+    
+    @property
+    def planner(self):
+        """AnalysisPlanner running comprehensive_analysis, created on first use"""
+        if self._planner is None:
+            from analysis_planner import AnalysisPlanner
+            self._planner = AnalysisPlanner(self)
+        return self._planner
+    
+    def comprehensive_analysis(self, symbol, insights=None):
+        """
+        Run all analyses for a symbol and combine them into a recommendation
+        
+        The daily candles are fetched once and shared by every analysis, which run in
+        parallel (see analysis_planner; iter_comprehensive streams them as they finish).
+        With an analysis cache, each analysis is only recomputed when its inputs change
+        (or its TTL runs out).
+        
+        Args:
+            symbol: Trading pair symbol
+            insights: Optional insights response already fetched for the symbol
+            
+        Returns:
+            Dictionary with the results of every analysis and an overall recommendation.
+            With a cache, 'cache' tells whether the result was served from it and whether
+            its inputs differ from every earlier call ('inputs_changed').
+        """
+        return self.planner.run(symbol, insights)
+    
+    def combine_analyses(self, symbol, results):
+        """
+        Build the comprehensive_analysis result from the results of its stages
+        
+        Args:
+            symbol: Trading pair symbol
+            results: Dictionary with the 'lstm', 'linear_regression', 'sentiment' and 'technical' results
+            
+        Returns:
+            Dictionary in the comprehensive_analysis format
+        """
+        lstm_prediction = results['lstm']
+        regression_prediction = results['linear_regression']
+        sentiment_result = results['sentiment']
+        technical_result = results['technical']
+        
+        if 'error' in sentiment_result:
+            sentiment_analysis = sentiment_result
+        else:
+            sentiment_analysis = sentiment_result['sentiment']
+        
+        return {
+            'symbol': symbol,
+            'timestamp': datetime.now().isoformat(),
+            'price_predictions': {
+                'lstm': lstm_prediction,
+                'linear_regression': regression_prediction
+            },
+            'sentiment_analysis': sentiment_analysis,
+            'technical_analysis': technical_result,
+            'overall_recommendation': self.generate_recommendation(
+                lstm_prediction, regression_prediction, sentiment_analysis, technical_result
+            )
+        }
+    
+    def generate_recommendation(self, lstm_prediction, regression_prediction, sentiment_analysis, technical_result):
+        """
+        Combine the individual analyses into a single buy/sell/hold recommendation
+        
+        Args:
+            lstm_prediction: Result of predict_with_lstm
+            regression_prediction: Result of predict_with_linear_regression
+            sentiment_analysis: Sentiment dictionary from analyze_market_sentiment
+            technical_result: Result of analyze_technical_indicators
+            
+        Returns:
+            Dictionary with the recommendation, its text and a confidence level
+        """
+        scores = []
+        
+        # Price predictions vote on the expected direction of the last predicted price
+        for prediction in (lstm_prediction, regression_prediction):
+            if 'error' not in prediction and prediction.get('predictions') and prediction.get('current_price'):
+                last_price = prediction['predictions'][-1]['predicted_price']
+                change = (last_price - prediction['current_price']) / prediction['current_price']
+                scores.append(max(-1.0, min(1.0, change * 10)))
+        
+        if 'error' not in sentiment_analysis:
+            scores.append(max(-1.0, min(1.0, sentiment_analysis.get('overall_score', 0))))
+        
+        if 'error' not in technical_result:
+            signal_scores = {
+                'strong_buy': 1.0,
+                'buy': 0.5,
+                'neutral': 0.0,
+                'sell': -0.5,
+                'strong_sell': -1.0
+            }
+            scores.append(signal_scores.get(technical_result.get('trading_signal'), 0.0))
+        
+        if not scores:
+            return {
+                'recommendation': 'hold',
+                'recommendation_text': 'لا توجد بيانات كافية لتقديم توصية',
+                'confidence': 0
+            }
+        
+        score = sum(scores) / len(scores)
+        
+        if score > 0.2:
+            recommendation = 'buy'
+            recommendation_text = 'التوصية العامة: شراء'
+        elif score < -0.2:
+            recommendation = 'sell'
+            recommendation_text = 'التوصية العامة: بيع'
+        else:
+            recommendation = 'hold'
+            recommendation_text = 'التوصية العامة: انتظار'
+        
+        return {
+            'recommendation': recommendation,
+            'recommendation_text': recommendation_text,
+            'confidence': min(1.0, abs(score)),
+            'score': score
+        }
+
+# Example usage
+if __name__ == "__main__":
+    analyzer = MarketAnalysisAI()
+    
+    if len(sys.argv) >= 3 and sys.argv[1] == 'analyze':
+        print(json.dumps(analyzer.comprehensive_analysis(sys.argv[2])))
+    else:
+        print(json.dumps(analyzer.comprehensive_analysis('BTC-USD'), indent=2))
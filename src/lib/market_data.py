@@ -1,13 +1,103 @@
 import sys
-sys.path.append('/opt/.manus/.sandbox-runtime')
-from data_api import ApiClient
+from market_data_cache import get_shared_cache, RANGE_SECONDS
+from candle_store import get_shared_store
+from data_providers import get_default_provider
+from candle_series import CandleSeries
 import json
 
+
+def chart_request(symbol, interval, range, period1=None, period2=None):
+    """
+    Query of a YahooFinance/get_stock_chart call
+
+    With period1 (and optionally period2) the query asks for the bars between these
+    epoch seconds instead of a range; upstream ignores the bounds when a range is set,
+    so the range is left out.
+    """
+    query = {
+        'symbol': symbol,
+        'interval': interval,
+        'range': range,
+        'includePrePost': False,
+        'includeAdjustedClose': True
+    }
+    if period1 is not None:
+        del query['range']
+        query['period1'] = str(int(period1))
+        if period2 is not None:
+            query['period2'] = str(int(period2))
+    return query
+
+
+def validate_chart_response(data):
+    """The chart response, or an error dictionary when it holds no data"""
+    if not data or 'chart' not in data or 'result' not in data['chart'] or not data['chart']['result']:
+        return {'error': 'No data available for the symbol'}
+    return data
+
+
+def validate_insights_response(data):
+    """The insights response, or an error dictionary when it holds no data"""
+    if not data or 'finance' not in data or 'result' not in data['finance']:
+        return {'error': 'No insights available for the symbol'}
+    return data
+
+
+def parse_market_series(data):
+    """
+    Convert a chart response to the processed market data format
+    
+    Args:
+        data: Response of get_stock_chart (or an error dictionary, returned as is)
+        
+    Returns:
+        Dictionary with the market metadata and a 'series' CandleSeries
+    """
+    if 'error' in data:
+        return data
+    
+    try:
+        result = data['chart']['result'][0]
+        meta = result['meta']
+        
+        return {
+            'symbol': meta['symbol'],
+            'currency': meta['currency'],
+            'exchange': meta['exchangeName'],
+            'current_price': meta.get('regularMarketPrice', 0),
+            'previous_close': meta.get('chartPreviousClose', 0),
+            'series': CandleSeries.from_chart_result(result)
+        }
+    except Exception as e:
+        return {'error': f'Error processing data: {str(e)}'}
+
+
+def to_legacy_format(market_data):
+    """Replace the 'series' of processed market data with the list of candle dictionaries"""
+    if 'error' in market_data:
+        return market_data
+    
+    processed_data = {key: value for key, value in market_data.items() if key != 'series'}
+    processed_data['data'] = market_data['series'].to_records()
+    return processed_data
+
+
 class MarketDataService:
-    def __init__(self):
-        self.client = ApiClient()
+    def __init__(self, cache=None, use_cache=True, client=None, store=None):
+        # Any object with ApiClient's call_api(endpoint, query) works (see data_providers);
+        # by default the provider selected by TRADING_DATA_PROVIDER
+        self.client = client if client is not None else get_default_provider()
+        
+        # Processed market data is shared between all services in the process unless a cache is given
+        if use_cache:
+            self.cache = cache if cache is not None else get_shared_cache()
+        else:
+            self.cache = None
+        
+        # Optional local candle store (candle_store.CandleStore): charts are then fetched as deltas
+        self.store = store if store is not None else get_shared_store()
     
-    def get_stock_data(self, symbol, interval='1d', range='1mo'):
+    def get_stock_data(self, symbol, interval='1d', range='1mo', period1=None, period2=None):
         """
         Fetch stock market data using Yahoo Finance API
         
@@ -15,23 +105,16 @@ class MarketDataService:
             symbol: The trading pair symbol (e.g., 'BTC-USD')
             interval: Data interval (1m, 2m, 5m, 15m, 30m, 60m, 1d, 1wk, 1mo)
             range: Data range (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
+            period1: Optional epoch seconds of the first bar; replaces range
+            period2: Optional epoch seconds the bars end at (with period1)
             
         Returns:
             Dictionary containing the market data
         """
         try:
-            data = self.client.call_api('YahooFinance/get_stock_chart', query={
-                'symbol': symbol,
-                'interval': interval,
-                'range': range,
-                'includePrePost': False,
-                'includeAdjustedClose': True
-            })
-            
-            if not data or 'chart' not in data or 'result' not in data['chart'] or not data['chart']['result']:
-                return {'error': 'No data available for the symbol'}
-            
-            return data
+            query = chart_request(symbol, interval, range, period1, period2)
+            data = self.client.call_api('YahooFinance/get_stock_chart', query=query)
+            return validate_chart_response(data)
         except Exception as e:
             return {'error': str(e)}
     
@@ -49,11 +132,7 @@ class MarketDataService:
             data = self.client.call_api('YahooFinance/get_stock_insights', query={
                 'symbol': symbol
             })
-            
-            if not data or 'finance' not in data or 'result' not in data['finance']:
-                return {'error': 'No insights available for the symbol'}
-            
-            return data
+            return validate_insights_response(data)
         except Exception as e:
             return {'error': str(e)}
     
@@ -61,6 +140,9 @@ class MarketDataService:
         """
         Process market data into a format suitable for trading decisions
         
+        This is the JSON-facing format with one dictionary per candle. Python callers
+        should prefer process_market_series, which skips the per-candle conversion.
+        
         Args:
             symbol: The trading pair symbol (e.g., 'BTC-USD')
             interval: Data interval
@@ -69,50 +151,64 @@ class MarketDataService:
         Returns:
             Dictionary containing processed market data
         """
-        data = self.get_stock_data(symbol, interval, range)
+        return to_legacy_format(self.process_market_series(symbol, interval, range))
+    
+    def process_market_series(self, symbol, interval='1d', range='1mo'):
+        """
+        Process market data into a column-oriented CandleSeries
         
-        if 'error' in data:
-            return data
+        Results are served from the shared cache for about one candle period, so callers
+        must treat the returned dictionary and its arrays as read-only.
         
-        try:
-            result = data['chart']['result'][0]
-            meta = result['meta']
-            timestamps = result['timestamp']
-            quote = result['indicators']['quote'][0]
-            
-            processed_data = {
-                'symbol': meta['symbol'],
-                'currency': meta['currency'],
-                'exchange': meta['exchangeName'],
-                'current_price': meta.get('regularMarketPrice', 0),
-                'previous_close': meta.get('chartPreviousClose', 0),
-                'data': []
-            }
-            
-            for i in range(len(timestamps)):
-                if i < len(quote['close']) and quote['close'][i] is not None:
-                    candle = {
-                        'timestamp': timestamps[i],
-                        'open': quote['open'][i] if i < len(quote['open']) and quote['open'][i] is not None else 0,
-                        'high': quote['high'][i] if i < len(quote['high']) and quote['high'][i] is not None else 0,
-                        'low': quote['low'][i] if i < len(quote['low']) and quote['low'][i] is not None else 0,
-                        'close': quote['close'][i],
-                        'volume': quote['volume'][i] if i < len(quote['volume']) and quote['volume'][i] is not None else 0
-                    }
-                    processed_data['data'].append(candle)
+        Args:
+            symbol: The trading pair symbol (e.g., 'BTC-USD')
+            interval: Data interval
+            range: Data range
             
-            return processed_data
-        except Exception as e:
-            return {'error': f'Error processing data: {str(e)}'}
+        Returns:
+            Dictionary with the market metadata and a 'series' CandleSeries
+            (use series.compact() to drop bars without a close price)
+        """
+        if self.cache is None:
+            return self._fetch_market_series(symbol, interval, range)
+        
+        return self.cache.get_or_load(
+            symbol, interval, range,
+            lambda: self._fetch_market_series(symbol, interval, range)
+        )
+    
+    def get_cache_stats(self):
+        """
+        Get hit/miss/eviction counters of the market data cache
+        
+        Returns:
+            Dictionary of cache counters, or None when caching is disabled
+        """
+        return self.cache.get_stats() if self.cache is not None else None
+    
+    def _fetch_market_series(self, symbol, interval, range):
+        """Fetch market data from upstream (or the candle store) and convert it to a CandleSeries"""
+        if self.store is not None and range in RANGE_SECONDS:
+            try:
+                return self.store.get_market_series(symbol, interval, range, self.get_stock_data)
+            except Exception as e:
+                return {'error': f'Error processing data: {str(e)}'}
+        return parse_market_series(self.get_stock_data(symbol, interval, range))
 
 # Example usage
 if __name__ == "__main__":
     service = MarketDataService()
     
-    # Test with Bitcoin
-    btc_data = service.process_market_data('BTC-USD')
-    print(json.dumps(btc_data, indent=2))
-    
-    # Test with Ethereum
-    eth_data = service.process_market_data('ETH-USD')
-    print(json.dumps(eth_data, indent=2))
+    if len(sys.argv) >= 2:
+        symbol = sys.argv[1]
+        interval = sys.argv[2] if len(sys.argv) >= 3 else '1d'
+        data_range = sys.argv[3] if len(sys.argv) >= 4 else '1mo'
+        print(json.dumps(service.process_market_data(symbol, interval, data_range)))
+    else:
+        # Test with Bitcoin
+        btc_data = service.process_market_data('BTC-USD')
+        print(json.dumps(btc_data, indent=2))
+        
+        # Test with Ethereum
+        eth_data = service.process_market_data('ETH-USD')
+        print(json.dumps(eth_data, indent=2))
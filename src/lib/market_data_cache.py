@@ -0,0 +1,196 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Length of one candle for each Yahoo Finance interval, in seconds
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '2m': 120,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '60m': 3600,
+    '90m': 5400,
+    '1h': 3600,
+    '1d': 86400,
+    '5d': 432000,
+    '1wk': 604800,
+    '1mo': 2592000,
+    '3mo': 7776000
+}
+
+# Length of each Yahoo Finance range, in seconds
+RANGE_SECONDS = {
+    '1d': 86400,
+    '5d': 5 * 86400,
+    '1mo': 30 * 86400,
+    '3mo': 91 * 86400,
+    '6mo': 182 * 86400,
+    '1y': 365 * 86400,
+    '2y': 730 * 86400,
+    '5y': 1826 * 86400,
+    '10y': 3652 * 86400
+}
+
+DEFAULT_MAX_ENTRIES = 256
+
+# Upper bound on any entry's lifetime, so daily candles still pick up the latest price
+DEFAULT_MAX_TTL = 300
+
+
+class _PendingLoad:
+    """A load in progress that concurrent callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MarketDataCache:
+    """
+    Thread-safe TTL + LRU cache for processed market data, keyed by (symbol, interval, range)
+
+    - Entries live for one candle period of their interval, capped at max_ttl
+    - At most max_entries are kept; the least recently used entry is evicted first
+    - Concurrent requests for the same key share a single upstream call
+    - Error results are never cached
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_ttl=DEFAULT_MAX_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def ttl_for(self, interval):
+        """Lifetime of an entry for the given interval, in seconds"""
+        return min(INTERVAL_SECONDS.get(interval, 60), self.max_ttl)
+
+    def get_or_load(self, symbol, interval, range, loader):
+        """
+        Return the cached value for (symbol, interval, range) or load it
+
+        Args:
+            symbol: Trading pair symbol
+            interval: Data interval
+            range: Data range
+            loader: Callable with no arguments that fetches and processes the data
+
+        Returns:
+            The cached or freshly loaded value. Callers must not mutate it.
+        """
+        key = (symbol, interval, range)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if self.clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return value
+
+                del self._entries[key]
+                self.stats['expirations'] += 1
+
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = _PendingLoad()
+                self._pending[key] = pending
+                is_owner = True
+                self.stats['misses'] += 1
+            else:
+                is_owner = False
+                self.stats['coalesced'] += 1
+
+        if not is_owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            pending.result = loader()
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+                if pending.error is None and not self._is_error(pending.result):
+                    self._store(key, interval, pending.result)
+            pending.done.set()
+
+        return pending.result
+
+    def lookup(self, symbol, interval, range):
+        """
+        Non-blocking read of a fresh entry (for callers that coalesce loads themselves)
+
+        Returns:
+            The cached value, or None when it is missing or expired
+        """
+        key = (symbol, interval, range)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() < entry[0]:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+            return None
+
+    def store(self, symbol, interval, range, value):
+        """Store a loaded value unless it is an error result"""
+        if not self._is_error(value):
+            with self._lock:
+                self._store((symbol, interval, range), interval, value)
+
+    def _is_error(self, value):
+        return isinstance(value, dict) and 'error' in value
+
+    def _store(self, key, interval, value):
+        self._entries[key] = (self.clock() + self.ttl_for(interval), value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def get_stats(self):
+        """Hit/miss/eviction counters and the current size of the cache"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_rate'] = (stats['hits'] + stats['coalesced']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """Process-wide cache shared by every MarketDataService, so bots on the same pair reuse one fetch"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = MarketDataCache()
+        return _shared_cache
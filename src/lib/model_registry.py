@@ -0,0 +1,281 @@
+import os
+import re
+import sys
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import threading
+import uuid
+import numpy as np
+
+# Trained models are kept here between requests and worker restarts
+DEFAULT_MODEL_DIR = os.environ.get('TRADING_MODEL_DIR', '/tmp/trading-bot-models')
+
+FULL_TRAINING_EPOCHS = 50
+FINE_TUNE_EPOCHS = 5
+
+# Fine-tuning uses at least this many of the most recent windows, even if fewer candles are new
+FINE_TUNE_MIN_SAMPLES = 32
+
+# After this many consecutive fine-tunes the model is retrained from scratch
+MAX_FINE_TUNES = 20
+
+BATCH_SIZE = 32
+
+# Model files replaced by a newer save are deleted once they are this old (seconds),
+# so a worker that read the previous meta.json can still open them
+STALE_FILE_SECONDS = 600
+
+
+def data_version(timestamps, closes):
+    """
+    Hash identifying the exact candles a model was trained on
+
+    Args:
+        timestamps: Array of candle timestamps
+        closes: Array of closing prices
+
+    Returns:
+        Hex digest (16 characters)
+    """
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(timestamps, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(closes, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class LSTMModelRegistry:
+    """
+    Trained LSTM models and their fitted scalers, keyed by (symbol, look_back, horizon, data version)
+
+    - A model trained on exactly the same candles is reused as is (memory, then disk)
+    - If the candles only moved forward (new bars after the last trained one, older
+      bars unchanged), the stored model is fine-tuned for a few epochs
+    - Anything else (first request, revised history, too many fine-tunes) trains from scratch
+    - Models are saved under model_dir so other workers and restarts reuse them
+    - Requests for the same key wait for each other; different symbols load and train in parallel
+    """
+
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR):
+        self.model_dir = model_dir
+        self._entries = {}
+        # Guards _entries, _key_locks and stats only; never held while loading or training
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'trainings': 0,
+            'fine_tunes': 0,
+            'training_seconds': 0.0,
+            'last_training_seconds': 0.0
+        }
+
+    def _path(self, symbol, look_back, horizon):
+        safe_symbol = re.sub(r'[^A-Za-z0-9_.-]', '_', symbol)
+        name = f'{safe_symbol}_{look_back}' if horizon == 1 else f'{safe_symbol}_{look_back}_h{horizon}'
+        return os.path.join(self.model_dir, name)
+
+    def get_model(self, symbol, look_back, timestamps, closes, build_model, prepare_data, horizon=1):
+        """
+        Return a model trained on the given candles, training or fine-tuning only when needed
+
+        Args:
+            symbol: Trading pair symbol
+            look_back: Number of time steps the model reads
+            timestamps: Array of candle timestamps (ordered)
+            closes: Array of closing prices
+            build_model: Callable(look_back) returning a compiled Keras model
+            prepare_data: Callable(scaled_data, look_back) returning (X, y)
+            horizon: Number of values predicted per forward pass (models are kept per horizon)
+
+        Returns:
+            (model, scaler, info) where info describes how the model was obtained
+        """
+        version = data_version(timestamps, closes)
+        key = (symbol, look_back, horizon)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['version'] == version:
+                self.stats['memory_hits'] += 1
+                return entry['model'], entry['scaler'], self._info(entry, 'memory_hit', 0.0)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Loading and training hold only this key's lock, so other symbols keep being served
+        with key_lock:
+            with self._lock:
+                # Another request may have trained this version while we waited
+                entry = self._entries.get(key)
+                if entry is not None and entry['version'] == version:
+                    self.stats['memory_hits'] += 1
+                    return entry['model'], entry['scaler'], self._info(entry, 'memory_hit', 0.0)
+
+            if entry is None:
+                entry = self._load(key)
+                if entry is not None:
+                    with self._lock:
+                        self._entries[key] = entry
+                        if entry['version'] == version:
+                            self.stats['disk_hits'] += 1
+                    if entry['version'] == version:
+                        return entry['model'], entry['scaler'], self._info(entry, 'disk_hit', 0.0)
+
+            start = time.perf_counter()
+            new_bars = self._new_bars(entry, timestamps, closes)
+            if new_bars:
+                entry = self._fine_tune(entry, timestamps, closes, new_bars, look_back, horizon,
+                                        build_model, prepare_data)
+                mode = 'fine_tuned'
+            else:
+                entry = self._train(timestamps, closes, look_back, build_model, prepare_data)
+                mode = 'trained'
+            entry['version'] = version
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self.stats['fine_tunes' if mode == 'fine_tuned' else 'trainings'] += 1
+                self.stats['training_seconds'] += elapsed
+                self.stats['last_training_seconds'] = elapsed
+                self._entries[key] = entry
+
+            self._save(key, entry)
+            return entry['model'], entry['scaler'], self._info(entry, mode, elapsed)
+
+    def _info(self, entry, mode, elapsed):
+        return {
+            'source': mode,
+            'data_version': entry['version'],
+            'trained_until': entry['last_timestamp'],
+            'fine_tunes': entry['fine_tunes'],
+            'training_seconds': elapsed
+        }
+
+    def _new_bars(self, entry, timestamps, closes):
+        """Number of candles after the last trained one, or 0 if a full training is needed"""
+        if entry is None or entry['fine_tunes'] >= MAX_FINE_TUNES:
+            return 0
+
+        index = int(np.searchsorted(timestamps, entry['last_timestamp']))
+        if index >= len(timestamps) or int(timestamps[index]) != entry['last_timestamp']:
+            return 0
+        # A revised close for the last trained candle means the history changed
+        if float(closes[index]) != entry['last_close']:
+            return 0
+        return len(timestamps) - index - 1
+
+    def _train(self, timestamps, closes, look_back, build_model, prepare_data):
+        from sklearn.preprocessing import MinMaxScaler
+
+        scaler = MinMaxScaler(feature_range=(0, 1))
+        scaled_data = scaler.fit_transform(np.asarray(closes).reshape(-1, 1))
+
+        X, y = prepare_data(scaled_data, look_back)
+        X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+
+        model = build_model(look_back)
+        model.fit(X, y, epochs=FULL_TRAINING_EPOCHS, batch_size=BATCH_SIZE, verbose=0)
+
+        return {
+            'model': model,
+            'scaler': scaler,
+            'last_timestamp': int(timestamps[-1]),
+            'last_close': float(closes[-1]),
+            'fine_tunes': 0
+        }
+
+    def _fine_tune(self, entry, timestamps, closes, new_bars, look_back, horizon, build_model, prepare_data):
+        # Keep the scaler the model was trained with; MinMaxScaler extrapolates linearly
+        # for prices outside the original range
+        samples = max(new_bars, FINE_TUNE_MIN_SAMPLES)
+        recent = np.asarray(closes[-(samples + look_back + horizon - 1):]).reshape(-1, 1)
+        X, y = prepare_data(entry['scaler'].transform(recent), look_back)
+        X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+
+        # Train a copy: the stored model may be predicting for callers that got it from a memory hit
+        model = build_model(look_back)
+        model.set_weights(entry['model'].get_weights())
+        model.fit(X, y, epochs=FINE_TUNE_EPOCHS, batch_size=BATCH_SIZE, verbose=0)
+
+        return dict(
+            entry,
+            model=model,
+            last_timestamp=int(timestamps[-1]),
+            last_close=float(closes[-1]),
+            fine_tunes=entry['fine_tunes'] + 1
+        )
+
+    def _load(self, key):
+        path = self._path(*key)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            # Models saved before file names were recorded in meta.json use the fixed names
+            with open(os.path.join(path, meta.get('scaler_file', 'scaler.pkl')), 'rb') as f:
+                scaler = pickle.load(f)
+
+            from tensorflow.keras.models import load_model
+            model = load_model(os.path.join(path, meta.get('model_file', 'model.keras')))
+        except Exception:
+            # Missing or unreadable files: train again
+            return None
+
+        return dict(meta, model=model, scaler=scaler)
+
+    def _save(self, key, entry):
+        path = self._path(*key)
+        # Model and scaler get names of their own, and meta.json (replaced last, atomically)
+        # names the pair, so concurrent saves by several workers never mix a model with
+        # another run's scaler
+        token = f"{entry['version']}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        meta = {field: entry[field] for field in ('version', 'last_timestamp', 'last_close', 'fine_tunes')}
+        meta['model_file'] = f'model.{token}.keras'
+        meta['scaler_file'] = f'scaler.{token}.pkl'
+        try:
+            os.makedirs(path, exist_ok=True)
+            entry['model'].save(os.path.join(path, meta['model_file']))
+            with open(os.path.join(path, meta['scaler_file']), 'wb') as f:
+                pickle.dump(entry['scaler'], f)
+
+            temp_path = os.path.join(path, f'meta.{token}.tmp')
+            with open(temp_path, 'w') as f:
+                json.dump(meta, f)
+            os.replace(temp_path, os.path.join(path, 'meta.json'))
+        except Exception as e:
+            # The model is still cached in memory; only persistence failed
+            print(f"Could not save LSTM model for {key[0]}: {str(e)}", file=sys.stderr)
+            return
+        self._remove_stale_files(path)
+
+    def _remove_stale_files(self, path):
+        """Delete model files meta.json no longer names, once no reader can still be opening them"""
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            names = os.listdir(path)
+        except (OSError, ValueError):
+            return
+        current = {'meta.json', '.lock', meta.get('model_file'), meta.get('scaler_file')}
+        cutoff = time.time() - STALE_FILE_SECONDS
+        for name in names:
+            if name in current:
+                continue
+            file_path = os.path.join(path, name)
+            try:
+                if os.path.getmtime(file_path) < cutoff:
+                    if os.path.isdir(file_path):
+                        shutil.rmtree(file_path, ignore_errors=True)
+                    else:
+                        os.remove(file_path)
+            except OSError:
+                continue
+
+    def get_stats(self):
+        """Registry hits, trainings, fine-tunes and time spent training"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['models_in_memory'] = len(self._entries)
+        stats['model_dir'] = self.model_dir
+        return stats
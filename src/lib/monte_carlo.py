@@ -0,0 +1,274 @@
+import numpy as np
+
+# Same odds as the random outcome in execute_trade (weights=[55, 45])
+DEFAULT_TAKE_PROFIT_PROBABILITY = 0.55
+
+# Number of simulated days covered by the weekly loss limit
+WEEKLY_WINDOW_DAYS = 7
+
+# Paths simulated together; bounds the size of the (paths, trades_per_day) work arrays
+DEFAULT_CHUNK_PATHS = 2000
+
+SUMMARY_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def strategy_parameters(strategy):
+    """
+    Read the trading rules from a ThousandTradesStrategy / TenTradesStrategy instance
+
+    Args:
+        strategy: Strategy instance
+
+    Returns:
+        Dictionary of the parameters used by the vectorized engines
+    """
+    return {
+        'initial_capital': float(strategy.initial_capital),
+        'entry_percentage': float(strategy.entry_percentage),
+        'take_profit_percentage': float(strategy.take_profit_percentage),
+        'stop_loss_percentage': float(strategy.stop_loss_percentage),
+        'max_loss_multiplier': float(strategy.max_loss_multiplier),
+        'max_loss_multiplier_count': int(strategy.max_loss_multiplier_count),
+        'max_weekly_loss_percentage': float(strategy.max_weekly_loss_percentage)
+    }
+
+
+def trade_factor_table(params):
+    """
+    Capital multiplier of a single trade for every (outcome, loss-streak) combination
+
+    Args:
+        params: Dictionary from strategy_parameters
+
+    Returns:
+        Flat array: index streak for a stop loss, max_loss_multiplier_count + 1 + streak for a take profit,
+        where streak is the number of consecutive losses before the trade (capped)
+    """
+    streaks = np.arange(params['max_loss_multiplier_count'] + 1)
+    stake = (params['entry_percentage'] / 100) * params['max_loss_multiplier'] ** streaks
+    return np.concatenate([
+        1 - stake * params['stop_loss_percentage'] / 100,
+        1 + stake * params['take_profit_percentage'] / 100
+    ])
+
+
+def apply_trading_day(wins, capital, loss_run, peak, week_start_capital, active, params, factor_table=None):
+    """
+    Apply one day of trade outcomes to many independent paths at once
+
+    Implements the same rules as execute_trade as array scans:
+    - trade size is entry_percentage of the current capital times the loss multiplier
+    - the multiplier is max_loss_multiplier ** (consecutive losses), capped at
+      max_loss_multiplier_count steps, and resets after a take profit
+    - before every trade the weekly P&L is checked against max_weekly_loss_percentage
+
+    Args:
+        wins: Boolean array (paths, trades) - True where the trade hits take profit
+        capital: Capital of each path at the start of the day
+        loss_run: Consecutive stop losses of each path carried over from the previous day
+        peak: Highest capital reached so far by each path (for drawdown)
+        week_start_capital: Capital of each path at the start of its weekly window
+        active: Boolean array - False for paths already stopped by the weekly loss limit
+        params: Dictionary from strategy_parameters
+        factor_table: Optional precomputed trade_factor_table(params)
+
+    Returns:
+        Dictionary of per-path arrays for the end of the day
+    """
+    if factor_table is None:
+        factor_table = trade_factor_table(params)
+
+    paths, trades = wins.shape
+    max_count = params['max_loss_multiplier_count']
+    positions = np.arange(trades, dtype=np.int32)
+
+    # Consecutive losses up to and including each trade: distance to the last take profit.
+    # Before the first take profit of the day, the streak carried over from yesterday
+    # continues, which is the same as a virtual take profit at index -1 - loss_run.
+    # Indices are shifted by 1 + loss_run so that "no take profit" is 0 and a multiply
+    # by the outcome mask replaces a (much slower) np.where.
+    carried = np.minimum(loss_run, max_count).astype(np.int32)
+    shift = (1 + carried)[:, None]
+    last_win = positions + shift
+    last_win *= wins
+    np.maximum.accumulate(last_win, axis=1, out=last_win)
+    streak = np.subtract(positions + shift, last_win, out=last_win)
+    np.minimum(streak, max_count, out=streak)
+
+    # Streak before each trade selects the multiplier, the outcome selects TP or SL
+    table_index = np.empty_like(streak)
+    table_index[:, 0] = carried
+    table_index[:, 1:] = streak[:, :-1]
+    table_index += wins * np.int32(max_count + 1)
+
+    # Every trade scales the capital by a factor, so the capital after each trade is a cumulative product
+    curve = np.take(factor_table, table_index, mode='clip')
+    np.cumprod(curve, axis=1, out=curve)
+    curve *= capital[:, None]
+
+    # Weekly loss limit is checked before each trade, like check_weekly_loss_limit:
+    # trade t is skipped when the capital after trade t - 1 is at or below the floor
+    floor = week_start_capital - params['max_weekly_loss_percentage'] / 100 * params['initial_capital']
+    executed = np.where(active, trades, 0)
+    hit_rows = np.flatnonzero(active & ((capital <= floor) | (curve[:, :-1].min(axis=1) <= floor)))
+    if len(hit_rows):
+        before_trade = np.empty((len(hit_rows), trades))
+        before_trade[:, 0] = capital[hit_rows]
+        before_trade[:, 1:] = curve[hit_rows, :-1]
+        executed[hit_rows] = (before_trade <= floor[hit_rows, None]).argmax(axis=1)
+
+    rows = np.arange(paths)
+    end_capital = np.where(executed > 0, curve[rows, np.maximum(executed - 1, 0)], capital)
+
+    # Freeze the curve after the last executed trade so drawdown only sees real trades
+    cut = np.flatnonzero(executed < trades)
+    if len(cut):
+        after_stop = np.arange(trades) >= executed[cut, None]
+        curve[cut] = np.where(after_stop, end_capital[cut, None], curve[cut])
+
+    running_peak = np.maximum.accumulate(curve, axis=1)
+    np.maximum(running_peak, peak[:, None], out=running_peak)
+    end_peak = running_peak[:, -1].copy()
+    max_drawdown = 1 - np.divide(curve, running_peak, out=running_peak).min(axis=1)
+
+    executed_wins = wins.sum(axis=1)
+    if len(cut):
+        executed_wins[cut] = (wins[cut] & (positions < executed[cut, None])).sum(axis=1)
+
+    new_loss_run = np.where(executed > 0, streak[rows, np.maximum(executed - 1, 0)], carried)
+
+    return {
+        'capital': end_capital,
+        'loss_run': new_loss_run,
+        'peak': end_peak,
+        'max_drawdown': max_drawdown,
+        'trades': executed,
+        'profitable_trades': executed_wins,
+        'stopped': active & (executed < trades)
+    }
+
+
+def _summarize(values):
+    percentiles = np.percentile(values, SUMMARY_PERCENTILES) if len(values) else [0.0] * len(SUMMARY_PERCENTILES)
+    return {
+        'mean': float(np.mean(values)) if len(values) else 0.0,
+        'std': float(np.std(values)) if len(values) else 0.0,
+        'min': float(np.min(values)) if len(values) else 0.0,
+        'max': float(np.max(values)) if len(values) else 0.0,
+        'percentiles': {f'p{p}': float(v) for p, v in zip(SUMMARY_PERCENTILES, percentiles)}
+    }
+
+
+def simulate_paths(params, paths=10000, days=30, trades_per_day=1000,
+                   take_profit_probability=DEFAULT_TAKE_PROFIT_PROBABILITY, seed=None,
+                   chunk_paths=DEFAULT_CHUNK_PATHS):
+    """
+    Monte Carlo simulation of a strategy over many independent paths
+
+    Args:
+        params: Dictionary from strategy_parameters
+        paths: Number of independent paths
+        days: Number of simulated days
+        trades_per_day: Trades per day on every path
+        take_profit_probability: Probability that a trade hits take profit
+        seed: Optional random seed
+        chunk_paths: Paths processed together
+
+    Returns:
+        Dictionary with per-path arrays: final_capital, max_drawdown, stop_day (0 = never stopped),
+        trades and profitable_trades
+    """
+    rng = np.random.default_rng(seed)
+    initial_capital = params['initial_capital']
+    factor_table = trade_factor_table(params)
+
+    final_capital = np.empty(paths)
+    max_drawdown = np.empty(paths)
+    stop_day = np.zeros(paths, dtype=np.int64)
+    total_trades = np.zeros(paths, dtype=np.int64)
+    profitable_trades = np.zeros(paths, dtype=np.int64)
+
+    for start in range(0, paths, chunk_paths):
+        stop = min(start + chunk_paths, paths)
+        size = stop - start
+
+        capital = np.full(size, initial_capital)
+        loss_run = np.zeros(size, dtype=np.int64)
+        peak = capital.copy()
+        drawdown = np.zeros(size)
+        active = np.ones(size, dtype=bool)
+        day_start_capital = []
+
+        for day in range(days):
+            if not active.any():
+                break
+
+            # Weekly window: capital at the start of the oldest day still inside it
+            day_start_capital.append(capital.copy())
+            week_start_capital = day_start_capital[max(0, day - WEEKLY_WINDOW_DAYS + 1)]
+
+            wins = rng.random((size, trades_per_day), dtype=np.float32) < take_profit_probability
+            result = apply_trading_day(wins, capital, loss_run, peak, week_start_capital, active, params, factor_table)
+
+            capital = result['capital']
+            loss_run = result['loss_run']
+            peak = result['peak']
+            drawdown = np.maximum(drawdown, result['max_drawdown'])
+            total_trades[start:stop] += result['trades']
+            profitable_trades[start:stop] += result['profitable_trades']
+            stop_day[start:stop][result['stopped']] = day + 1
+            active &= ~result['stopped']
+
+        final_capital[start:stop] = capital
+        max_drawdown[start:stop] = drawdown
+
+    return {
+        'final_capital': final_capital,
+        'max_drawdown': max_drawdown,
+        'stop_day': stop_day,
+        'trades': total_trades,
+        'profitable_trades': profitable_trades
+    }
+
+
+def run_monte_carlo(strategy, paths=10000, days=30, trades_per_day=1000,
+                    take_profit_probability=DEFAULT_TAKE_PROFIT_PROBABILITY, seed=None):
+    """
+    Run the vectorized simulation for a strategy instance and summarize the distributions
+
+    Args:
+        strategy: ThousandTradesStrategy or TenTradesStrategy instance
+        paths: Number of independent paths
+        days: Number of simulated days
+        trades_per_day: Trades per day on every path
+        take_profit_probability: Probability that a trade hits take profit
+        seed: Optional random seed
+
+    Returns:
+        Dictionary with the distribution of final capital, drawdown and stop-out day
+    """
+    params = strategy_parameters(strategy)
+    result = simulate_paths(params, paths, days, trades_per_day, take_profit_probability, seed)
+    initial_capital = params['initial_capital']
+
+    stopped = result['stop_day'] > 0
+    total_trades = result['trades'].sum()
+
+    return {
+        'paths': paths,
+        'days': days,
+        'trades_per_day': trades_per_day,
+        'initial_capital': initial_capital,
+        'final_capital': _summarize(result['final_capital']),
+        'total_profit_loss_percentage': _summarize((result['final_capital'] - initial_capital) / initial_capital * 100),
+        'max_drawdown_percentage': _summarize(result['max_drawdown'] * 100),
+        'profitable_paths': int((result['final_capital'] > initial_capital).sum()),
+        'stopped_paths': int(stopped.sum()),
+        'stop_out_probability': float(stopped.mean()),
+        'stop_out_day': {
+            'distribution': np.bincount(result['stop_day'][stopped], minlength=days + 1)[1:].tolist(),
+            'summary': _summarize(result['stop_day'][stopped])
+        },
+        'average_trades': float(result['trades'].mean()),
+        'win_rate': float(result['profitable_trades'].sum() / total_trades) if total_trades else 0.0
+    }
@@ -0,0 +1,366 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+from types import SimpleNamespace
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+
+from candle_series import CandleSeries, CANDLE_FIELDS
+from monte_carlo import strategy_parameters
+from backtester import backtest, resolve_trades
+from model_registry import data_version
+from trading_strategies import STRATEGY_SETTINGS, apply_settings, ThousandTradesStrategy, TenTradesStrategy
+
+STRATEGY_CLASSES = {
+    'thousand_trades': ThousandTradesStrategy,
+    'ten_trades': TenTradesStrategy
+}
+
+# Entries per backtested day, as in each strategy's run_simulation
+DEFAULT_TRADES_PER_DAY = {
+    'thousand_trades': 1000,
+    'ten_trades': 10
+}
+
+DEFAULT_SWEEP_WORKERS = int(os.environ.get('TRADING_SWEEP_WORKERS', os.cpu_count() or 1))
+
+# Metrics a sweep can be ranked by; drawdown ranks lowest first, the others highest first
+RANKING_METRICS = ('total_profit_loss_percentage', 'final_capital', 'win_rate', 'max_drawdown_percentage')
+ASCENDING_METRICS = ('max_drawdown_percentage',)
+
+# Parameter sets sent to a worker in one task; sets in a task share their take profit and stop loss
+MAX_TASK_SIZE = 64
+
+# Resolved trades kept per worker, keyed by (take profit, stop loss)
+MAX_CACHED_TRADES = 8
+
+SUMMARY_FIELDS = (
+    'final_capital', 'total_profit_loss_percentage', 'max_drawdown_percentage', 'win_rate',
+    'total_trades', 'stopped_on_day', 'same_bar_exits', 'unresolved_trades'
+)
+
+# Default random-search ranges: (low, high)
+DEFAULT_RANDOM_RANGES = {
+    'entry_percentage': (1.0, 10.0),
+    'take_profit_percentage': (0.05, 1.0),
+    'stop_loss_percentage': (0.05, 1.0),
+    'max_loss_multiplier': (1.0, 3.0),
+    'max_loss_multiplier_count': (0, 6),
+    'max_weekly_loss_percentage': (5.0, 30.0)
+}
+
+
+class SharedCandles:
+    """
+    Candle columns copied once into a shared memory block
+
+    Workers attach by name and get CandleSeries views into the block, so the
+    arrays are never pickled. The creating process must call close() (or use the
+    instance as a context manager) to release the block.
+    """
+
+    def __init__(self, series):
+        self.length = len(series)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, self.length * 8 * len(CANDLE_FIELDS)))
+        for index, field in enumerate(CANDLE_FIELDS):
+            column = self._column(self._shm, self.length, index, field)
+            column[:] = getattr(series, field)
+
+    @staticmethod
+    def _column(shm, length, index, field):
+        dtype = np.int64 if field == 'timestamp' else np.float64
+        return np.ndarray((length,), dtype=dtype, buffer=shm.buf, offset=index * length * 8)
+
+    @property
+    def descriptor(self):
+        """Picklable (name, length) pair passed to attach()"""
+        return self._shm.name, self.length
+
+    @classmethod
+    def attach(cls, descriptor):
+        """
+        Open a block created by another process
+
+        Returns:
+            (shm, series): keep shm referenced while the series is in use
+        """
+        name, length = descriptor
+        # Pool workers share the creating process's resource tracker, so attaching
+        # does not hand the block's lifetime to the worker
+        shm = shared_memory.SharedMemory(name=name)
+
+        columns = {field: cls._column(shm, length, index, field) for index, field in enumerate(CANDLE_FIELDS)}
+        return shm, CandleSeries(**columns)
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def grid_settings(grid):
+    """
+    Every combination of the given values
+
+    Args:
+        grid: Dictionary of setting name to list of values
+
+    Returns:
+        List of settings dictionaries
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_settings(ranges, samples, seed=0):
+    """
+    Uniform random settings (the same list for the same seed, so a sweep can resume)
+
+    Args:
+        ranges: Dictionary of setting name to (low, high); integer settings get integer draws
+        samples: Number of settings dictionaries
+        seed: Random seed
+
+    Returns:
+        List of settings dictionaries
+    """
+    rng = random.Random(seed)
+    settings = []
+    for _ in range(samples):
+        sample = {}
+        for name in sorted(ranges):
+            low, high = ranges[name]
+            if name == 'max_loss_multiplier_count':
+                sample[name] = rng.randint(int(low), int(high))
+            else:
+                sample[name] = round(rng.uniform(low, high), 4)
+        settings.append(sample)
+    return settings
+
+
+def settings_key(settings):
+    return json.dumps(settings, sort_keys=True)
+
+
+def _parameters(base, settings):
+    """Full monte_carlo parameter dictionary for one settings dictionary"""
+    target = SimpleNamespace(**base)
+    apply_settings(target, settings)
+    return strategy_parameters(target)
+
+
+_worker_shm = None
+_worker_series = None
+_worker_trades_per_day = None
+_worker_trades = OrderedDict()
+
+
+def _init_worker(descriptor, trades_per_day):
+    global _worker_shm, _worker_series, _worker_trades_per_day
+    _worker_shm, _worker_series = SharedCandles.attach(descriptor)
+    _worker_trades_per_day = trades_per_day
+
+
+def _evaluate_task(task):
+    """Backtest parameter sets sharing one take profit and stop loss"""
+    results = []
+    for settings, params in task:
+        key = (params['take_profit_percentage'], params['stop_loss_percentage'])
+        trades = _worker_trades.get(key)
+        if trades is None:
+            trades = resolve_trades(_worker_series, params, _worker_trades_per_day)
+            _worker_trades[key] = trades
+            while len(_worker_trades) > MAX_CACHED_TRADES:
+                _worker_trades.popitem(last=False)
+        else:
+            _worker_trades.move_to_end(key)
+
+        result = backtest(_worker_series, params, _worker_trades_per_day, trades)
+        results.append({'settings': settings, **{field: result[field] for field in SUMMARY_FIELDS}})
+    return results
+
+
+def _read_checkpoint(path, header):
+    """Results already stored in a checkpoint, keyed by settings"""
+    if not path or not os.path.exists(path):
+        return {}
+
+    completed = {}
+    with open(path) as f:
+        lines = f.read().splitlines()
+    if not lines:
+        return {}
+    if json.loads(lines[0]).get('sweep') != header:
+        raise ValueError(f'Checkpoint {path} belongs to a different sweep or data set')
+    for line in lines[1:]:
+        try:
+            result = json.loads(line)
+        except ValueError:
+            # Last line cut short by an interruption
+            continue
+        completed[settings_key(result['settings'])] = result
+    return completed
+
+
+def rank_results(results, rank_by='total_profit_loss_percentage'):
+    """Results sorted best first by one of RANKING_METRICS"""
+    if rank_by not in RANKING_METRICS:
+        raise ValueError(f'Unknown ranking metric: {rank_by}')
+    return sorted(results, key=lambda result: result[rank_by], reverse=rank_by not in ASCENDING_METRICS)
+
+
+def run_sweep(strategy_type, trading_pair, initial_capital, series, settings_list, trades_per_day=None,
+              workers=DEFAULT_SWEEP_WORKERS, checkpoint=None, rank_by='total_profit_loss_percentage', top=20):
+    """
+    Backtest many strategy settings over the same candles in parallel
+
+    Args:
+        strategy_type: 'thousand_trades' or 'ten_trades'
+        trading_pair: Trading pair symbol
+        initial_capital: Starting capital of every run
+        series: CandleSeries of the trading pair
+        settings_list: List of settings dictionaries (keys of STRATEGY_SETTINGS)
+        trades_per_day: Entries per day (defaults to DEFAULT_TRADES_PER_DAY)
+        workers: Worker processes
+        checkpoint: Optional JSONL path; finished results are appended and skipped on the next run
+        rank_by: One of RANKING_METRICS
+        top: Number of ranked results to return
+
+    Returns:
+        Dictionary with counts, timing and the best `top` results
+    """
+    strategy_class = STRATEGY_CLASSES[strategy_type]
+    if trades_per_day is None:
+        trades_per_day = DEFAULT_TRADES_PER_DAY[strategy_type]
+
+    series = series.compact()
+    base = strategy_parameters(strategy_class(None, trading_pair, initial_capital))
+    header = {
+        'strategy_type': strategy_type,
+        'trading_pair': trading_pair,
+        'initial_capital': float(initial_capital),
+        'trades_per_day': trades_per_day,
+        'data_version': data_version(series.timestamp, series.close)
+    }
+
+    completed = _read_checkpoint(checkpoint, header)
+    pending = [settings for settings in settings_list if settings_key(settings) not in completed]
+
+    # Sets with the same take profit and stop loss go to the same task, so their trades are resolved once
+    groups = {}
+    for settings in pending:
+        params = _parameters(base, settings)
+        key = (params['take_profit_percentage'], params['stop_loss_percentage'])
+        groups.setdefault(key, []).append((settings, params))
+    tasks = [group[i:i + MAX_TASK_SIZE] for group in groups.values() for i in range(0, len(group), MAX_TASK_SIZE)]
+
+    start = time.perf_counter()
+    results = list(completed.values())
+    if tasks:
+        checkpoint_file = None
+        if checkpoint:
+            # Rewritten rather than appended to, which drops a line cut short by an interruption;
+            # the new file replaces the old one only once complete, so no finished result is lost
+            temp_path = f'{checkpoint}.{os.getpid()}.tmp'
+            with open(temp_path, 'w') as f:
+                f.write(json.dumps({'sweep': header}) + '\n')
+                f.writelines(json.dumps(result) + '\n' for result in completed.values())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, checkpoint)
+            checkpoint_file = open(checkpoint, 'a')
+
+        try:
+            with SharedCandles(series) as shared, ProcessPoolExecutor(
+                max_workers=max(1, min(workers, len(tasks))),
+                initializer=_init_worker,
+                initargs=(shared.descriptor, trades_per_day)
+            ) as pool:
+                for future in as_completed([pool.submit(_evaluate_task, task) for task in tasks]):
+                    task_results = future.result()
+                    results.extend(task_results)
+                    if checkpoint_file is not None:
+                        checkpoint_file.writelines(json.dumps(result) + '\n' for result in task_results)
+                        checkpoint_file.flush()
+        finally:
+            if checkpoint_file is not None:
+                checkpoint_file.close()
+
+    return {
+        **header,
+        'evaluated': len(results) - len(completed),
+        'resumed': len(completed),
+        'total': len(results),
+        'rank_by': rank_by,
+        'elapsed_seconds': time.perf_counter() - start,
+        'ranked': rank_results(results, rank_by)[:top]
+    }
+
+
+def _parse_grid(text):
+    """'take_profit_percentage=0.1,0.2;stop_loss_percentage=0.05,0.1' -> grid dictionary"""
+    grid = {}
+    for part in filter(None, text.split(';')):
+        name, values = part.split('=', 1)
+        cast = int if name.strip() == 'max_loss_multiplier_count' else float
+        grid[name.strip()] = [cast(value) for value in values.split(',')]
+    return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Search strategy settings with parallel backtests')
+    parser.add_argument('strategy_type', choices=sorted(STRATEGY_CLASSES))
+    parser.add_argument('trading_pair')
+    parser.add_argument('initial_capital', type=float)
+    parser.add_argument('--grid', help='name=v1,v2;name=v1,v2 over ' + ', '.join(STRATEGY_SETTINGS))
+    parser.add_argument('--random', type=int, help='Number of random settings (DEFAULT_RANDOM_RANGES)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--interval', default='1m')
+    parser.add_argument('--range', default='5d')
+    parser.add_argument('--synthetic-days', type=int, help='Use this many days of synthetic candles instead of fetching')
+    parser.add_argument('--trades-per-day', type=int)
+    parser.add_argument('--workers', type=int, default=DEFAULT_SWEEP_WORKERS)
+    parser.add_argument('--checkpoint', help='JSONL file to resume from and append to')
+    parser.add_argument('--rank-by', default='total_profit_loss_percentage', choices=RANKING_METRICS)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.grid:
+        settings_list = grid_settings(_parse_grid(args.grid))
+    elif args.random:
+        settings_list = random_settings(DEFAULT_RANDOM_RANGES, args.random, args.seed)
+    else:
+        parser.error('Give --grid or --random')
+
+    if args.synthetic_days:
+        from fake_upstream import synthetic_candles
+        from market_data_cache import INTERVAL_SECONDS
+
+        interval_seconds = INTERVAL_SECONDS[args.interval]
+        series = CandleSeries(**synthetic_candles(args.trading_pair, args.synthetic_days * 86400 // interval_seconds,
+                                                  interval_seconds, volatility=0.001))
+    else:
+        from market_data import MarketDataService
+
+        market_data = MarketDataService().process_market_series(args.trading_pair, args.interval, args.range)
+        if 'error' in market_data:
+            print(json.dumps({'status': 'error', 'message': f"خطأ في الحصول على بيانات السوق: {market_data['error']}"}))
+            sys.exit(1)
+        series = market_data['series']
+
+    print(json.dumps(run_sweep(
+        args.strategy_type, args.trading_pair, args.initial_capital, series, settings_list,
+        trades_per_day=args.trades_per_day, workers=args.workers, checkpoint=args.checkpoint,
+        rank_by=args.rank_by, top=args.top
+    )))
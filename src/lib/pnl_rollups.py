@@ -0,0 +1,253 @@
+import json
+import time
+import argparse
+
+from trade_record import TRADING_HISTORY_COLUMNS
+
+# Columns of bot_daily_pnl / account_daily_pnl after the key columns
+ROLLUP_COLUMNS = ('trades', 'profitable_trades', 'losing_trades', 'profit_loss', 'gross_profit', 'gross_loss',
+                  'peak_profit_loss', 'trough_profit_loss', 'max_drawdown')
+
+ROLLUP_TABLES = {
+    'bot': ('bot_daily_pnl', 'bot_config_id'),
+    'account': ('account_daily_pnl', 'account_id')
+}
+
+BOT_COLUMN = TRADING_HISTORY_COLUMNS.index('bot_config_id')
+ENTRY_TIME_COLUMN = TRADING_HISTORY_COLUMNS.index('entry_time')
+EXIT_TIME_COLUMN = TRADING_HISTORY_COLUMNS.index('exit_time')
+PROFIT_LOSS_COLUMN = TRADING_HISTORY_COLUMNS.index('profit_loss')
+
+# trading_history rows read per query while rebuilding
+REBUILD_CHUNK_SIZE = 50000
+
+
+def empty_rollup():
+    return [0, 0, 0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+
+
+def add_trade(rollup, profit_loss):
+    """Extend a rollup (list ordered like ROLLUP_COLUMNS) with the next trade"""
+    rollup[0] += 1
+    if profit_loss > 0:
+        rollup[1] += 1
+        rollup[4] += profit_loss
+    else:
+        rollup[2] += 1
+        rollup[5] -= profit_loss
+    rollup[3] += profit_loss
+    rollup[6] = max(rollup[6], rollup[3])
+    rollup[7] = min(rollup[7], rollup[3])
+    rollup[8] = max(rollup[8], rollup[6] - rollup[3])
+
+
+def combine(first, second):
+    """
+    Rollup of `first` followed by `second`
+
+    Running P&L restarts at 0 in every rollup, so the peak and trough of `second` are
+    shifted by the P&L of `first`; a drawdown can start in `first` and end in `second`.
+    """
+    return [
+        first[0] + second[0],
+        first[1] + second[1],
+        first[2] + second[2],
+        first[3] + second[3],
+        first[4] + second[4],
+        first[5] + second[5],
+        max(first[6], first[3] + second[6]),
+        min(first[7], first[3] + second[7]),
+        max(first[8], second[8], first[6] - (first[3] + second[7]))
+    ]
+
+
+def trade_date(row):
+    """UTC date a trading_history row is reported under (exit time, when the P&L is realized)"""
+    return (row[EXIT_TIME_COLUMN] or row[ENTRY_TIME_COLUMN])[:10]
+
+
+def aggregate(rows, account_ids, bot_rollups=None, account_rollups=None):
+    """
+    Daily rollups of trading_history rows, in row order
+
+    Args:
+        rows: Tuples ordered like TRADING_HISTORY_COLUMNS
+        account_ids: Dictionary of bot_config_id to account_id (bots missing from it get no account rollup)
+        bot_rollups: Optional dictionary to extend, keyed by (bot_config_id, trade_date)
+        account_rollups: Optional dictionary to extend, keyed by (account_id, trade_date)
+
+    Returns:
+        (bot_rollups, account_rollups)
+    """
+    bot_rollups = {} if bot_rollups is None else bot_rollups
+    account_rollups = {} if account_rollups is None else account_rollups
+
+    for row in rows:
+        profit_loss = row[PROFIT_LOSS_COLUMN]
+        if profit_loss is None:
+            continue
+        date = trade_date(row)
+        bot_id = row[BOT_COLUMN]
+
+        rollup = bot_rollups.get((bot_id, date))
+        if rollup is None:
+            rollup = bot_rollups[(bot_id, date)] = empty_rollup()
+        add_trade(rollup, profit_loss)
+
+        account_id = account_ids.get(bot_id)
+        if account_id is not None:
+            rollup = account_rollups.get((account_id, date))
+            if rollup is None:
+                rollup = account_rollups[(account_id, date)] = empty_rollup()
+            add_trade(rollup, profit_loss)
+
+    return bot_rollups, account_rollups
+
+
+def _upsert_statement(table, key_column):
+    # Every SET expression reads the stored (earlier) values, which is what combine() needs
+    return f"""INSERT INTO {table} ({key_column}, trade_date, {', '.join(ROLLUP_COLUMNS)})
+        VALUES ({', '.join('?' * (len(ROLLUP_COLUMNS) + 2))})
+        ON CONFLICT({key_column}, trade_date) DO UPDATE SET
+          trades = trades + excluded.trades,
+          profitable_trades = profitable_trades + excluded.profitable_trades,
+          losing_trades = losing_trades + excluded.losing_trades,
+          profit_loss = profit_loss + excluded.profit_loss,
+          gross_profit = gross_profit + excluded.gross_profit,
+          gross_loss = gross_loss + excluded.gross_loss,
+          peak_profit_loss = MAX(peak_profit_loss, profit_loss + excluded.peak_profit_loss),
+          trough_profit_loss = MIN(trough_profit_loss, profit_loss + excluded.trough_profit_loss),
+          max_drawdown = MAX(max_drawdown, excluded.max_drawdown,
+                             peak_profit_loss - (profit_loss + excluded.trough_profit_loss)),
+          updated_at = CURRENT_TIMESTAMP"""
+
+
+def lookup_account_ids(connection, bot_ids, cache=None):
+    """account_id of each bot, reading bot_configurations only for bots not in `cache`"""
+    cache = {} if cache is None else cache
+    missing = [bot_id for bot_id in set(bot_ids) if bot_id not in cache]
+    for start in range(0, len(missing), 500):
+        chunk = missing[start:start + 500]
+        rows = connection.execute(
+            f"SELECT id, account_id FROM bot_configurations WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+        ).fetchall()
+        cache.update(dict(rows))
+    return cache
+
+
+def apply_rollups(connection, rows, account_ids=None):
+    """
+    Add newly written trading_history rows to the daily rollups
+
+    Runs in the caller's transaction, so the rollups commit together with the trades.
+    Rows must be applied in the order they were written.
+
+    Args:
+        connection: sqlite3.Connection with the 0002_pnl_rollups tables
+        rows: Tuples ordered like TRADING_HISTORY_COLUMNS
+        account_ids: Optional bot_config_id -> account_id cache, filled as needed
+    """
+    account_ids = lookup_account_ids(connection, [row[BOT_COLUMN] for row in rows], account_ids)
+    bot_rollups, account_rollups = aggregate(rows, account_ids)
+    for kind, rollups in (('bot', bot_rollups), ('account', account_rollups)):
+        if rollups:
+            connection.executemany(_upsert_statement(*ROLLUP_TABLES[kind]),
+                                   [(key, date, *rollup) for (key, date), rollup in rollups.items()])
+
+
+def rebuild(connection, chunk_size=REBUILD_CHUNK_SIZE):
+    """
+    Recompute both rollup tables from trading_history (backfill, or repair after manual edits)
+
+    Trades are read in id order, the order the write path applies them in.
+
+    Returns:
+        Dictionary with the number of trades and rollup rows
+    """
+    account_ids = dict(connection.execute('SELECT id, account_id FROM bot_configurations').fetchall())
+    bot_rollups, account_rollups = {}, {}
+    trades = 0
+    last_id = 0
+    columns = ', '.join(TRADING_HISTORY_COLUMNS)
+
+    while True:
+        chunk = connection.execute(
+            f"SELECT id, {columns} FROM trading_history WHERE id > ? AND trade_status = 'closed' ORDER BY id LIMIT ?",
+            (last_id, chunk_size)
+        ).fetchall()
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        trades += len(chunk)
+        aggregate([row[1:] for row in chunk], account_ids, bot_rollups, account_rollups)
+
+    with connection:
+        for kind, rollups in (('bot', bot_rollups), ('account', account_rollups)):
+            table, key_column = ROLLUP_TABLES[kind]
+            connection.execute(f'DELETE FROM {table}')
+            connection.executemany(
+                f"INSERT INTO {table} ({key_column}, trade_date, {', '.join(ROLLUP_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(ROLLUP_COLUMNS) + 2))})",
+                [(key, date, *rollup) for (key, date), rollup in sorted(rollups.items())]
+            )
+
+    return {'trades': trades, 'bot_days': len(bot_rollups), 'account_days': len(account_rollups)}
+
+
+def period_report(connection, kind, key, since=None, until=None):
+    """
+    P&L of a bot or account over a date range, read from the daily rollups only
+
+    Args:
+        connection: sqlite3.Connection
+        kind: 'bot' or 'account'
+        key: bot_config_id or account_id
+        since: First date (YYYY-MM-DD), inclusive
+        until: Last date (YYYY-MM-DD), inclusive
+
+    Returns:
+        Dictionary with the period totals, its max drawdown and the daily rows
+    """
+    table, key_column = ROLLUP_TABLES[kind]
+    rows = connection.execute(
+        f"SELECT trade_date, {', '.join(ROLLUP_COLUMNS)} FROM {table} "
+        f"WHERE {key_column} = ? AND trade_date >= ? AND trade_date <= ? ORDER BY trade_date",
+        (key, since or '0000-00-00', until or '9999-99-99')
+    ).fetchall()
+
+    total = empty_rollup()
+    daily = []
+    for row in rows:
+        total = combine(total, list(row[1:]))
+        daily.append(dict(zip(('date',) + ROLLUP_COLUMNS, row)))
+
+    report = dict(zip(ROLLUP_COLUMNS, total))
+    report['win_rate'] = total[1] / total[0] if total[0] else 0.0
+    report['daily'] = daily
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Daily P&L rollups of trading_history')
+    parser.add_argument('command', choices=('rebuild', 'report'))
+    parser.add_argument('db', help='SQLite database with the trading tables')
+    parser.add_argument('--bot', type=int, help='bot_config_id to report on')
+    parser.add_argument('--account', type=int, help='account_id to report on')
+    parser.add_argument('--since', help='First date (YYYY-MM-DD)')
+    parser.add_argument('--until', help='Last date (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    from trade_sink import open_sqlite
+
+    connection = open_sqlite(args.db)
+    if args.command == 'rebuild':
+        start = time.perf_counter()
+        result = rebuild(connection)
+        result['seconds'] = time.perf_counter() - start
+    elif args.bot is not None:
+        result = period_report(connection, 'bot', args.bot, args.since, args.until)
+    elif args.account is not None:
+        result = period_report(connection, 'account', args.account, args.since, args.until)
+    else:
+        parser.error('report needs --bot or --account')
+    print(json.dumps(result))
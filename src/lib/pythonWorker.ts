@@ -0,0 +1,207 @@
+import net from 'net';
+import path from 'path';
+import { execFile, spawn } from 'child_process';
+import readline from 'readline';
+import { promisify } from 'util';
+
+// Unix socket of the long-lived Python worker service (src/lib/worker_service.py)
+const WORKER_SOCKET = process.env.TRADING_WORKER_SOCKET || '/tmp/trading-bot-worker.sock';
+const DEFAULT_TIMEOUT_MS = 300000;
+
+let nextRequestId = 1;
+
+interface WorkerOptions {
+  timeoutMs?: number;
+  // Script and arguments to run with a fresh python3 process when the worker service is not running
+  fallback?: string[];
+}
+
+function requestWorker(command: string, params: Record<string, unknown>, timeoutMs: number): Promise<any> {
+  return new Promise((resolve, reject) => {
+    const id = nextRequestId++;
+    const socket = net.createConnection(WORKER_SOCKET);
+    let buffer = '';
+
+    socket.setTimeout(timeoutMs, () => {
+      socket.destroy(new Error(`Python worker timed out after ${timeoutMs}ms`));
+    });
+
+    socket.on('connect', () => {
+      socket.write(JSON.stringify({ id, command, params, timeout: timeoutMs / 1000 }) + '\n');
+    });
+
+    socket.on('data', (chunk) => {
+      buffer += chunk.toString('utf-8');
+      const newline = buffer.indexOf('\n');
+      if (newline === -1) {
+        return;
+      }
+
+      socket.end();
+      try {
+        const response = JSON.parse(buffer.slice(0, newline));
+        if (response.ok) {
+          resolve(response.result);
+        } else {
+          reject(new Error(response.error));
+        }
+      } catch (error) {
+        reject(error);
+      }
+    });
+
+    socket.on('error', reject);
+  });
+}
+
+async function runScript(fallback: string[], timeoutMs: number): Promise<any> {
+  const [script, ...args] = fallback;
+  const scriptPath = path.join(process.cwd(), 'src', 'lib', script);
+  const { stdout, stderr } = await promisify(execFile)('python3', [scriptPath, ...args], {
+    timeout: timeoutMs,
+    maxBuffer: 64 * 1024 * 1024,
+  });
+
+  if (stderr) {
+    throw new Error(stderr);
+  }
+
+  return JSON.parse(stdout);
+}
+
+/**
+ * Run a command on the warm Python worker pool.
+ * Falls back to spawning python3 when the worker service is not running.
+ */
+export async function callPythonWorker(
+  command: string,
+  params: Record<string, unknown>,
+  options: WorkerOptions = {}
+): Promise<any> {
+  const timeoutMs = options.timeoutMs || DEFAULT_TIMEOUT_MS;
+
+  try {
+    return await requestWorker(command, params, timeoutMs);
+  } catch (error: any) {
+    const unavailable = error && (error.code === 'ENOENT' || error.code === 'ECONNREFUSED');
+    if (!unavailable || !options.fallback) {
+      throw error;
+    }
+  }
+
+  return runScript(options.fallback, timeoutMs);
+}
+
+/**
+ * Records of a streaming command (params.stream is set), yielded as the worker produces them.
+ * Falls back to spawning python3 and reading its stdout line by line when the worker
+ * service is not running. Throws if the command fails part way.
+ */
+export async function* streamPythonWorker(
+  command: string,
+  params: Record<string, unknown>,
+  options: WorkerOptions = {}
+): AsyncGenerator<any> {
+  const timeoutMs = options.timeoutMs || DEFAULT_TIMEOUT_MS;
+  let lines: AsyncIterable<string>;
+  let close: () => void;
+
+  try {
+    ({ lines, close } = await connectWorker({ ...params, stream: true }, command, timeoutMs));
+  } catch (error: any) {
+    const unavailable = error && (error.code === 'ENOENT' || error.code === 'ECONNREFUSED');
+    if (!unavailable || !options.fallback) {
+      throw error;
+    }
+    yield* streamScript(options.fallback, timeoutMs);
+    return;
+  }
+
+  try {
+    for await (const line of lines) {
+      if (!line.trim()) {
+        continue;
+      }
+      const message = JSON.parse(line);
+      if ('item' in message) {
+        yield message.item;
+      } else if (message.ok) {
+        return;
+      } else {
+        throw new Error(message.error);
+      }
+    }
+    throw new Error('Python worker closed the stream early');
+  } finally {
+    // Also runs when the consumer stops early; the worker service replaces the busy worker
+    close();
+  }
+}
+
+function connectWorker(
+  params: Record<string, unknown>,
+  command: string,
+  timeoutMs: number
+): Promise<{ lines: AsyncIterable<string>, close: () => void }> {
+  return new Promise((resolve, reject) => {
+    const id = nextRequestId++;
+    const socket = net.createConnection(WORKER_SOCKET);
+
+    // The timeout is the longest silence between two records
+    socket.setTimeout(timeoutMs, () => {
+      socket.destroy(new Error(`Python worker timed out after ${timeoutMs}ms`));
+    });
+
+    socket.once('error', reject);
+    socket.once('connect', () => {
+      socket.off('error', reject);
+      socket.write(JSON.stringify({ id, command, params, timeout: timeoutMs / 1000 }) + '\n');
+      resolve({
+        lines: readline.createInterface({ input: socket, crlfDelay: Infinity }),
+        close: () => socket.destroy(),
+      });
+    });
+  });
+}
+
+async function* streamScript(fallback: string[], timeoutMs: number): AsyncGenerator<any> {
+  const [script, ...args] = fallback;
+  const scriptPath = path.join(process.cwd(), 'src', 'lib', script);
+  const child = spawn('python3', [scriptPath, ...args, '--stream']);
+  let stderr = '';
+  child.stderr.on('data', (chunk) => {
+    stderr += chunk.toString('utf-8');
+  });
+  const exited = new Promise<number | null>((resolve) => child.on('close', resolve));
+
+  // Like the worker path, the timeout is the longest silence between two records
+  let timedOut = false;
+  let timer: NodeJS.Timeout | undefined;
+  const resetTimer = () => {
+    clearTimeout(timer);
+    timer = setTimeout(() => {
+      timedOut = true;
+      child.kill();
+    }, timeoutMs);
+  };
+  child.stdout.on('data', resetTimer);
+  resetTimer();
+
+  try {
+    for await (const line of readline.createInterface({ input: child.stdout, crlfDelay: Infinity })) {
+      if (line.trim()) {
+        yield JSON.parse(line);
+      }
+    }
+    const code = await exited;
+    if (timedOut) {
+      throw new Error(`python3 sent no record for ${timeoutMs}ms`);
+    }
+    if (code !== 0) {
+      throw new Error(stderr || `python3 exited with code ${code}`);
+    }
+  } finally {
+    clearTimeout(timer);
+    child.kill();
+  }
+}
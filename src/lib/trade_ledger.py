@@ -0,0 +1,111 @@
+import math
+import time
+from collections import deque
+from itertools import islice
+from datetime import datetime, timedelta
+
+from trade_record import records_to_dicts, records_to_rows
+
+# Length of the window used by the weekly loss limit, in seconds
+WEEKLY_WINDOW = 7 * 86400
+
+# The running weekly sum is recomputed from the window after this many expirations to stop floating-point drift
+RESUM_EVERY = 1024
+
+
+def _day_end(timestamp):
+    """Epoch time of the local midnight that ends the day containing `timestamp`"""
+    day = datetime.fromtimestamp(timestamp).date()
+    return datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+
+
+class TradeLedger:
+    """
+    Trades of the last 7 days with running totals for the weekly and current-day windows
+
+    - Trades (TradeRecord) are stored once, appended in exit-time order, so expired trades
+      are always at the left end and are dropped in amortized O(1)
+    - Today's trades are the newest entries; only their count and P&L sum are tracked
+    - weekly_profit_loss, daily_count and weekly_count are O(1)
+    """
+
+    def __init__(self, window=WEEKLY_WINDOW, clock=time.time):
+        self.window = window
+        self.clock = clock
+        self.trades = deque()
+        self.weekly_total = 0.0
+        self.daily_total = 0.0
+        self.daily_count = 0
+        self.day_end = None
+        self.expirations = 0
+
+    def record(self, trade):
+        """
+        Add a closed trade
+
+        Args:
+            trade: TradeRecord
+        """
+        self._roll_day(trade.exit_time)
+
+        self.trades.append(trade)
+        self.weekly_total += trade.profit_loss
+        self.daily_total += trade.profit_loss
+        self.daily_count += 1
+
+    def _roll_day(self, timestamp):
+        if self.day_end is None or timestamp >= self.day_end:
+            self.day_end = _day_end(timestamp)
+            self.daily_total = 0.0
+            self.daily_count = 0
+
+    def expire(self, now=None):
+        """
+        Drop trades that left the weekly window and reset the daily totals on a new day
+
+        Args:
+            now: Optional current epoch time (defaults to the ledger clock)
+        """
+        now = now or self.clock()
+        cutoff = now - self.window
+        trades = self.trades
+
+        while trades and trades[0].exit_time <= cutoff:
+            self.weekly_total -= trades.popleft().profit_loss
+            self.expirations += 1
+            if self.expirations % RESUM_EVERY == 0:
+                self.weekly_total = math.fsum(trade.profit_loss for trade in trades)
+
+        if not trades:
+            self.weekly_total = 0.0
+
+        self._roll_day(now)
+
+    def weekly_profit_loss(self):
+        """Total profit/loss of the trades in the weekly window"""
+        self.expire()
+        return self.weekly_total
+
+    @property
+    def weekly_count(self):
+        return len(self.trades)
+
+    def daily_trades(self):
+        """Today's trades, oldest first"""
+        return list(islice(reversed(self.trades), self.daily_count))[::-1]
+
+    def to_dicts(self):
+        """Trades in the weekly window as JSON-serializable dictionaries"""
+        return records_to_dicts(self.trades)
+
+    def to_rows(self, bot_config_id):
+        """Trades in the weekly window as trading_history rows"""
+        return records_to_rows(self.trades, bot_config_id)
+
+    def clear(self):
+        self.trades.clear()
+        self.weekly_total = 0.0
+        self.daily_total = 0.0
+        self.daily_count = 0
+        self.day_end = None
+        self.expirations = 0
@@ -0,0 +1,159 @@
+from enum import IntEnum
+from datetime import datetime, timezone
+
+
+class TradeDirection(IntEnum):
+    BUY = 0
+    SELL = 1
+
+    @property
+    def label(self):
+        return DIRECTION_LABELS[self]
+
+
+class ExitReason(IntEnum):
+    TAKE_PROFIT = 0
+    STOP_LOSS = 1
+    MANUAL = 2
+
+    @property
+    def label(self):
+        return EXIT_REASON_LABELS[self]
+
+
+# Text values used in JSON responses and the trading_history table
+DIRECTION_LABELS = ('buy', 'sell')
+EXIT_REASON_LABELS = ('take_profit', 'stop_loss', 'manual')
+
+TRADE_FIELDS = (
+    'account_id',
+    'trading_pair',
+    'direction',
+    'entry_price',
+    'exit_price',
+    'quantity',
+    'entry_time',
+    'exit_time',
+    'exit_reason',
+    'profit_loss',
+    'profit_loss_percentage',
+    'loss_multiplier'
+)
+
+# Columns filled by records_to_rows, in order
+TRADING_HISTORY_COLUMNS = (
+    'bot_config_id',
+    'entry_price',
+    'exit_price',
+    'quantity',
+    'entry_time',
+    'exit_time',
+    'trade_status',
+    'profit_loss',
+    'profit_loss_percentage',
+    'trade_direction',
+    'exit_reason',
+    'loss_multiplier'
+)
+
+
+class TradeRecord:
+    """
+    A closed trade, stored compactly:
+    - entry_time / exit_time are epoch seconds (float)
+    - direction and exit_reason are small int enums
+    - no per-instance __dict__
+    """
+
+    __slots__ = TRADE_FIELDS
+
+    def __init__(self, account_id, trading_pair, direction, entry_price, exit_price, quantity,
+                 entry_time, exit_time, exit_reason, profit_loss, profit_loss_percentage, loss_multiplier):
+        self.account_id = account_id
+        self.trading_pair = trading_pair
+        self.direction = direction
+        self.entry_price = entry_price
+        self.exit_price = exit_price
+        self.quantity = quantity
+        self.entry_time = entry_time
+        self.exit_time = exit_time
+        self.exit_reason = exit_reason
+        self.profit_loss = profit_loss
+        self.profit_loss_percentage = profit_loss_percentage
+        self.loss_multiplier = loss_multiplier
+
+    def to_dict(self):
+        """Single-record version of records_to_dicts"""
+        return records_to_dicts([self])[0]
+
+    def __repr__(self):
+        return (f'TradeRecord({self.trading_pair} {DIRECTION_LABELS[self.direction]} '
+                f'{EXIT_REASON_LABELS[self.exit_reason]} profit_loss={self.profit_loss:.6f})')
+
+
+def _iso_time(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+def records_to_dicts(records):
+    """
+    Convert trade records to JSON-serializable dictionaries in one pass
+
+    Args:
+        records: Iterable of TradeRecord
+
+    Returns:
+        List of dictionaries with the legacy trade keys, times as ISO strings
+    """
+    return [
+        {
+            'account_id': record.account_id,
+            'trading_pair': record.trading_pair,
+            'trade_direction': DIRECTION_LABELS[record.direction],
+            'entry_price': record.entry_price,
+            'exit_price': record.exit_price,
+            'quantity': record.quantity,
+            'entry_time': _iso_time(record.entry_time),
+            'exit_time': _iso_time(record.exit_time),
+            'exit_reason': EXIT_REASON_LABELS[record.exit_reason],
+            'profit_loss': record.profit_loss,
+            'profit_loss_percentage': record.profit_loss_percentage,
+            'loss_multiplier': record.loss_multiplier
+        }
+        for record in records
+    ]
+
+
+def _db_time(timestamp):
+    # Same format and time zone (UTC) as SQLite's CURRENT_TIMESTAMP
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def records_to_rows(records, bot_config_id):
+    """
+    Convert trade records to trading_history rows for executemany
+
+    Args:
+        records: Iterable of TradeRecord
+        bot_config_id: bot_configurations.id the trades belong to
+
+    Returns:
+        List of tuples ordered like TRADING_HISTORY_COLUMNS
+    """
+    return [
+        (
+            bot_config_id,
+            record.entry_price,
+            record.exit_price,
+            record.quantity,
+            _db_time(record.entry_time),
+            _db_time(record.exit_time),
+            'closed',
+            record.profit_loss,
+            record.profit_loss_percentage,
+            DIRECTION_LABELS[record.direction],
+            EXIT_REASON_LABELS[record.exit_reason],
+            record.loss_multiplier
+        )
+        for record in records
+    ]
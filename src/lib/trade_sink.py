@@ -0,0 +1,423 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import sqlite3
+import hashlib
+import asyncio
+import argparse
+import threading
+
+from trade_record import TRADING_HISTORY_COLUMNS, records_to_rows
+from pnl_rollups import apply_rollups
+
+# Each database gets its own journal in this directory (see journal_path_for)
+DEFAULT_JOURNAL_DIR = os.environ.get('TRADING_TRADE_JOURNAL_DIR', '/tmp/trading-bot-trade-journals')
+
+# A flush starts when this many rows are buffered or the oldest one has waited FLUSH_INTERVAL seconds
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# submit() blocks (backpressure) while this many rows are waiting for the database
+DEFAULT_MAX_PENDING = 20000
+
+# Bound parameters per INSERT statement (Cloudflare D1 allows 100; SQLite allows far more)
+DEFAULT_MAX_PARAMETERS = 100
+
+# The journal is rewritten without the committed rows once it grows past this size
+JOURNAL_COMPACT_BYTES = 8 * 1024 * 1024
+
+# Delay before retrying a failed flush; doubles up to MAX_RETRY_DELAY
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 30
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'migrations')
+
+
+def open_sqlite(path, migrations_dir=MIGRATIONS_DIR):
+    """
+    SQLite stand-in for the D1 database
+
+    Migrations not yet applied are run in order and recorded in d1_migrations, like
+    `wrangler d1 migrations apply`. A database created from 0001_initial.sql before
+    migrations were tracked is treated as having 0001 applied, since that migration
+    starts by dropping every table.
+
+    Args:
+        path: Database file (':memory:' for a throwaway database)
+        migrations_dir: Directory with the numbered .sql migrations
+
+    Returns:
+        sqlite3.Connection (usable from other threads)
+    """
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS d1_migrations ('
+        'id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE, '
+        'applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)'
+    )
+    applied = {name for name, in connection.execute('SELECT name FROM d1_migrations')}
+    names = sorted(name for name in os.listdir(migrations_dir) if name.endswith('.sql'))
+
+    has_schema = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trading_history'"
+    ).fetchone()
+    if has_schema and not applied and names:
+        applied.add(names[0])
+        connection.execute('INSERT INTO d1_migrations (name) VALUES (?)', (names[0],))
+        connection.commit()
+
+    for name in names:
+        if name not in applied:
+            with open(os.path.join(migrations_dir, name)) as f:
+                connection.executescript(f.read())
+            connection.execute('INSERT INTO d1_migrations (name) VALUES (?)', (name,))
+            connection.commit()
+    return connection
+
+
+def database_identity(connection):
+    """
+    Name of the database a connection writes to: the absolute file path, or a
+    per-connection name for in-memory databases
+    """
+    for _, name, path in connection.execute('PRAGMA database_list'):
+        if name == 'main' and path:
+            return os.path.realpath(path)
+    return f':memory:{os.getpid()}:{id(connection)}'
+
+
+def journal_path_for(database, journal_dir=DEFAULT_JOURNAL_DIR):
+    """Default journal of a database, so rows are only ever replayed into the database they were meant for"""
+    digest = hashlib.sha1(database.encode()).hexdigest()[:16]
+    return os.path.join(journal_dir, f'trades-{digest}.journal')
+
+
+class SqliteTradeWriter:
+    """
+    Multi-row INSERTs into trading_history, one transaction per batch
+
+    The journal sequence number of the last row of each batch is stored in the same
+    transaction, so rows replayed from the journal after a crash are never inserted twice.
+    The daily P&L rollups (pnl_rollups) are updated in that transaction too.
+    """
+
+    def __init__(self, connection, sink_name='default', max_parameters=DEFAULT_MAX_PARAMETERS, rollups=True):
+        self.connection = connection
+        self.sink_name = sink_name
+        self.database = database_identity(connection)
+        self.rollups = rollups
+        self._account_ids = {}
+        self.rows_per_statement = max(1, max_parameters // len(TRADING_HISTORY_COLUMNS))
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS trade_sink_state (sink TEXT PRIMARY KEY, last_sequence INTEGER NOT NULL)'
+        )
+        self.connection.commit()
+
+    def last_sequence(self):
+        row = self.connection.execute(
+            'SELECT last_sequence FROM trade_sink_state WHERE sink = ?', (self.sink_name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _statement(self, count):
+        placeholders = '(' + ', '.join('?' * len(TRADING_HISTORY_COLUMNS)) + ')'
+        return (f"INSERT INTO trading_history ({', '.join(TRADING_HISTORY_COLUMNS)}) VALUES "
+                + ', '.join([placeholders] * count))
+
+    def write(self, rows, last_sequence):
+        """
+        Insert rows and record the journal position in one transaction
+
+        Args:
+            rows: List of tuples ordered like TRADING_HISTORY_COLUMNS
+            last_sequence: Journal sequence number of the last row
+        """
+        full_statement = self._statement(self.rows_per_statement)
+        with self.connection:
+            for start in range(0, len(rows), self.rows_per_statement):
+                chunk = rows[start:start + self.rows_per_statement]
+                statement = full_statement if len(chunk) == self.rows_per_statement else self._statement(len(chunk))
+                self.connection.execute(statement, [value for row in chunk for value in row])
+            if self.rollups:
+                apply_rollups(self.connection, rows, self._account_ids)
+            self.connection.execute(
+                'INSERT INTO trade_sink_state (sink, last_sequence) VALUES (?, ?) '
+                'ON CONFLICT(sink) DO UPDATE SET last_sequence = excluded.last_sequence',
+                (self.sink_name, last_sequence)
+            )
+
+
+class WriteBehindTradeSink:
+    """
+    Buffers closed trades and writes them to trading_history in batches
+
+    - submit() appends the row to a local journal and returns; a background thread
+      flushes when DEFAULT_BATCH_SIZE rows are buffered or FLUSH_INTERVAL has passed
+    - Rows stay in the journal until their batch is committed, and are replayed on the
+      next start after a crash
+    - When the database falls behind, submit() blocks once max_pending rows are waiting
+      (submit_async() waits without blocking the event loop)
+    - Failed flushes are retried with exponential backoff; rows are never dropped
+    - The journal starts with a header naming the writer's database; a journal written
+      for another database is never replayed
+    - One sink per journal: a second sink (in any process) on the same journal fails at
+      construction instead of replaying and rewriting rows the first one still owns
+    """
+
+    def __init__(self, writer, journal_path=None, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, max_pending=DEFAULT_MAX_PENDING, fsync=False):
+        self.writer = writer
+        self.database = writer.database
+        self.journal_path = journal_path or journal_path_for(self.database)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.fsync = fsync
+
+        self._condition = threading.Condition()
+        self._pending = []
+        self._oldest = None
+        self._flushing = 0
+        self._closed = False
+        self.stats = {
+            'submitted': 0,
+            'written': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'replayed': 0,
+            'blocked_seconds': 0.0
+        }
+
+        self._lock_file = self._lock_journal()
+        try:
+            self._sequence = self.writer.last_sequence()
+            self._replay_journal()
+            self._journal = open(self.journal_path, 'a')
+        except BaseException:
+            self._lock_file.close()
+            raise
+        self._thread = threading.Thread(target=self._run, name='trade-sink', daemon=True)
+        self._thread.start()
+
+    def _lock_journal(self):
+        # The journal itself is replaced on every rewrite, so the lock lives in a file next to it
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+        lock_file = open(f'{self.journal_path}.lock', 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(
+                f'Trade journal {self.journal_path} is in use by another sink; '
+                f'give each process its own journal_path and sink_name'
+            ) from None
+        return lock_file
+
+    def _replay_journal(self):
+        """Queue journal rows that never reached the database"""
+        committed = self._sequence
+        if not os.path.exists(self.journal_path):
+            self._rewrite_journal([])
+            return
+
+        with open(self.journal_path) as f:
+            header = None
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Last line cut short by a crash: the trade was never acknowledged
+                    continue
+                if 'database' in entry:
+                    header = entry['database']
+                    continue
+                if header != self.database:
+                    raise ValueError(
+                        f'Trade journal {self.journal_path} was written for database {header}, '
+                        f'not {self.database}; move it aside or replay it into its own database'
+                    )
+                self._sequence = max(self._sequence, entry['seq'])
+                if entry['seq'] > committed:
+                    self._pending.append((entry['seq'], tuple(entry['row'])))
+
+        self.stats['replayed'] = len(self._pending)
+        if self._pending:
+            self._oldest = time.monotonic()
+        self._rewrite_journal(self._pending)
+
+    def _rewrite_journal(self, entries):
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+        temp_path = f'{self.journal_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(json.dumps({'database': self.database}) + '\n')
+            f.writelines(json.dumps({'seq': seq, 'row': row}) + '\n' for seq, row in entries)
+        os.replace(temp_path, self.journal_path)
+
+    def submit(self, record, bot_config_id, timeout=None):
+        """
+        Queue a TradeRecord for trading_history
+
+        Args:
+            record: TradeRecord
+            bot_config_id: bot_configurations.id of the bot
+            timeout: Seconds to wait when the buffer is full (None waits as long as needed)
+
+        Returns:
+            True when queued, False when the buffer stayed full for `timeout` seconds
+        """
+        return self.submit_rows(records_to_rows([record], bot_config_id), timeout)
+
+    def submit_rows(self, rows, timeout=None):
+        """Queue trading_history rows (tuples ordered like TRADING_HISTORY_COLUMNS)"""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Trade sink is closed')
+
+            if len(self._pending) + self._flushing >= self.max_pending:
+                start = time.monotonic()
+                ready = self._condition.wait_for(
+                    lambda: len(self._pending) + self._flushing < self.max_pending or self._closed, timeout
+                )
+                self.stats['blocked_seconds'] += time.monotonic() - start
+                if not ready:
+                    return False
+
+            entries = []
+            for row in rows:
+                self._sequence += 1
+                entries.append((self._sequence, row))
+            self._journal.writelines(json.dumps({'seq': seq, 'row': row}) + '\n' for seq, row in entries)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.extend(entries)
+            self.stats['submitted'] += len(entries)
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+        return True
+
+    async def submit_async(self, record, bot_config_id):
+        """submit() for event loop callers: only hands off to a thread when it has to wait"""
+        with self._condition:
+            has_room = len(self._pending) + self._flushing < self.max_pending
+        if has_room:
+            return self.submit(record, bot_config_id)
+        return await asyncio.get_running_loop().run_in_executor(None, self.submit, record, bot_config_id)
+
+    def _due(self):
+        if not self._pending:
+            return False
+        return (len(self._pending) >= self.batch_size or self._closed
+                or time.monotonic() - self._oldest >= self.flush_interval)
+
+    def _run(self):
+        retry_delay = RETRY_DELAY
+        while True:
+            with self._condition:
+                while not self._due():
+                    if self._closed and not self._pending:
+                        return
+                    wait = self.flush_interval
+                    if self._pending:
+                        wait = max(0.0, self._oldest + self.flush_interval - time.monotonic())
+                    self._condition.wait(wait)
+
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                self._oldest = time.monotonic() if self._pending else None
+                self._flushing = len(batch)
+
+            try:
+                self.writer.write([row for _, row in batch], batch[-1][0])
+            except Exception as e:
+                print(f"Trade sink flush failed, retrying in {retry_delay:.1f}s: {str(e)}", file=sys.stderr)
+                with self._condition:
+                    self._pending[:0] = batch
+                    self._oldest = time.monotonic()
+                    self._flushing = 0
+                    self.stats['failed_flushes'] += 1
+                    closed = self._closed
+                if closed and retry_delay >= MAX_RETRY_DELAY:
+                    # Give up on shutdown; the rows stay in the journal for the next start
+                    return
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                continue
+
+            retry_delay = RETRY_DELAY
+            with self._condition:
+                self._flushing = 0
+                self.stats['written'] += len(batch)
+                self.stats['flushes'] += 1
+                self._condition.notify_all()
+                if self._journal.tell() > JOURNAL_COMPACT_BYTES:
+                    # Keep only the rows not yet committed; submit() cannot append while the lock is held
+                    self._journal.close()
+                    self._rewrite_journal(self._pending)
+                    self._journal = open(self.journal_path, 'a')
+
+    def flush(self, timeout=None):
+        """Wait until every submitted row is committed"""
+        with self._condition:
+            self._oldest = float('-inf') if self._pending else self._oldest
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: not self._pending and not self._flushing, timeout)
+
+    def close(self, timeout=None):
+        """Flush the remaining rows and stop the background thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        with self._condition:
+            self._journal.close()
+            if not self._pending and not self._flushing:
+                self._rewrite_journal([])
+            # Closing the file releases the flock
+            self._lock_file.close()
+
+    def get_stats(self):
+        with self._condition:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._pending) + self._flushing
+        stats['journal_path'] = self.journal_path
+        return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write synthetic trades through the sink into a SQLite database')
+    parser.add_argument('db')
+    parser.add_argument('--trades', type=int, default=100000)
+    parser.add_argument('--journal', help='Journal file (default: one per database in ' + DEFAULT_JOURNAL_DIR + ')')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--max-parameters', type=int, default=DEFAULT_MAX_PARAMETERS)
+    args = parser.parse_args()
+
+    from trade_record import TradeRecord, TradeDirection, ExitReason
+
+    connection = open_sqlite(args.db)
+    sink = WriteBehindTradeSink(SqliteTradeWriter(connection, max_parameters=args.max_parameters),
+                                args.journal, batch_size=args.batch_size)
+    start = time.perf_counter()
+    now = time.time()
+    for i in range(args.trades):
+        win = i % 3 != 0
+        record = TradeRecord(
+            1, 'BTC-USD', TradeDirection.BUY, 100.0, 100.18 if win else 99.91, 0.5, now, now,
+            ExitReason.TAKE_PROFIT if win else ExitReason.STOP_LOSS, 0.09 if win else -0.045,
+            0.18 if win else -0.09, 1
+        )
+        sink.submit(record, 1)
+    sink.close()
+    elapsed = time.perf_counter() - start
+
+    stats = sink.get_stats()
+    stats['seconds'] = elapsed
+    stats['trades_per_second'] = args.trades / elapsed
+    stats['rows_in_table'] = connection.execute('SELECT COUNT(*) FROM trading_history').fetchone()[0]
+    print(json.dumps(stats))
@@ -1,11 +1,171 @@
 import sys
-sys.path.append('/opt/.manus/.sandbox-runtime')
-from data_api import ApiClient
+from market_data import MarketDataService
+from trade_ledger import TradeLedger
+from trade_record import TradeRecord, TradeDirection, ExitReason
 import json
 import time
 import random
-import math
-from datetime import datetime, timedelta
+from datetime import datetime
+
+# Trading rules stored per bot in bot_configurations; each strategy has its own defaults
+STRATEGY_SETTINGS = (
+    'entry_percentage',
+    'take_profit_percentage',
+    'stop_loss_percentage',
+    'max_loss_multiplier',
+    'max_loss_multiplier_count',
+    'max_weekly_loss_percentage'
+)
+
+
+def apply_settings(strategy, settings):
+    """
+    Override a strategy's default trading rules
+    
+    Args:
+        strategy: ThousandTradesStrategy or TenTradesStrategy instance
+        settings: Dictionary with any of STRATEGY_SETTINGS (e.g. a bot_configurations row)
+    """
+    for key, value in (settings or {}).items():
+        if key not in STRATEGY_SETTINGS:
+            raise ValueError(f'Unknown strategy setting: {key}')
+        setattr(strategy, key, int(value) if key == 'max_loss_multiplier_count' else float(value))
+
+def simulate_days(strategy, days, trades_per_day):
+    """
+    Simulation of a strategy as a stream of records, one per simulated day
+    
+    Trades are stamped with a simulated clock that spreads each day's trades evenly
+    from today's midnight on, so the weekly loss window slides over the simulated days
+    and the ledger never holds more than a week of trades. Nothing else is accumulated
+    across days: memory does not grow with `days` and the first record is ready after
+    one day of trades.
+    
+    Args:
+        strategy: ThousandTradesStrategy or TenTradesStrategy instance
+        days: Number of days to simulate
+        trades_per_day: Trades per simulated day
+        
+    Yields:
+        {"type": "day", ...daily result} for every simulated day, then
+        {"type": "summary", ...totals}; or a single {"type": "error", "status": "error", "message": ...}
+    """
+    if not strategy.is_active:
+        yield {"type": "error", "status": "error", "message": "البوت غير نشط"}
+        return
+    
+    totals = {
+        "total_trades": 0,
+        "profitable_trades": 0,
+        "losing_trades": 0,
+        "total_profit_loss": 0
+    }
+    
+    # Save original capital to restore after simulation
+    original_capital = strategy.current_capital
+    strategy.current_capital = strategy.initial_capital
+    
+    # Reset state for simulation
+    strategy.current_loss_multiplier = 1
+    strategy.current_loss_count = 0
+    strategy.ledger.clear()
+    
+    day_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    spacing = 86400 / max(trades_per_day, 1)
+    simulated = {"now": day_start}
+    original_clock, original_ledger_clock = strategy.clock, strategy.ledger.clock
+    strategy.clock = strategy.ledger.clock = lambda: simulated["now"]
+    
+    try:
+        for day in range(days):
+            daily_profit_loss = 0
+            daily_trades = 0
+            daily_profitable_trades = 0
+            daily_losing_trades = 0
+            
+            for index in range(trades_per_day):
+                simulated["now"] = day_start + day * 86400 + index * spacing
+                result = strategy.execute_trade()
+                
+                if result["status"] == "stopped":
+                    # Bot was stopped due to weekly loss limit
+                    break
+                
+                if result["status"] == "success":
+                    trade = result["trade"]
+                    daily_profit_loss += trade.profit_loss
+                    daily_trades += 1
+                    
+                    if trade.profit_loss > 0:
+                        daily_profitable_trades += 1
+                    else:
+                        daily_losing_trades += 1
+            
+            starting_capital = strategy.current_capital - daily_profit_loss
+            yield {
+                "type": "day",
+                "day": day + 1,
+                "starting_capital": starting_capital,
+                "ending_capital": strategy.current_capital,
+                "daily_profit_loss": daily_profit_loss,
+                "daily_profit_loss_percentage": (daily_profit_loss / starting_capital) * 100 if starting_capital > 0 else 0,
+                "trades": daily_trades,
+                "profitable_trades": daily_profitable_trades,
+                "losing_trades": daily_losing_trades
+            }
+            
+            totals["total_trades"] += daily_trades
+            totals["profitable_trades"] += daily_profitable_trades
+            totals["losing_trades"] += daily_losing_trades
+            totals["total_profit_loss"] += daily_profit_loss
+            
+            # Check if bot was stopped
+            if not strategy.is_active:
+                break
+        
+        yield {
+            "type": "summary",
+            "initial_capital": strategy.initial_capital,
+            "final_capital": strategy.current_capital,
+            **totals,
+            "total_profit_loss_percentage": ((strategy.current_capital - strategy.initial_capital) / strategy.initial_capital) * 100
+        }
+    finally:
+        # Restore original capital and clocks (also when the consumer stops reading early);
+        # the simulated trades carry simulated times, so they do not stay in the ledger
+        strategy.current_capital = original_capital
+        strategy.clock, strategy.ledger.clock = original_clock, original_ledger_clock
+        strategy.ledger.clear()
+
+
+def collect_simulation(records):
+    """
+    Gather simulate_days records into the run_simulation result
+    
+    Returns:
+        Dictionary with the totals and the list of daily results, or the error
+    """
+    daily_results = []
+    for record in records:
+        kind = record.pop("type")
+        if kind == "error":
+            return record
+        if kind == "day":
+            daily_results.append(record)
+        else:
+            summary = record
+    
+    return {
+        "initial_capital": summary["initial_capital"],
+        "final_capital": summary["final_capital"],
+        "total_trades": summary["total_trades"],
+        "profitable_trades": summary["profitable_trades"],
+        "losing_trades": summary["losing_trades"],
+        "total_profit_loss": summary["total_profit_loss"],
+        "daily_results": daily_results,
+        "total_profit_loss_percentage": summary["total_profit_loss_percentage"]
+    }
+
 
 class ThousandTradesStrategy:
     """
@@ -18,7 +178,11 @@ class ThousandTradesStrategy:
     - Max weekly loss: 20% of capital
     """
     
-    def __init__(self, account_id, trading_pair, initial_capital):
+    # Candles read by execute_trade
+    market_interval = "1m"
+    market_range = "1d"
+    
+    def __init__(self, account_id, trading_pair, initial_capital, market_service=None, settings=None):
         self.account_id = account_id
         self.trading_pair = trading_pair
         self.initial_capital = initial_capital
@@ -29,16 +193,18 @@ class ThousandTradesStrategy:
         self.max_loss_multiplier = 2
         self.max_loss_multiplier_count = 5
         self.max_weekly_loss_percentage = 20
+        apply_settings(self, settings)
         
         # Strategy state
         self.current_loss_multiplier = 1
         self.current_loss_count = 0
-        self.weekly_trades = []
-        self.daily_trades = []
+        self.ledger = TradeLedger()
+        # Stamps trades; simulations swap in a simulated clock
+        self.clock = time.time
         self.is_active = False
         
-        # Market data service
-        self.market_service = MarketDataService()
+        # Market data service (pass one with a replay provider for offline runs)
+        self.market_service = market_service if market_service is not None else MarketDataService()
     
     def start(self):
         """Start the trading bot"""
@@ -67,17 +233,13 @@ class ThousandTradesStrategy:
             "current_loss_count": self.current_loss_count,
             "weekly_profit_loss": weekly_profit_loss,
             "weekly_profit_loss_percentage": weekly_profit_loss_percentage,
-            "daily_trades_count": len(self.daily_trades),
-            "weekly_trades_count": len(self.weekly_trades)
+            "daily_trades_count": self.ledger.daily_count,
+            "weekly_trades_count": self.ledger.weekly_count
         }
     
     def calculate_weekly_profit_loss(self):
-        """Calculate the total profit/loss for the current week"""
-        one_week_ago = datetime.now() - timedelta(days=7)
-        weekly_trades = [trade for trade in self.weekly_trades if trade["exit_time"] > one_week_ago]
-        
-        total_profit_loss = sum(trade["profit_loss"] for trade in weekly_trades)
-        return total_profit_loss
+        """Calculate the total profit/loss for the current week (running total kept by the ledger)"""
+        return self.ledger.weekly_profit_loss()
     
     def check_weekly_loss_limit(self):
         """Check if the weekly loss limit has been reached"""
@@ -93,8 +255,13 @@ class ThousandTradesStrategy:
         
         return {"limit_reached": False}
     
-    def execute_trade(self):
-        """Execute a single trade based on the strategy"""
+    def execute_trade(self, market_data=None):
+        """
+        Execute a single trade based on the strategy
+        
+        Args:
+            market_data: Optional process_market_series result for market_interval/market_range
+        """
         if not self.is_active:
             return {"status": "error", "message": "البوت غير نشط"}
         
@@ -103,8 +270,11 @@ class ThousandTradesStrategy:
         if weekly_loss_check["limit_reached"]:
             return {"status": "stopped", "message": weekly_loss_check["message"]}
         
-        # Get current market data
-        market_data = self.market_service.process_market_data(self.trading_pair, interval="1m", range="1d")
+        # Get current market data unless the caller (e.g. bot_scheduler) passes a shared snapshot
+        if market_data is None:
+            market_data = self.market_service.process_market_series(
+                self.trading_pair, interval=self.market_interval, range=self.market_range
+            )
         
         if "error" in market_data:
             return {"status": "error", "message": f"خطأ في الحصول على بيانات السوق: {market_data['error']}"}
@@ -116,16 +286,13 @@ class ThousandTradesStrategy:
         
         # Determine trade direction (buy/sell) based on simple analysis
         # In a real implementation, this would use more sophisticated analysis
-        if len(market_data["data"]) < 2:
+        closes = market_data["series"].compact().close
+        if len(closes) < 2:
             trade_direction = random.choice(["buy", "sell"])
+        elif closes[-1] > closes[-2]:
+            trade_direction = "buy"
         else:
-            last_candle = market_data["data"][-1]
-            previous_candle = market_data["data"][-2]
-            
-            if last_candle["close"] > previous_candle["close"]:
-                trade_direction = "buy"
-            else:
-                trade_direction = "sell"
+            trade_direction = "sell"
         
         # Calculate take profit and stop loss prices
         if trade_direction == "buy":
@@ -136,7 +303,7 @@ class ThousandTradesStrategy:
             stop_loss_price = current_price * (1 + self.stop_loss_percentage / 100)
         
         # Simulate trade execution
-        entry_time = datetime.now()
+        entry_time = self.clock()
         
         # Simulate market movement (in a real implementation, this would be based on actual market data)
         # For simulation, we'll randomly determine if the trade hits take profit or stop loss
@@ -173,25 +340,24 @@ class ThousandTradesStrategy:
             self.current_loss_multiplier = 1
             self.current_loss_count = 0
         
-        # Record trade
-        trade = {
-            "account_id": self.account_id,
-            "trading_pair": self.trading_pair,
-            "trade_direction": trade_direction,
-            "entry_price": current_price,
-            "exit_price": exit_price,
-            "quantity": trade_quantity,
-            "entry_time": entry_time,
-            "exit_time": datetime.now(),
-            "exit_reason": exit_reason,
-            "profit_loss": profit_loss,
-            "profit_loss_percentage": (profit_loss / trade_amount) * 100,
-            "loss_multiplier": self.current_loss_multiplier
-        }
+        # Record trade (use records_to_dicts / to_dict for JSON)
+        trade = TradeRecord(
+            self.account_id,
+            self.trading_pair,
+            TradeDirection.BUY if trade_direction == "buy" else TradeDirection.SELL,
+            current_price,
+            exit_price,
+            trade_quantity,
+            entry_time,
+            self.clock(),
+            ExitReason.TAKE_PROFIT if exit_reason == "take_profit" else ExitReason.STOP_LOSS,
+            profit_loss,
+            (profit_loss / trade_amount) * 100,
+            self.current_loss_multiplier
+        )
         
         # Add to trade history
-        self.daily_trades.append(trade)
-        self.weekly_trades.append(trade)
+        self.ledger.record(trade)
         
         # Clean up old trades
         self.cleanup_old_trades()
@@ -204,90 +370,59 @@ class ThousandTradesStrategy:
         }
     
     def cleanup_old_trades(self):
-        """Remove trades older than 7 days from weekly trades list"""
-        one_week_ago = datetime.now() - timedelta(days=7)
-        self.weekly_trades = [trade for trade in self.weekly_trades if trade["exit_time"] > one_week_ago]
-        
-        # Reset daily trades at the start of a new day
-        today = datetime.now().date()
-        self.daily_trades = [trade for trade in self.daily_trades if trade["exit_time"].date() == today]
+        """Remove trades older than 7 days from the ledger and reset the daily totals on a new day"""
+        self.ledger.expire()
+    
+    def iter_simulation(self, days=1, trades_per_day=1000):
+        """
+        Run a simulation of the strategy day by day
+        
+        Yields one record per simulated day ("type": "day") and a final summary
+        ("type": "summary"), or a single "error" record; see simulate_days.
+        """
+        return simulate_days(self, days, trades_per_day)
     
     def run_simulation(self, days=1, trades_per_day=1000):
         """Run a simulation of the strategy for a specified number of days"""
-        if not self.is_active:
-            return {"status": "error", "message": "البوت غير نشط"}
-        
-        simulation_results = {
-            "initial_capital": self.initial_capital,
-            "final_capital": self.initial_capital,
-            "total_trades": 0,
-            "profitable_trades": 0,
-            "losing_trades": 0,
-            "total_profit_loss": 0,
-            "daily_results": []
-        }
-        
-        # Save original capital to restore after simulation
-        original_capital = self.current_capital
-        self.current_capital = self.initial_capital
-        
-        # Reset state for simulation
-        self.current_loss_multiplier = 1
-        self.current_loss_count = 0
-        self.weekly_trades = []
-        self.daily_trades = []
-        
-        for day in range(days):
-            daily_profit_loss = 0
-            daily_trades = 0
-            daily_profitable_trades = 0
-            daily_losing_trades = 0
-            
-            for _ in range(trades_per_day):
-                result = self.execute_trade()
-                
-                if result["status"] == "stopped":
-                    # Bot was stopped due to weekly loss limit
-                    break
-                
-                if result["status"] == "success":
-                    trade = result["trade"]
-                    daily_profit_loss += trade["profit_loss"]
-                    daily_trades += 1
-                    
-                    if trade["profit_loss"] > 0:
-                        daily_profitable_trades += 1
-                    else:
-                        daily_losing_trades += 1
-            
-            daily_result = {
-                "day": day + 1,
-                "starting_capital": self.current_capital - daily_profit_loss,
-                "ending_capital": self.current_capital,
-                "daily_profit_loss": daily_profit_loss,
-                "daily_profit_loss_percentage": (daily_profit_loss / (self.current_capital - daily_profit_loss)) * 100 if self.current_capital - daily_profit_loss > 0 else 0,
-                "trades": daily_trades,
-                "profitable_trades": daily_profitable_trades,
-                "losing_trades": daily_losing_trades
-            }
+        return collect_simulation(self.iter_simulation(days, trades_per_day))
+    
+    def run_monte_carlo(self, paths=10000, days=30, trades_per_day=1000, seed=None):
+        """
+        Run a vectorized Monte Carlo simulation of the strategy over many independent paths
+        
+        Uses the same take-profit odds, loss multiplier and weekly loss limit as run_simulation,
+        but draws the outcomes of all trades up front instead of fetching market data per trade.
+        
+        Args:
+            paths: Number of simulated paths
+            days: Number of simulated days
+            trades_per_day: Trades per day on every path
+            seed: Optional random seed
             
-            simulation_results["daily_results"].append(daily_result)
-            simulation_results["total_trades"] += daily_trades
-            simulation_results["profitable_trades"] += daily_profitable_trades
-            simulation_results["losing_trades"] += daily_losing_trades
-            simulation_results["total_profit_loss"] += daily_profit_loss
+        Returns:
+            Dictionary with the distribution of final capital, drawdown and stop-out day
+        """
+        from monte_carlo import run_monte_carlo
+        return run_monte_carlo(self, paths=paths, days=days, trades_per_day=trades_per_day, seed=seed)
+    
+    def run_backtest(self, interval="1m", range="5d", trades_per_day=1000, series=None):
+        """
+        Replay the strategy over historical candles of the trading pair
+        
+        Each trade's take profit or stop loss is resolved against the highs and lows of the
+        bars after its entry; the loss multiplier and weekly loss limit are the same as in run_simulation.
+        
+        Args:
+            interval: Candle interval
+            range: Data range to fetch
+            trades_per_day: Entries per day
+            series: Optional CandleSeries to use instead of fetching (e.g. a long history from candle_store)
             
-            # Check if bot was stopped
-            if not self.is_active:
-                break
-        
-        simulation_results["final_capital"] = self.current_capital
-        simulation_results["total_profit_loss_percentage"] = ((self.current_capital - self.initial_capital) / self.initial_capital) * 100
-        
-        # Restore original capital
-        self.current_capital = original_capital
-        
-        return simulation_results
+        Returns:
+            Dictionary with the run_simulation fields, daily results and backtest statistics
+        """
+        from backtester import run_backtest
+        return run_backtest(self, interval=interval, range=range, trades_per_day=trades_per_day, series=series)
 
 
 class TenTradesStrategy:
@@ -301,7 +436,11 @@ class TenTradesStrategy:
     - Max weekly loss: 20% of capital
     """
     
-    def __init__(self, account_id, trading_pair, initial_capital):
+    # Candles read by execute_trade
+    market_interval = "15m"
+    market_range = "1d"
+    
+    def __init__(self, account_id, trading_pair, initial_capital, market_service=None, settings=None):
         self.account_id = account_id
         self.trading_pair = trading_pair
         self.initial_capital = initial_capital
@@ -312,16 +451,18 @@ class TenTradesStrategy:
         self.max_loss_multiplier = 2
         self.max_loss_multiplier_count = 4
         self.max_weekly_loss_percentage = 20
+        apply_settings(self, settings)
         
         # Strategy state
         self.current_loss_multiplier = 1
         self.current_loss_count = 0
-        self.weekly_trades = []
-        self.daily_trades = []
+        self.ledger = TradeLedger()
+        # Stamps trades; simulations swap in a simulated clock
+        self.clock = time.time
         self.is_active = False
         
-        # Market data service
-        self.market_service = MarketDataService()
+        # Market data service (pass one with a replay provider for offline runs)
+        self.market_service = market_service if market_service is not None else MarketDataService()
     
     def start(self):
         """Start the trading bot"""
@@ -350,17 +491,13 @@ class TenTradesStrategy:
             "current_loss_count": self.current_loss_count,
             "weekly_profit_loss": weekly_profit_loss,
             "weekly_profit_loss_percentage": weekly_profit_loss_percentage,
-            "daily_trades_count": len(self.daily_trades),
-            "weekly_trades_count": len(self.weekly_trades)
+            "daily_trades_count": self.ledger.daily_count,
+            "weekly_trades_count": self.ledger.weekly_count
         }
     
     def calculate_weekly_profit_loss(self):
-        """Calculate the total profit/loss for the current week"""
-        one_week_ago = datetime.now() - timedelta(days=7)
-        weekly_trades = [trade for trade in self.weekly_trades if trade["exit_time"] > one_week_ago]
-        
-        total_profit_loss = sum(trade["profit_loss"] for trade in weekly_trades)
-        return total_profit_loss
+        """Calculate the total profit/loss for the current week (running total kept by the ledger)"""
+        return self.ledger.weekly_profit_loss()
     
     def check_weekly_loss_limit(self):
         """Check if the weekly loss limit has been reached"""
@@ -376,8 +513,13 @@ class TenTradesStrategy:
         
         return {"limit_reached": False}
     
-    def execute_trade(self):
-        """Execute a single trade based on the strategy"""
+    def execute_trade(self, market_data=None):
+        """
+        Execute a single trade based on the strategy
+        
+        Args:
+            market_data: Optional process_market_series result for market_interval/market_range
+        """
         if not self.is_active:
             return {"status": "error", "message": "البوت غير نشط"}
         
@@ -386,8 +528,190 @@ class TenTradesStrategy:
         if weekly_loss_check["limit_reached"]:
             return {"status": "stopped", "message": weekly_loss_check["message"]}
         
-        # Get current market data
-        market_data = self.market_service.process_market_data(self.trading_pair, interval="15m", range="1d")
+        # Get current market data unless the caller (e.g. bot_scheduler) passes a shared snapshot
+        if market_data is None:
+            market_data = self.market_service.process_market_series(
+                self.trading_pair, interval=self.market_interval, range=self.market_range
+            )
         
         if "error" in market_data:
-            return {"status": "err<response clipped><NOTE>To save on context only part of this file has been shown to you. You should retry this tool after you have searched inside the file with `grep -n` in order to find the line numbers of what you are looking for.</NOTE>
\ No newline at end of file
+            return {"status": "error", "message": f"خطأ في الحصول على بيانات السوق: {market_data['error']}"}
+        
+        # Calculate trade parameters
+        current_price = market_data["current_price"]
+        trade_amount = (self.current_capital * self.entry_percentage / 100) * self.current_loss_multiplier
+        trade_quantity = trade_amount / current_price
+        
+        # Determine trade direction (buy/sell) based on simple analysis
+        # In a real implementation, this would use more sophisticated analysis
+        closes = market_data["series"].compact().close
+        if len(closes) < 2:
+            trade_direction = random.choice(["buy", "sell"])
+        elif closes[-1] > closes[-2]:
+            trade_direction = "buy"
+        else:
+            trade_direction = "sell"
+        
+        # Calculate take profit and stop loss prices
+        if trade_direction == "buy":
+            take_profit_price = current_price * (1 + self.take_profit_percentage / 100)
+            stop_loss_price = current_price * (1 - self.stop_loss_percentage / 100)
+        else:
+            take_profit_price = current_price * (1 - self.take_profit_percentage / 100)
+            stop_loss_price = current_price * (1 + self.stop_loss_percentage / 100)
+        
+        # Simulate trade execution
+        entry_time = self.clock()
+        
+        # Simulate market movement (in a real implementation, this would be based on actual market data)
+        # For simulation, we'll randomly determine if the trade hits take profit or stop loss
+        outcome = random.choices(
+            ["take_profit", "stop_loss"],
+            weights=[55, 45],  # Slightly biased towards profit for simulation
+            k=1
+        )[0]
+        
+        # Calculate exit price and profit/loss
+        if outcome == "take_profit":
+            exit_price = take_profit_price
+            exit_reason = "take_profit"
+        else:
+            exit_price = stop_loss_price
+            exit_reason = "stop_loss"
+        
+        # Calculate profit/loss
+        if trade_direction == "buy":
+            profit_loss = (exit_price - current_price) * trade_quantity
+        else:
+            profit_loss = (current_price - exit_price) * trade_quantity
+        
+        # Update capital
+        self.current_capital += profit_loss
+        
+        # Update loss multiplier if needed
+        if exit_reason == "stop_loss":
+            if self.current_loss_count < self.max_loss_multiplier_count:
+                self.current_loss_multiplier *= self.max_loss_multiplier
+                self.current_loss_count += 1
+        else:
+            # Reset loss multiplier on successful trade
+            self.current_loss_multiplier = 1
+            self.current_loss_count = 0
+        
+        # Record trade (use records_to_dicts / to_dict for JSON)
+        trade = TradeRecord(
+            self.account_id,
+            self.trading_pair,
+            TradeDirection.BUY if trade_direction == "buy" else TradeDirection.SELL,
+            current_price,
+            exit_price,
+            trade_quantity,
+            entry_time,
+            self.clock(),
+            ExitReason.TAKE_PROFIT if exit_reason == "take_profit" else ExitReason.STOP_LOSS,
+            profit_loss,
+            (profit_loss / trade_amount) * 100,
+            self.current_loss_multiplier
+        )
+        
+        # Add to trade history
+        self.ledger.record(trade)
+        
+        # Clean up old trades
+        self.cleanup_old_trades()
+        
+        return {
+            "status": "success",
+            "trade": trade,
+            "current_capital": self.current_capital,
+            "current_loss_multiplier": self.current_loss_multiplier
+        }
+    
+    def cleanup_old_trades(self):
+        """Remove trades older than 7 days from the ledger and reset the daily totals on a new day"""
+        self.ledger.expire()
+    
+    def iter_simulation(self, days=1, trades_per_day=10):
+        """
+        Run a simulation of the strategy day by day
+        
+        Yields one record per simulated day ("type": "day") and a final summary
+        ("type": "summary"), or a single "error" record; see simulate_days.
+        """
+        return simulate_days(self, days, trades_per_day)
+    
+    def run_simulation(self, days=1, trades_per_day=10):
+        """Run a simulation of the strategy for a specified number of days"""
+        return collect_simulation(self.iter_simulation(days, trades_per_day))
+    
+    def run_monte_carlo(self, paths=10000, days=30, trades_per_day=10, seed=None):
+        """
+        Run a vectorized Monte Carlo simulation of the strategy over many independent paths
+        
+        Uses the same take-profit odds, loss multiplier and weekly loss limit as run_simulation,
+        but draws the outcomes of all trades up front instead of fetching market data per trade.
+        
+        Args:
+            paths: Number of simulated paths
+            days: Number of simulated days
+            trades_per_day: Trades per day on every path
+            seed: Optional random seed
+            
+        Returns:
+            Dictionary with the distribution of final capital, drawdown and stop-out day
+        """
+        from monte_carlo import run_monte_carlo
+        return run_monte_carlo(self, paths=paths, days=days, trades_per_day=trades_per_day, seed=seed)
+    
+    def run_backtest(self, interval="15m", range="1mo", trades_per_day=10, series=None):
+        """
+        Replay the strategy over historical candles of the trading pair
+        
+        Each trade's take profit or stop loss is resolved against the highs and lows of the
+        bars after its entry; the loss multiplier and weekly loss limit are the same as in run_simulation.
+        
+        Args:
+            interval: Candle interval
+            range: Data range to fetch
+            trades_per_day: Entries per day
+            series: Optional CandleSeries to use instead of fetching (e.g. a long history from candle_store)
+            
+        Returns:
+            Dictionary with the run_simulation fields, daily results and backtest statistics
+        """
+        from backtester import run_backtest
+        return run_backtest(self, interval=interval, range=range, trades_per_day=trades_per_day, series=series)
+
+
+# Example usage
+if __name__ == "__main__":
+    if len(sys.argv) >= 6 and sys.argv[1] in ("simulate", "monte_carlo"):
+        strategy_type = sys.argv[2]
+        trading_pair = sys.argv[3]
+        initial_capital = float(sys.argv[4])
+        days = int(sys.argv[5])
+        
+        if strategy_type == "thousand_trades":
+            strategy = ThousandTradesStrategy(None, trading_pair, initial_capital)
+        elif strategy_type == "ten_trades":
+            strategy = TenTradesStrategy(None, trading_pair, initial_capital)
+        else:
+            print(json.dumps({"status": "error", "message": f"نوع الاستراتيجية غير معروف: {strategy_type}"}))
+            sys.exit(1)
+        
+        if sys.argv[1] == "monte_carlo":
+            paths = int(sys.argv[6]) if len(sys.argv) >= 7 else 10000
+            print(json.dumps(strategy.run_monte_carlo(paths=paths, days=days)))
+        elif "--stream" in sys.argv:
+            # One NDJSON record per simulated day, then the summary
+            strategy.start()
+            for record in strategy.iter_simulation(days=days):
+                sys.stdout.write(json.dumps(record) + "\n")
+                sys.stdout.flush()
+        else:
+            strategy.start()
+            print(json.dumps(strategy.run_simulation(days=days)))
+    else:
+        strategy = ThousandTradesStrategy(1, "BTC-USD", 1000)
+        strategy.start()
+        print(json.dumps(strategy.run_simulation(days=1, trades_per_day=10), indent=2))
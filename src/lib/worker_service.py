@@ -0,0 +1,469 @@
+import sys
+import os
+import json
+import time
+import queue
+import types
+import argparse
+import threading
+import socketserver
+import multiprocessing
+
+DEFAULT_SOCKET_PATH = os.environ.get('TRADING_WORKER_SOCKET', '/tmp/trading-bot-worker.sock')
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_REQUESTS_PER_WORKER = 500
+DEFAULT_REQUEST_TIMEOUT = 300
+DEFAULT_STARTUP_TIMEOUT = 120
+
+# A request left with less time than this after queueing for a worker is answered as busy
+# instead of being sent, so queueing never makes a healthy worker time out and restart
+MIN_CALL_SECONDS = 1.0
+
+# Optional file used to keep the incremental indicator state across worker restarts
+INDICATOR_STATE_PATH = os.environ.get('TRADING_INDICATOR_STATE')
+
+
+class WorkerTimeout(Exception):
+    """Raised when a worker does not answer within the allowed time"""
+
+
+class WorkerContext:
+    """
+    Services loaded once per worker process and reused for every request:
+    - MarketDataService for /api/market/[symbol]
+    - MarketAnalysisAI for /api/analysis/[symbol] (and BatchAnalyzer for /api/analysis/batch)
+    - ThousandTradesStrategy / TenTradesStrategy for /api/bots/simulate
+    """
+
+    def __init__(self):
+        from market_data import MarketDataService
+        from market_analysis import MarketAnalysisAI, preload_dependencies
+        from trading_strategies import ThousandTradesStrategy, TenTradesStrategy
+
+        # Workers are long-lived, so pay for the heavy imports before the first request
+        preload_dependencies()
+
+        self.market_service = MarketDataService()
+        self.analyzer = MarketAnalysisAI()
+        self.load_indicator_state()
+        self.batch_analyzer = None
+        self.strategies = {
+            'thousand_trades': ThousandTradesStrategy,
+            'ten_trades': TenTradesStrategy
+        }
+
+    def load_indicator_state(self):
+        """Restore the analyzer's indicator engines saved by a previous worker, if any"""
+        if not INDICATOR_STATE_PATH or not os.path.exists(INDICATOR_STATE_PATH):
+            return
+        try:
+            with open(INDICATOR_STATE_PATH) as f:
+                self.analyzer.load_indicator_state(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring indicator state: {str(e)}", file=sys.stderr)
+
+    def save_indicator_state(self):
+        """Write the analyzer's indicator engines so the next worker resumes from them"""
+        if not INDICATOR_STATE_PATH:
+            return
+        temp_path = f'{INDICATOR_STATE_PATH}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self.analyzer.export_indicator_state(), f)
+            os.replace(temp_path, INDICATOR_STATE_PATH)
+        except OSError as e:
+            print(f"Could not save indicator state: {str(e)}", file=sys.stderr)
+
+    def handle(self, command, params):
+        """
+        Dispatch a request to the matching handler
+
+        Args:
+            command: Name of the command (market, analyze, analyze_batch, simulate, monte_carlo, backtest,
+                     cache_stats, model_stats, analysis_cache_stats, ping)
+            params: Dictionary of command parameters
+
+        Returns:
+            JSON-serializable result of the command, or a generator of records
+            when a streaming command is called with params['stream']
+        """
+        handler = getattr(self, f'handle_{command}', None)
+        if handler is None:
+            raise ValueError(f'Unknown command: {command}')
+        return handler(params)
+
+    def handle_ping(self, params):
+        return {'pong': True, 'pid': os.getpid()}
+
+    def handle_market(self, params):
+        return self.market_service.process_market_data(
+            params['symbol'],
+            params.get('interval', '1d'),
+            params.get('range', '1mo')
+        )
+
+    def handle_cache_stats(self, params):
+        return self.market_service.get_cache_stats()
+
+    def handle_model_stats(self, params):
+        return self.analyzer.model_registry.get_stats()
+
+    def handle_analysis_cache_stats(self, params):
+        if self.analyzer.analysis_cache is None:
+            return {'enabled': False}
+        return self.analyzer.analysis_cache.get_stats()
+
+    def handle_analyze(self, params):
+        if params.get('stream'):
+            return self.analyzer.planner.iter_comprehensive(params['symbol'])
+        return self.analyzer.comprehensive_analysis(params['symbol'])
+
+    def handle_analyze_batch(self, params):
+        if self.batch_analyzer is None:
+            from batch_analysis import BatchAnalyzer
+            self.batch_analyzer = BatchAnalyzer(self.analyzer)
+        options = {'timeout': float(params['timeout'])} if 'timeout' in params else {}
+        return self.batch_analyzer.analyze(params['symbols'], **options)
+
+    def handle_simulate(self, params):
+        strategy_type = params['strategy_type']
+        if strategy_type not in self.strategies:
+            return {"status": "error", "message": f"نوع الاستراتيجية غير معروف: {strategy_type}"}
+
+        strategy = self.strategies[strategy_type](
+            params.get('account_id'),
+            params['trading_pair'],
+            float(params['initial_capital']),
+            settings=params.get('settings')
+        )
+        strategy.start()
+        if params.get('stream'):
+            return strategy.iter_simulation(days=int(params.get('days', 7)))
+        return strategy.run_simulation(days=int(params.get('days', 7)))
+
+    def handle_monte_carlo(self, params):
+        strategy_type = params['strategy_type']
+        if strategy_type not in self.strategies:
+            return {"status": "error", "message": f"نوع الاستراتيجية غير معروف: {strategy_type}"}
+
+        strategy = self.strategies[strategy_type](
+            params.get('account_id'),
+            params['trading_pair'],
+            float(params['initial_capital']),
+            settings=params.get('settings')
+        )
+        options = {key: params[key] for key in ('paths', 'days', 'trades_per_day', 'seed') if key in params}
+        return strategy.run_monte_carlo(**options)
+
+    def handle_backtest(self, params):
+        strategy_type = params['strategy_type']
+        if strategy_type not in self.strategies:
+            return {"status": "error", "message": f"نوع الاستراتيجية غير معروف: {strategy_type}"}
+
+        strategy = self.strategies[strategy_type](
+            params.get('account_id'),
+            params['trading_pair'],
+            float(params['initial_capital']),
+            market_service=self.market_service,
+            settings=params.get('settings')
+        )
+        options = {key: params[key] for key in ('interval', 'range', 'trades_per_day') if key in params}
+        return strategy.run_backtest(**options)
+
+
+def _worker_main(conn):
+    """Entry point of a worker process: load the services once, then serve requests from the pipe"""
+    try:
+        context = WorkerContext()
+    except Exception as e:
+        conn.send(('failed', f'Worker startup failed: {str(e)}'))
+        return
+
+    conn.send(('ready', os.getpid()))
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        if request is None:
+            context.save_indicator_state()
+            break
+
+        command, params = request
+        try:
+            result = context.handle(command, params)
+            if isinstance(result, types.GeneratorType):
+                # Streaming command: every record goes out as soon as it is produced
+                count = 0
+                for item in result:
+                    conn.send(('item', item))
+                    count += 1
+                result = {'records': count}
+            conn.send((True, result))
+        except Exception as e:
+            conn.send((False, str(e)))
+
+
+class PythonWorker:
+    """A single worker process and the pipe used to talk to it"""
+
+    def __init__(self, mp_context):
+        self.conn, child_conn = mp_context.Pipe()
+        self.process = mp_context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.is_ready = False
+        self.requests_served = 0
+
+    def wait_ready(self, timeout):
+        """Wait until the worker finished loading its services"""
+        if self.is_ready:
+            return
+
+        if not self.conn.poll(timeout):
+            raise WorkerTimeout(f'Worker did not start within {timeout} seconds')
+
+        status, detail = self.conn.recv()
+        if status != 'ready':
+            raise RuntimeError(detail)
+        self.is_ready = True
+
+    def call(self, command, params, timeout, startup_timeout, on_item=None):
+        """
+        Send a request to the worker and wait for its response
+
+        Args:
+            command: Command name
+            params: Command parameters
+            timeout: Seconds to wait for the response (for streams: for each record)
+            startup_timeout: Seconds to wait for a freshly spawned worker to load
+            on_item: Callable receiving each record of a streaming command
+
+        Returns:
+            Tuple (ok, result_or_error_message)
+        """
+        self.wait_ready(startup_timeout)
+        self.conn.send((command, params))
+
+        while True:
+            if not self.conn.poll(timeout):
+                raise WorkerTimeout(f'Request timed out after {timeout} seconds')
+
+            message = self.conn.recv()
+            if message[0] != 'item':
+                break
+            if on_item is None:
+                raise RuntimeError(f'Unexpected stream from command {command}')
+            on_item(message[1])
+
+        self.requests_served += 1
+        return message
+
+    def shutdown(self):
+        """Ask the worker to exit and make sure it is gone"""
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=5)
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Bounded pool of warm worker processes
+
+    Each request borrows one idle worker, so at most `size` requests run at once and
+    the rest wait in line. Workers that time out or crash are replaced, and every
+    worker is recycled after `max_requests_per_worker` requests to bound memory growth.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, max_requests_per_worker=DEFAULT_MAX_REQUESTS_PER_WORKER,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT, startup_timeout=DEFAULT_STARTUP_TIMEOUT):
+        self.size = size
+        self.max_requests_per_worker = max_requests_per_worker
+        self.request_timeout = request_timeout
+        self.startup_timeout = startup_timeout
+
+        # Spawn rather than fork: the server process runs threads
+        self._mp_context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'recycled': 0,
+            'restarted': 0
+        }
+
+        for _ in range(size):
+            self._idle.put(PythonWorker(self._mp_context))
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def submit(self, command, params, timeout=None, on_item=None):
+        """
+        Run a command on the next idle worker
+
+        Args:
+            command: Command name
+            params: Command parameters
+            timeout: Optional per-request timeout in seconds (for streams: the longest
+                     wait for the next record, so long runs are not cut off while producing)
+            on_item: Callable receiving each record of a streaming command; an exception
+                     from it (client gone) replaces the worker, which is still producing
+
+        Returns:
+            Tuple (ok, result_or_error_message)
+        """
+        timeout = timeout or self.request_timeout
+        deadline = time.monotonic() + timeout
+
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            self._count('timeouts')
+            return False, 'All workers are busy'
+
+        remaining = deadline - time.monotonic()
+        if on_item is not None:
+            remaining = timeout
+        elif remaining < MIN_CALL_SECONDS:
+            self._idle.put(worker)
+            self._count('timeouts')
+            return False, 'All workers are busy'
+
+        self._count('requests')
+        replace = False
+        try:
+            ok, result = worker.call(command, params, remaining, self.startup_timeout, on_item)
+            if not ok:
+                self._count('errors')
+            return ok, result
+        except WorkerTimeout as e:
+            self._count('timeouts')
+            replace = True
+            return False, str(e)
+        except (EOFError, OSError, RuntimeError) as e:
+            self._count('errors')
+            replace = True
+            return False, f'Worker failed: {str(e)}'
+        finally:
+            if replace:
+                self._count('restarted')
+                worker.kill()
+                worker = PythonWorker(self._mp_context)
+            elif worker.requests_served >= self.max_requests_per_worker:
+                self._count('recycled')
+                worker.shutdown()
+                worker = PythonWorker(self._mp_context)
+            self._idle.put(worker)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['size'] = self.size
+        stats['idle'] = self._idle.qsize()
+        return stats
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().shutdown()
+            except queue.Empty:
+                break
+
+
+class WorkerRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Newline-delimited JSON protocol:
+    request  {"id": 1, "command": "market", "params": {...}, "timeout": 30}
+    response {"id": 1, "ok": true, "result": {...}} or {"id": 1, "ok": false, "error": "..."}
+
+    Streaming commands (simulate and analyze with "stream": true in params) answer
+    with one {"id": 1, "item": {...}} line per record before the final response.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request.get('id')
+                command = request['command']
+
+                if command == 'stats':
+                    response = {'id': request_id, 'ok': True, 'result': self.server.pool.get_stats()}
+                else:
+                    params = request.get('params', {})
+                    on_item = None
+                    if params.get('stream'):
+                        on_item = lambda item, request_id=request_id: self._write({'id': request_id, 'item': item})
+                    ok, result = self.server.pool.submit(command, params, request.get('timeout'), on_item)
+                    if ok:
+                        response = {'id': request_id, 'ok': True, 'result': result}
+                    else:
+                        response = {'id': request_id, 'ok': False, 'error': result}
+            except (ValueError, KeyError, TypeError) as e:
+                response = {'id': request_id, 'ok': False, 'error': f'Invalid request: {str(e)}'}
+
+            try:
+                self._write(response)
+            except OSError:
+                # Client went away (for streams this already replaced the worker)
+                return
+
+    def _write(self, message):
+        self.wfile.write((json.dumps(message) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, pool):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.pool = pool
+        super().__init__(socket_path, WorkerRequestHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Warm Python worker pool for the trading bot API')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH)
+    parser.add_argument('--workers', type=int, default=DEFAULT_POOL_SIZE)
+    parser.add_argument('--max-requests', type=int, default=DEFAULT_MAX_REQUESTS_PER_WORKER)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_REQUEST_TIMEOUT)
+    args = parser.parse_args()
+
+    pool = WorkerPool(
+        size=args.workers,
+        max_requests_per_worker=args.max_requests,
+        request_timeout=args.timeout
+    )
+    server = WorkerServer(args.socket, pool)
+    print(f'Trading worker service listening on {args.socket} with {args.workers} workers', file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)